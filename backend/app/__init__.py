@@ -23,6 +23,9 @@ def create_app():
     """
     app = Flask(__name__)
 
+    from .utils.json_provider import AppJSONProvider
+    app.json = AppJSONProvider(app)
+
     # Load configuration
     from .config import Config
     app.config.from_object(Config)
@@ -90,13 +93,21 @@ def create_app():
         resources={
             r"/api/*": {
                 "origins": allowed_origins,
-                "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-                "allow_headers": ["Content-Type", "Authorization", "X-Order-Token"],
+                "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+                "allow_headers": ["Content-Type", "Authorization", "X-Order-Token", "Idempotency-Key"],
+                "expose_headers": ["Idempotent-Replayed", "Retry-After"],
                 "supports_credentials": True,
             }
         },
     )
 
+    # Trust X-Forwarded-* only from our own proxies, so rate limits key on
+    # the real client address.
+    if app.config.get("TRUSTED_PROXY_COUNT"):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config["TRUSTED_PROXY_COUNT"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+
     # Import and initialize extensions here to avoid import-time issues
     from .extensions import db, migrate, bcrypt, jwt, limiter
     db.init_app(app)
@@ -105,6 +116,18 @@ def create_app():
     jwt.init_app(app)
     limiter.init_app(app)
 
+    from .utils.query_stats import init_query_stats
+    init_query_stats(app, db)
+
+    from .utils.metrics import init_metrics
+    init_metrics(app, db)
+
+    from .utils.compression import init_compression
+    init_compression(app)
+
+    from .services.payment_events import init_payment_events
+    init_payment_events(app)
+
     # JWT error handlers
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
@@ -139,6 +162,8 @@ def create_app():
     from .routes.admin_auth_routes import admin_auth_bp
     from .routes.admin_payment import admin_payment_bp
     from .routes.contact_routes import contact_bp
+    from .routes.metrics_routes import metrics_bp
+    from .routes.health_routes import health_bp
     from .utils.cloudinary import init_cloudinary
 
     app.register_blueprint(product_bp, url_prefix="/api/products")
@@ -150,10 +175,15 @@ def create_app():
     app.register_blueprint(admin_auth_bp, url_prefix="/api/admin/auth")
     app.register_blueprint(admin_payment_bp, url_prefix="/api/admin/payments")
     app.register_blueprint(contact_bp, url_prefix="/api/contact")
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(health_bp, url_prefix="/api/health")
 
     # Initialize cloudinary and other app-level helpers
     init_cloudinary(app)
 
+    from .commands import register_commands
+    register_commands(app)
+
     @app.after_request
     def add_security_headers(response):
         response.headers["X-Content-Type-Options"] = "nosniff"
@@ -0,0 +1,187 @@
+"""Flask CLI commands for background jobs.
+
+Run them from cron or a scheduler, e.g. ``flask related rebuild``.
+"""
+import click
+from flask.cli import AppGroup
+
+related_cli = AppGroup("related", help="Precomputed related-products lists.")
+
+
+@related_cli.command("rebuild")
+@click.option("--full", is_flag=True, help="Rebuild every product, not just stale ones.")
+def rebuild_related(full):
+    """Recompute related products for new or recently purchased products."""
+    from app.services.related_products import rebuild_related_products, stale_product_ids
+    from app.utils.cache import invalidate_catalog
+
+    product_ids = None if full else stale_product_ids()
+    count = rebuild_related_products(product_ids)
+    if count:
+        invalidate_catalog()
+    click.echo(f"Rebuilt related products for {count} product(s)")
+
+
+copurchase_cli = AppGroup("copurchase", help="Co-purchase recommendation index.")
+
+
+@copurchase_cli.command("rebuild")
+def rebuild_copurchase():
+    """Rebuild the co-purchase index from the full order history."""
+    from app.services.co_purchase import rebuild_co_purchase_index
+
+    products, pairs = rebuild_co_purchase_index()
+    click.echo(f"Indexed {pairs} product pair(s) across {products} product(s)")
+
+
+assets_cli = AppGroup("assets", help="Cloudinary asset cleanup.")
+
+
+@assets_cli.command("purge")
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches.")
+@click.option("--batch-size", type=int, default=100, show_default=True)
+def purge_assets(max_batches, batch_size):
+    """Delete queued Cloudinary assets in rate-limited batches."""
+    from app.services.asset_cleanup import purge_queued_assets
+
+    count = purge_queued_assets(max_batches=max_batches, batch_size=batch_size)
+    click.echo(f"Processed {count} queued asset(s)")
+
+
+@assets_cli.command("reconcile")
+@click.option("--prefix", default="smartnest/", show_default=True)
+@click.option("--min-age-hours", type=int, default=24, show_default=True,
+              help="Ignore assets uploaded more recently than this.")
+@click.option("--enqueue", is_flag=True, help="Queue the orphans for deletion.")
+def reconcile_assets(prefix, min_age_hours, enqueue):
+    """List uploaded assets that no product image or logo references."""
+    from app.extensions import db
+    from app.services.asset_cleanup import find_orphaned_assets, queue_public_id
+
+    orphans = find_orphaned_assets(prefix, min_age_hours)
+    for orphan in orphans:
+        click.echo(f"{orphan['public_id']}\t{orphan['bytes']}\t{orphan['created_at']}")
+    total = sum(o["bytes"] for o in orphans)
+    click.echo(f"{len(orphans)} orphaned asset(s), {total / (1024 * 1024):.1f} MB")
+
+    if enqueue and orphans:
+        for orphan in orphans:
+            queue_public_id(orphan["public_id"], "orphaned")
+        db.session.commit()
+        click.echo(f"Queued {len(orphans)} asset(s) for deletion")
+
+
+idempotency_cli = AppGroup("idempotency", help="Stored Idempotency-Key responses.")
+
+
+@idempotency_cli.command("purge")
+def purge_idempotency_keys():
+    """Delete expired Idempotency-Key rows."""
+    from app.utils.idempotency import purge_expired_keys
+
+    count = purge_expired_keys()
+    click.echo(f"Deleted {count} expired idempotency key(s)")
+
+
+reservations_cli = AppGroup("reservations", help="Stock held for unpaid orders.")
+
+
+@reservations_cli.command("sweep")
+def sweep_stock_reservations():
+    """Release reservations for failed/cancelled payments and expired holds."""
+    from app.services.stock_reservations import sweep_reservations
+
+    released = sweep_reservations()
+    click.echo(
+        f"Released {released['payment_failed']} reservation(s) for failed payments, "
+        f"{released['expired']} expired"
+    )
+
+
+inventory_cli = AppGroup("inventory", help="Inventory ledger.")
+
+
+@inventory_cli.command("compact")
+def compact_inventory():
+    """Fold inventory movements into product stock and snapshot it."""
+    from app.services.inventory import compact_movements
+
+    products, movements = compact_movements()
+    click.echo(f"Folded {movements} movement(s) into {products} product(s)")
+
+
+@inventory_cli.command("as-of")
+@click.argument("product_id", type=int)
+@click.argument("at", type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M:%S"]))
+def inventory_as_of(product_id, at):
+    """Print a product's stock at AT (UTC)."""
+    from app.services.inventory import stock_as_of
+
+    quantity = stock_as_of(product_id, at)
+    click.echo("no history" if quantity is None else str(quantity))
+
+
+outbox_cli = AppGroup("outbox", help="Transactional outbox relay.")
+
+
+@outbox_cli.command("relay")
+@click.option("--once", is_flag=True, help="Exit once the outbox is drained.")
+@click.option("--batch-size", type=int, default=None, help="Events per batch (default: config).")
+def relay_outbox_events(once, batch_size):
+    """Deliver queued notifications and domain events."""
+    from app.services.outbox import relay_outbox
+
+    count = relay_outbox(once=once, batch_size=batch_size)
+    click.echo(f"Processed {count} outbox event(s)")
+
+
+@outbox_cli.command("retry")
+@click.option("--event-type", default=None, help="Only requeue events of this type.")
+def retry_outbox_events(event_type):
+    """Requeue events that ran out of delivery attempts."""
+    from app.services.outbox import retry_failed_events
+
+    count = retry_failed_events(event_type)
+    click.echo(f"Requeued {count} failed outbox event(s)")
+
+
+@outbox_cli.command("purge")
+@click.option("--older-than-days", type=int, default=30, show_default=True)
+def purge_outbox_events(older_than_days):
+    """Delete delivered events."""
+    from app.services.outbox import purge_delivered_events
+
+    count = purge_delivered_events(older_than_days)
+    click.echo(f"Deleted {count} delivered outbox event(s)")
+
+
+mpesa_cli = AppGroup("mpesa", help="Stored M-Pesa callbacks.")
+
+
+@mpesa_cli.command("replay")
+@click.option("--batch-size", type=int, default=50, show_default=True)
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches.")
+@click.option("--id", "ids", type=int, multiple=True,
+              help="Replay only these callback ids (any status but processed).")
+@click.option("--include-rejected", is_flag=True,
+              help="Also replay callbacks rejected for amount/phone mismatch.")
+def replay_mpesa_callbacks(batch_size, max_batches, ids, include_rejected):
+    """Reprocess failed M-Pesa callbacks."""
+    from app.services.mpesa_callbacks import replay_callbacks
+
+    counts = replay_callbacks(batch_size, max_batches, list(ids), include_rejected)
+    click.echo(
+        f"Replayed {counts['replayed']} callback(s): {counts['processed']} processed, "
+        f"{counts['rejected']} rejected, {counts['failed']} still failing"
+    )
+
+
+def register_commands(app):
+    app.cli.add_command(related_cli)
+    app.cli.add_command(copurchase_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(reservations_cli)
+    app.cli.add_command(inventory_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(mpesa_cli)
@@ -1,9 +1,116 @@
 import os
 from datetime import timedelta
+from sqlalchemy.pool import NullPool
+
+
+def _env_flag(name, default=False):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def build_engine_options(database_url):
+    """SQLAlchemy engine options for the given database URL.
+
+    Pool settings only apply to Postgres; SQLite (local dev) keeps the
+    SQLAlchemy defaults. In PgBouncer mode (transaction pooling) the
+    bouncer owns pooling, so we use NullPool and skip startup parameters
+    such as statement_timeout that PgBouncer rejects.
+    """
+    if not database_url or not database_url.startswith(("postgres", "postgresql")):
+        return {}
+
+    options = {"pool_pre_ping": _env_flag("DB_POOL_PRE_PING", True)}
+
+    if _env_flag("DB_PGBOUNCER"):
+        options["poolclass"] = NullPool
+        return options
+
+    options.update({
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 10)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    })
+
+    statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 15000))
+    if statement_timeout_ms > 0:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={statement_timeout_ms}"
+        }
+
+    return options
+
 
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Optional read replica for catalog and reporting endpoints
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    REPLICA_HEALTH_CHECK_SECONDS = int(os.getenv('REPLICA_HEALTH_CHECK_SECONDS', 30))
+
+    # Query instrumentation
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+    SQL_QUERY_BUDGET = int(os.getenv('SQL_QUERY_BUDGET')) if os.getenv('SQL_QUERY_BUDGET') else None
+    SERVER_TIMING_ENABLED = os.getenv('FLASK_ENV') != 'production'
+
+    # Product detail / catalog response cache
+    PRODUCT_CACHE_TTL_SECONDS = int(os.getenv('PRODUCT_CACHE_TTL_SECONDS', 60))
+
+    # Response compression
+    COMPRESS_ENABLED = _env_flag('COMPRESS_ENABLED', True)
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.getenv('COMPRESS_BR_LEVEL', 4))
+    COMPRESS_MIMETYPES = (
+        'application/json',
+        'text/html',
+        'text/css',
+        'text/plain',
+        'text/csv',
+        'application/javascript',
+    )
+
+    # Rate limiting. memory:// keeps counters per worker; use redis://... or
+    # database:// (app/utils/rate_limit_storage.py) to share them.
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_STORAGE_OPTIONS = (
+        {'database_url': SQLALCHEMY_DATABASE_URI}
+        if RATELIMIT_STORAGE_URI.startswith('database://') else {}
+    )
+    RATELIMIT_STRATEGY = os.getenv('RATELIMIT_STRATEGY', 'sliding-window-counter')
+    # Keep limiting per worker if the shared storage is unreachable
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = RATELIMIT_STORAGE_URI != 'memory://'
+    RATELIMIT_HEADERS_ENABLED = _env_flag('RATELIMIT_HEADERS_ENABLED', True)
+
+    # Number of reverse proxies in front of the app whose X-Forwarded-For /
+    # X-Forwarded-Proto headers are trusted (0 = use the socket address)
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+
+    # POST /api/orders/quote tokens keep their prices this long
+    ORDER_QUOTE_TTL_SECONDS = int(os.getenv('ORDER_QUOTE_TTL_SECONDS', 600))
+
+    # Unpaid orders hold their stock this long (`flask reservations sweep`)
+    STOCK_RESERVATION_TTL_MINUTES = int(os.getenv('STOCK_RESERVATION_TTL_MINUTES', 30))
+
+    # Idempotency-Key handling (app/utils/idempotency.py): how long a stored
+    # response is replayed, and how long an unfinished request holds its key
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 86400))
+    IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', 60))
+
+    # Payment status push (SSE). "local" only reaches clients connected to the
+    # same worker; use "postgres" (LISTEN/NOTIFY) or "redis" with >1 worker.
+    PAYMENT_EVENTS_BACKEND = os.getenv('PAYMENT_EVENTS_BACKEND', 'local')
+    PAYMENT_EVENTS_REDIS_URL = os.getenv('PAYMENT_EVENTS_REDIS_URL') or os.getenv('REDIS_URL')
+    PAYMENT_STREAM_TIMEOUT_SECONDS = int(os.getenv('PAYMENT_STREAM_TIMEOUT_SECONDS', 25))
+    PAYMENT_STREAM_HEARTBEAT_SECONDS = int(os.getenv('PAYMENT_STREAM_HEARTBEAT_SECONDS', 10))
+
+    # Metrics (bearer token required on /metrics when set)
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
 
     # Security
     SECRET_KEY = os.getenv('SECRET_KEY')
@@ -29,14 +136,42 @@ class Config:
     CLOUDINARY_API_KEY = os.getenv('CLOUDINARY_API_KEY')
     CLOUDINARY_API_SECRET = os.getenv('CLOUDINARY_API_SECRET')
 
+    # Image uploads (see app/services/image_uploads.py)
+    IMAGE_UPLOAD_WORKERS = int(os.getenv('IMAGE_UPLOAD_WORKERS', 4))
+    IMAGE_MAX_UPLOAD_BYTES = int(os.getenv('IMAGE_MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+    IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', 2000))
+    IMAGE_LOGO_MAX_DIMENSION = int(os.getenv('IMAGE_LOGO_MAX_DIMENSION', 4000))
+    IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', 82))
+    # Registering a direct upload must happen within this many seconds
+    SIGNED_UPLOAD_TTL_SECONDS = int(os.getenv('SIGNED_UPLOAD_TTL_SECONDS', 900))
+
+    # Cloudinary cleanup (`flask assets purge`)
+    ASSET_PURGE_INTERVAL_SECONDS = float(os.getenv('ASSET_PURGE_INTERVAL_SECONDS', 1.0))
+    ASSET_PURGE_MAX_ATTEMPTS = int(os.getenv('ASSET_PURGE_MAX_ATTEMPTS', 5))
+
     # WhatsApp
     WHATSAPP_CLOUD_API_TOKEN = os.getenv('WHATSAPP_CLOUD_API_TOKEN')
     WHATSAPP_PHONE_NUMBER_ID = os.getenv('WHATSAPP_PHONE_NUMBER_ID')
     WHATSAPP_OWNER_NUMBER = os.getenv('WHATSAPP_OWNER_NUMBER')
 
+    # Outbox relay (`flask outbox relay`, see app/services/outbox.py)
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+    OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv('OUTBOX_POLL_INTERVAL_SECONDS', 1.0))
+    OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', 120))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+    OUTBOX_RETRY_BASE_SECONDS = int(os.getenv('OUTBOX_RETRY_BASE_SECONDS', 30))
+    # Comma-separated endpoints that receive every event as a signed POST
+    OUTBOX_WEBHOOK_URLS = os.getenv('OUTBOX_WEBHOOK_URLS', '')
+    OUTBOX_WEBHOOK_SECRET = os.getenv('OUTBOX_WEBHOOK_SECRET')
+
     # M-Pesa
     MPESA_CONSUMER_KEY = os.getenv('MPESA_CONSUMER_KEY')
     MPESA_CONSUMER_SECRET = os.getenv('MPESA_CONSUMER_SECRET')
     MPESA_SHORTCODE = os.getenv('MPESA_SHORTCODE')
     MPESA_PASSKEY = os.getenv('MPESA_PASSKEY')
     MPESA_CALLBACK_URL = os.getenv('MPESA_CALLBACK_URL')
+    # A second STK push for the same order is refused for this long
+    STK_INFLIGHT_SECONDS = int(os.getenv('STK_INFLIGHT_SECONDS', 90))
+    # Stored callbacks (`flask mpesa replay`, see app/services/mpesa_callbacks.py)
+    MPESA_CALLBACK_MAX_ATTEMPTS = int(os.getenv('MPESA_CALLBACK_MAX_ATTEMPTS', 10))
+    MPESA_CALLBACK_STALE_SECONDS = int(os.getenv('MPESA_CALLBACK_STALE_SECONDS', 300))
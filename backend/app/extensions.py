@@ -1,12 +1,24 @@
+from flask import request
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from app.utils.db_routing import RoutingSession
+# Registers the "database://" rate limit storage scheme
+from app.utils import rate_limit_storage  # noqa: F401
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 bcrypt = Bcrypt()
 jwt = JWTManager()
-limiter = Limiter(key_func=get_remote_address)
+
+def _on_rate_limit_breach(request_limit):
+    from app.utils.metrics import RATE_LIMIT_BREACHES
+    RATE_LIMIT_BREACHES.labels(
+        request.endpoint or "unknown", str(request_limit.limit)
+    ).inc()
+
+
+limiter = Limiter(key_func=get_remote_address, on_breach=_on_rate_limit_breach)
@@ -7,3 +7,12 @@ from .product_rating import ProductRating
 from .branding import BrandingDetail
 from .product_image import ProductImage
 from .admin import AdminUser
+from .related_product import RelatedProduct
+from .co_purchase import CoPurchasePair, CoPurchaseNeighbours
+from .asset_deletion import AssetDeletion
+from .rate_limit import RateLimitCounter
+from .idempotency_key import IdempotencyKey
+from .stock_reservation import StockReservation
+from .inventory import InventoryMovement, InventorySnapshot
+from .outbox import OutboxEvent, OutboxDelivery
+from .mpesa_callback import MpesaCallback
@@ -0,0 +1,26 @@
+from app.extensions import db
+from datetime import datetime
+
+
+class AssetDeletion(db.Model):
+    """Cloudinary asset queued for deletion by `flask assets purge`."""
+    __tablename__ = "asset_deletions"
+    __table_args__ = (
+        db.Index("ix_asset_deletions_status_id", "status", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    public_id = db.Column(db.String(255), nullable=False, unique=True)
+    resource_type = db.Column(db.String(20), nullable=False, default="image")
+    reason = db.Column(db.String(50))
+
+    # pending -> deleted | failed (after ASSET_PURGE_MAX_ATTEMPTS) | skipped
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(255))
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<AssetDeletion {self.public_id} - {self.status}>"
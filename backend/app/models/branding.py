@@ -9,13 +9,14 @@ class BrandingDetail(db.Model):
     order_id = db.Column(
         db.Integer,
         db.ForeignKey("orders.id"),   # ✅ MUST be orders.id
-        nullable=False
+        nullable=False,
+        index=True
     )
 
     logo = db.Column(db.String(255))
     colors = db.Column(db.String(255))
     notes = db.Column(db.Text)
-    deadline = db.Column(db.Date)
+    deadline = db.Column(db.Date, index=True)
 
     order = db.relationship(
         "Order",
@@ -0,0 +1,41 @@
+from app.extensions import db
+from datetime import datetime
+
+
+class CoPurchasePair(db.Model):
+    """Number of orders containing both products; stored in both directions."""
+    __tablename__ = "co_purchase_pairs"
+    __table_args__ = (
+        db.Index("ix_co_purchase_pairs_product_count", "product_id", "order_count"),
+    )
+
+    product_id = db.Column(
+        db.Integer,
+        db.ForeignKey("products.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    other_product_id = db.Column(
+        db.Integer,
+        db.ForeignKey("products.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CoPurchasePair {self.product_id} + {self.other_product_id} x{self.order_count}>"
+
+
+class CoPurchaseNeighbours(db.Model):
+    """Top-K co-purchased products per product, as [[product_id, order_count], ...]."""
+    __tablename__ = "co_purchase_neighbours"
+
+    product_id = db.Column(
+        db.Integer,
+        db.ForeignKey("products.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    neighbours = db.Column(db.JSON, nullable=False, default=list)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<CoPurchaseNeighbours {self.product_id} ({len(self.neighbours or [])})>"
@@ -0,0 +1,23 @@
+from app.extensions import db
+from datetime import datetime
+
+
+class IdempotencyKey(db.Model):
+    """Stored response for a client-supplied Idempotency-Key.
+
+    A row with no status_code is a request still being processed; its
+    short expires_at lets a retry take over if the worker died.
+    """
+    __tablename__ = "idempotency_keys"
+
+    scope = db.Column(db.String(50), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.scope}:{self.key} {self.status_code or 'in progress'}>"
@@ -0,0 +1,76 @@
+from app.extensions import db
+from app.models.product import Product
+from datetime import datetime
+
+# SQLite only autoincrements INTEGER primary keys
+_BigId = db.BigInteger().with_variant(db.Integer(), "sqlite")
+
+
+class InventoryMovement(db.Model):
+    """Append-only record of every change to a product's on-hand stock.
+
+    Rows are inserted and, once, marked folded: `flask inventory compact`
+    adds them to products.stock_quantity and sets folded_at in the same
+    transaction. On-hand stock is stock_quantity plus the unfolded movements.
+    product_id has no foreign key so history outlives deleted products and
+    inserts skip the FK check.
+    """
+    __tablename__ = "inventory_movements"
+    __table_args__ = (
+        # Covers the per-product SUM of unfolded movements and finding them
+        # to fold; stays as small as the backlog
+        db.Index(
+            "ix_inventory_movements_unfolded", "product_id", "quantity_delta",
+            postgresql_where=db.text("folded_at IS NULL"),
+            sqlite_where=db.text("folded_at IS NULL"),
+        ),
+        # stock_as_of
+        db.Index("ix_inventory_movements_product_created", "product_id", "created_at"),
+    )
+
+    id = db.Column(_BigId, primary_key=True)
+    product_id = db.Column(db.Integer, nullable=False)
+    quantity_delta = db.Column(db.Integer, nullable=False)
+    # opening, sale, restock, adjustment, return
+    kind = db.Column(db.String(20), nullable=False)
+    order_id = db.Column(db.Integer, nullable=True)
+    note = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Set when the movement is added to products.stock_quantity
+    folded_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<InventoryMovement {self.id} product={self.product_id} {self.kind} {self.quantity_delta:+d}>"
+
+
+class InventorySnapshot(db.Model):
+    """A product's folded stock as of a compaction run, for as-of queries.
+
+    taken_at equals the folded_at of the movements that run folded.
+    """
+    __tablename__ = "inventory_snapshots"
+    __table_args__ = (
+        db.Index("ix_inventory_snapshots_product_taken", "product_id", "taken_at"),
+    )
+
+    id = db.Column(_BigId, primary_key=True)
+    product_id = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    taken_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<InventorySnapshot product={self.product_id} {self.quantity} @ {self.taken_at}>"
+
+
+def pending_stock_column():
+    """Correlated SUM of the enclosing Product row's unfolded movements."""
+    return (
+        db.select(db.func.coalesce(db.func.sum(InventoryMovement.quantity_delta), 0))
+        .where(
+            InventoryMovement.product_id == Product.id,
+            InventoryMovement.folded_at.is_(None),
+        )
+        .correlate(Product)
+        .scalar_subquery()
+        .label("pending_stock_delta")
+    )
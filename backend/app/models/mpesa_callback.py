@@ -0,0 +1,55 @@
+from app.extensions import db
+from datetime import datetime
+
+
+class MpesaCallback(db.Model):
+    """Raw M-Pesa STK callback, stored before it is processed.
+
+    A byte-for-byte repeat of a callback (same CheckoutRequestID and
+    payload hash) is an insert conflict, so it is acknowledged without
+    touching the payment or calling Daraja again. A different payload for
+    the same CheckoutRequestID is stored and processed on its own, so an
+    early or forged callback cannot shadow the genuine one.
+    """
+    __tablename__ = "mpesa_callbacks"
+    __table_args__ = (
+        db.UniqueConstraint("checkout_request_id", "payload_hash",
+                            name="uq_mpesa_callbacks_checkout_payload"),
+        db.Index("ix_mpesa_callbacks_status_id", "status", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    checkout_request_id = db.Column(db.String(100), nullable=True)
+    merchant_request_id = db.Column(db.String(100), nullable=True, index=True)
+    result_code = db.Column(db.Integer, nullable=True)
+    payload = db.Column(db.JSON, nullable=False)
+    # sha256 of the payload as canonical JSON
+    payload_hash = db.Column(db.String(64), nullable=False)
+
+    # received -> processed | rejected | failed (replayable)
+    status = db.Column(db.String(20), nullable=False, default="received")
+    # Last processing result, as counted by mpesa_callbacks_total
+    outcome = db.Column(db.String(30))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(255))
+
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    attempted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "checkout_request_id": self.checkout_request_id,
+            "merchant_request_id": self.merchant_request_id,
+            "result_code": self.result_code,
+            "status": self.status,
+            "outcome": self.outcome,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "received_at": self.received_at.isoformat() if self.received_at else None,
+            "processed_at": self.processed_at.isoformat() if self.processed_at else None,
+        }
+
+    def __repr__(self):
+        return f"<MpesaCallback {self.checkout_request_id} - {self.status}>"
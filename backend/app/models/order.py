@@ -59,10 +59,10 @@ class Order(db.Model):
                 "address": self.address,
             },
             "items": [item.to_dict() for item in self.items],
-            "total": float(self.total),
+            "total": self.total,
             "status": self.status,
             "payment": self.payment.to_dict() if self.payment else None,
-            "created_at": self.created_at.isoformat(),
+            "created_at": self.created_at,
         }
 
     def __repr__(self):
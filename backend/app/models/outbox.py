@@ -0,0 +1,54 @@
+from app.extensions import db
+from datetime import datetime
+
+
+class OutboxEvent(db.Model):
+    """Domain event written in the same transaction as the change it
+    describes, delivered afterwards by `flask outbox relay`.
+
+    available_at is when the relay may next pick the event up: a retry
+    backoff after a failed delivery, or the lease end while a relay
+    worker is processing it.
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        db.Index("ix_outbox_events_status_available", "status", "available_at", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)
+    aggregate_id = db.Column(db.Integer, nullable=True)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    # One event per dedup_key, e.g. "payment.confirmed:<payment id>"
+    dedup_key = db.Column(db.String(150), nullable=True, unique=True)
+
+    # pending -> done | failed (after OUTBOX_MAX_ATTEMPTS)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(255))
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime)
+
+    deliveries = db.relationship(
+        "OutboxDelivery", backref="event", lazy=True, cascade="all, delete-orphan"
+    )
+
+    def __repr__(self):
+        return f"<OutboxEvent {self.id} {self.event_type} - {self.status}>"
+
+
+class OutboxDelivery(db.Model):
+    """A handler that has already delivered an event, so a retry of the
+    event skips it."""
+    __tablename__ = "outbox_deliveries"
+
+    event_id = db.Column(
+        db.Integer, db.ForeignKey("outbox_events.id", ondelete="CASCADE"), primary_key=True
+    )
+    handler = db.Column(db.String(100), primary_key=True)
+    delivered_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<OutboxDelivery {self.event_id}:{self.handler}>"
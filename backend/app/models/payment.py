@@ -18,6 +18,8 @@ class Payment(db.Model):
     # M-Pesa specific fields
     mpesa_checkout_id = db.Column(db.String(100), unique=True, nullable=True)
     mpesa_receipt = db.Column(db.String(50), unique=True, nullable=True)
+    # Set while an STK prompt is outstanding; blocks a second push
+    stk_requested_at = db.Column(db.DateTime, nullable=True)
     
     # Payment timestamps
     paid_at = db.Column(db.DateTime, nullable=True)
@@ -46,6 +48,7 @@ class Payment(db.Model):
     def mark_as_failed(self):
         """Mark payment as failed"""
         self.status = "FAILED"
+        self.stk_requested_at = None
     
     def to_dict(self):
         return {
@@ -55,9 +58,9 @@ class Payment(db.Model):
             "status": self.status,
             "mpesa_receipt": self.mpesa_receipt,
             "mpesa_checkout_id": self.mpesa_checkout_id,
-            "paid_at": self.paid_at.isoformat() if self.paid_at else None,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat()
+            "paid_at": self.paid_at,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
         }
     
     def __repr__(self):
@@ -2,6 +2,36 @@ from app.extensions import db
 from decimal import Decimal
 from datetime import datetime
 
+
+def flash_sale_window_active(flash_sale_start, flash_sale_end, now=None):
+    if not flash_sale_start or not flash_sale_end:
+        return False
+    now = now or datetime.now()
+    return flash_sale_start <= now <= flash_sale_end
+
+
+def compute_discounted_price(price, discount_percent):
+    """Return discounted price as Decimal (non-flash)."""
+    price = price or Decimal("0")
+    if discount_percent and discount_percent > 0:
+        discount = Decimal(discount_percent) / Decimal(100)
+        return price * (Decimal("1") - discount)
+    return price
+
+
+def compute_effective_price(price, discount_percent, flash_sale_percent,
+                            flash_sale_start, flash_sale_end, now=None):
+    """Return price after applying flash sale (if active) else discount."""
+    price = price or Decimal("0")
+    if (
+        flash_sale_window_active(flash_sale_start, flash_sale_end, now)
+        and flash_sale_percent and flash_sale_percent > 0
+    ):
+        discount = Decimal(flash_sale_percent) / Decimal(100)
+        return price * (Decimal("1") - discount)
+    return compute_discounted_price(price, discount_percent)
+
+
 class Product(db.Model):
     __tablename__ = "products"
 
@@ -10,6 +40,8 @@ class Product(db.Model):
     description = db.Column(db.Text)
     price = db.Column(db.Numeric(10, 2), nullable=False)
     is_branding = db.Column(db.Boolean, default=False)
+    # Folded stock; unfolded ledger movements are added on read, see
+    # app/models/inventory.py
     stock_quantity = db.Column(db.Integer, default=0, nullable=False)
     discount_percent = db.Column(db.Integer, default=0, nullable=False)
     flash_sale_start = db.Column(db.DateTime, nullable=True)
@@ -36,47 +68,60 @@ class Product(db.Model):
     )
 
     def is_flash_sale_active(self):
-        if not self.flash_sale_start or not self.flash_sale_end:
-            return False
-        now = datetime.now()
-        return self.flash_sale_start <= now <= self.flash_sale_end
+        return flash_sale_window_active(self.flash_sale_start, self.flash_sale_end)
 
     def get_discounted_price(self):
         """Return discounted price as Decimal (non-flash)."""
-        price = self.price or Decimal("0")
-        if self.discount_percent and self.discount_percent > 0:
-            discount = Decimal(self.discount_percent) / Decimal(100)
-            return price * (Decimal("1") - discount)
-        return price
+        return compute_discounted_price(self.price, self.discount_percent)
 
     def get_effective_price(self):
         """Return price after applying flash sale (if active) else discount."""
-        price = self.price or Decimal("0")
-        if self.is_flash_sale_active() and self.flash_sale_percent and self.flash_sale_percent > 0:
-            discount = Decimal(self.flash_sale_percent) / Decimal(100)
-            return price * (Decimal("1") - discount)
-        return self.get_discounted_price()
+        return compute_effective_price(
+            self.price,
+            self.discount_percent,
+            self.flash_sale_percent,
+            self.flash_sale_start,
+            self.flash_sale_end,
+        )
+
+    def stock_levels(self):
+        """(on-hand, available) stock, from the same expressions the
+        serializers use: folded stock plus unfolded ledger movements, minus
+        active reservations for available."""
+        if self.id is None:
+            return self.stock_quantity, self.stock_quantity
+        from app.models.inventory import pending_stock_column
+        from app.models.stock_reservation import reserved_quantity_column
+
+        pending, reserved = db.session.execute(
+            db.select(pending_stock_column(), reserved_quantity_column())
+            .select_from(Product)
+            .where(Product.id == self.id)
+        ).one()
+        on_hand = self.stock_quantity + pending
+        return on_hand, on_hand - reserved
 
     def to_dict(self):
         discounted_price = self.get_discounted_price()
         effective_price = self.get_effective_price()
+        on_hand, available = self.stock_levels()
         return {
             "id": self.id,
             "name": self.name,
             "description": self.description,
-            "price": float(self.price),
+            "price": self.price,
             "is_branding": self.is_branding,
-            "stock_quantity": self.stock_quantity,
+            "stock_quantity": on_hand,
             "discount_percent": self.discount_percent,
-            "discounted_price": float(discounted_price) if self.discount_percent else None,
-            "effective_price": float(effective_price),
+            "discounted_price": discounted_price if self.discount_percent else None,
+            "effective_price": effective_price,
             "flash_sale_active": self.is_flash_sale_active(),
             "flash_sale_percent": self.flash_sale_percent,
-            "flash_sale_start": self.flash_sale_start.isoformat() if self.flash_sale_start else None,
-            "flash_sale_end": self.flash_sale_end.isoformat() if self.flash_sale_end else None,
+            "flash_sale_start": self.flash_sale_start,
+            "flash_sale_end": self.flash_sale_end,
             "rating_avg": round(self.rating_sum / self.rating_count, 2) if self.rating_count > 0 else 0,
             "rating_count": self.rating_count,
-            "in_stock": self.stock_quantity > 0,
+            "in_stock": available > 0,
             "category": {
                 "id": self.category.id,
                 "name": self.category.name,
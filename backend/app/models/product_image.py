@@ -1,5 +1,6 @@
 from datetime import datetime
-from app.extensions import db 
+from app.extensions import db
+from app.utils.image_urls import image_variants
 
 class ProductImage(db.Model):  # ← Changed from "Product" to "ProductImage"
     __tablename__ = "product_images"
@@ -18,5 +19,6 @@ class ProductImage(db.Model):  # ← Changed from "Product" to "ProductImage"
             "id": self.id,
             "image_url": self.image_url,
             "is_primary": self.is_primary,
-            "position": self.position
+            "position": self.position,
+            **image_variants(self.image_url),
         }
\ No newline at end of file
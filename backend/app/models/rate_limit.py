@@ -0,0 +1,14 @@
+from app.extensions import db
+
+
+class RateLimitCounter(db.Model):
+    """Rate limit window counters for the "database://" limiter storage."""
+    __tablename__ = "rate_limit_counters"
+
+    key = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    # Unix timestamp; rows past it are treated as absent and purged lazily.
+    expires_at = db.Column(db.Float, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RateLimitCounter {self.key} = {self.count}>"
@@ -0,0 +1,29 @@
+from app.extensions import db
+from datetime import datetime
+
+
+class RelatedProduct(db.Model):
+    """Precomputed "related products" list, rebuilt by `flask related rebuild`."""
+    __tablename__ = "product_related"
+    __table_args__ = (
+        db.UniqueConstraint("product_id", "related_product_id", name="uq_product_related_pair"),
+        db.Index("ix_product_related_product_rank", "product_id", "rank"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(
+        db.Integer,
+        db.ForeignKey("products.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    related_product_id = db.Column(
+        db.Integer,
+        db.ForeignKey("products.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    rank = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<RelatedProduct {self.product_id} -> {self.related_product_id} #{self.rank}>"
@@ -0,0 +1,52 @@
+from app.extensions import db
+from app.models.product import Product
+from datetime import datetime
+
+
+class StockReservation(db.Model):
+    """Stock held for an unpaid order until it is paid, cancelled or expires.
+
+    Available stock is on-hand stock minus the active reservations for the
+    product; on-hand stock only drops when a reservation is committed
+    (payment received or the order is fulfilled) and a sale is recorded.
+    """
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # Covers the SUM(quantity) per product over active reservations
+        db.Index("ix_stock_reservations_product_status", "product_id", "status", "quantity"),
+        db.Index("ix_stock_reservations_status_expires", "status", "expires_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(
+        db.Integer, db.ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    product_id = db.Column(
+        db.Integer, db.ForeignKey("products.id", ondelete="CASCADE"), nullable=False
+    )
+    quantity = db.Column(db.Integer, nullable=False)
+
+    # active -> committed | released
+    status = db.Column(db.String(20), nullable=False, default="active")
+    release_reason = db.Column(db.String(30))
+
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    resolved_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<StockReservation order={self.order_id} product={self.product_id} x{self.quantity} {self.status}>"
+
+
+def reserved_quantity_column():
+    """Correlated SUM of active reservations for the enclosing Product row."""
+    return (
+        db.select(db.func.coalesce(db.func.sum(StockReservation.quantity), 0))
+        .where(
+            StockReservation.product_id == Product.id,
+            StockReservation.status == "active",
+        )
+        .correlate(Product)
+        .scalar_subquery()
+        .label("reserved_quantity")
+    )
@@ -3,6 +3,19 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.extensions import db
 from app.models.payment import Payment
 from app.models.order import Order
+from app.models.mpesa_callback import MpesaCallback
+from app.services.mpesa_callbacks import replay_callbacks
+from app.services.payment_events import publish_payment_event
+from app.services.stock_reservations import commit_reservations, reopen_reservations_for_orders
+from app.services.order_status import (
+    AWAITING_PAYMENT_STATUSES,
+    CANCELLED,
+    FULFILMENT_STATUSES,
+    PENDING,
+    PROCESSING,
+    can_transition,
+)
+from app.utils.db_routing import read_replica
 from datetime import datetime
 
 admin_payment_bp = Blueprint("admin_payments", __name__)
@@ -25,6 +38,7 @@ def test_route():
 
 @admin_payment_bp.route("", methods=["GET", "OPTIONS"])
 @jwt_required()
+@read_replica
 def get_all_payments():
     """
     Get all payments with order and customer details
@@ -87,6 +101,7 @@ def get_all_payments():
 
 @admin_payment_bp.route("/stats", methods=["GET", "OPTIONS"])
 @jwt_required()
+@read_replica
 def get_payment_stats():
     """
     Get payment statistics for dashboard
@@ -146,22 +161,34 @@ def update_payment_status(payment_id):
         }), 400
 
     payment = Payment.query.get_or_404(payment_id)
+    order = payment.order
+    if new_status == "PAID" and order and order.status == CANCELLED:
+        return jsonify({"error": "Cannot mark the payment of a cancelled order as PAID"}), 409
+
     old_status = payment.status
     payment.status = new_status
 
     if new_status == "PAID":
         if not payment.paid_at:
             payment.paid_at = datetime.utcnow()
-        # If order is still pending, move to processing
-        if payment.order and payment.order.status == "pending":
-            payment.order.status = "processing"
+        # An order still waiting for its payment moves on to processing
+        if (order and order.status in AWAITING_PAYMENT_STATUSES
+                and can_transition(order.status, PROCESSING)):
+            order.status = PROCESSING
+        commit_reservations(payment.order_id)
     else:
         payment.paid_at = None
-        if payment.order and payment.order.status == "processing":
-            payment.order.status = "pending"
+        # Reversing the payment of an order not yet shipped puts it back to
+        # pending; its sold stock is returned and held again
+        if (order and order.status in FULFILMENT_STATUSES
+                and can_transition(order.status, PENDING)):
+            order.status = PENDING
+            reopen_reservations_for_orders([payment.order_id])
 
     try:
         db.session.commit()
+        if order:
+            publish_payment_event(order)
         return jsonify({
             "message": "Payment status updated",
             "payment_id": payment.id,
@@ -174,3 +201,61 @@ def update_payment_status(payment_id):
             "error": "Failed to update payment status",
             "details": str(e)
         }), 500
+
+
+@admin_payment_bp.route("/mpesa-callbacks", methods=["GET"])
+@jwt_required()
+@read_replica
+def list_mpesa_callbacks():
+    """
+    Stored M-Pesa callbacks, newest first.
+
+    Query: status (received/processed/rejected/failed), checkout_request_id,
+    limit (default 50, max 200).
+    """
+    auth_error = _require_admin()
+    if auth_error:
+        return auth_error
+
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 200)
+    query = MpesaCallback.query
+    status = request.args.get("status")
+    if status:
+        query = query.filter(MpesaCallback.status == status)
+    checkout_request_id = request.args.get("checkout_request_id")
+    if checkout_request_id:
+        query = query.filter(MpesaCallback.checkout_request_id == checkout_request_id)
+
+    entries = query.order_by(MpesaCallback.id.desc()).limit(limit).all()
+    return jsonify([entry.to_dict() for entry in entries]), 200
+
+
+@admin_payment_bp.route("/mpesa-callbacks/replay", methods=["POST"])
+@jwt_required()
+def replay_mpesa_callbacks():
+    """
+    Reprocess failed M-Pesa callbacks.
+
+    Expected JSON (all optional): {"ids": [1, 2], "batch_size": 50,
+    "include_rejected": false}. Replays one batch per request; use
+    `flask mpesa replay` to drain a large backlog.
+    """
+    auth_error = _require_admin()
+    if auth_error:
+        return auth_error
+
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids") or []
+    if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+        return jsonify({"error": "ids must be a list of integers"}), 400
+    batch_size = data.get("batch_size", 50)
+    if not isinstance(batch_size, int) or not 1 <= batch_size <= 200:
+        return jsonify({"error": "batch_size must be between 1 and 200"}), 400
+
+    counts = replay_callbacks(
+        batch_size=batch_size,
+        max_batches=1,
+        ids=ids,
+        include_rejected=bool(data.get("include_rejected")),
+    )
+    return jsonify(counts), 200
@@ -1,8 +1,16 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from datetime import date
+import math
+from sqlalchemy import func, or_, select
 from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.payment import Payment
 from app.models.product import Product
 from app.models.branding import BrandingDetail
+from app.extensions import db
+from app.utils.db_health import pool_stats
+from app.utils.db_routing import read_replica
 
 admin_bp = Blueprint("admin", __name__)
 
@@ -17,6 +25,7 @@ def admin_required():
 
 @admin_bp.route("/dashboard-stats", methods=["GET"])
 @jwt_required()
+@read_replica
 def dashboard_stats():
     """Get dashboard statistics - protected route"""
     # Check if user is admin
@@ -43,3 +52,154 @@ def dashboard_stats():
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+@admin_bp.route("/db-pool", methods=["GET"])
+@jwt_required()
+def db_pool_stats():
+    """Connection pool counters for this worker process"""
+    auth_error = admin_required()
+    if auth_error:
+        return auth_error
+
+    return jsonify(pool_stats(db.engine)), 200
+
+
+def _parse_date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None, None
+    try:
+        return date.fromisoformat(value), None
+    except ValueError:
+        return None, (jsonify({"error": f"{name} must be a date (YYYY-MM-DD)"}), 400)
+
+
+def _branding_filters():
+    """WHERE clauses for ?status=a,b&deadline_from=&deadline_to=&q="""
+    filters = []
+    statuses = [s.strip() for s in request.args.get("status", "").split(",") if s.strip()]
+    if statuses:
+        filters.append(Order.status.in_(statuses))
+
+    deadline_from, error = _parse_date_arg("deadline_from")
+    if error:
+        return None, error
+    deadline_to, error = _parse_date_arg("deadline_to")
+    if error:
+        return None, error
+    if deadline_from:
+        filters.append(BrandingDetail.deadline >= deadline_from)
+    if deadline_to:
+        filters.append(BrandingDetail.deadline <= deadline_to)
+
+    search = request.args.get("q", "").strip()
+    if search:
+        term = f"%{search}%"
+        clauses = [Order.customer_name.ilike(term), Order.phone.ilike(term)]
+        if search.isdigit():
+            clauses.append(Order.id == int(search))
+        filters.append(or_(*clauses))
+    return filters, None
+
+
+@admin_bp.route("/branding-requests", methods=["GET"])
+@jwt_required()
+@read_replica
+def branding_requests():
+    """Paginated orders with branding details, soonest deadline first"""
+    auth_error = admin_required()
+    if auth_error:
+        return auth_error
+
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        per_page = min(max(int(request.args.get("per_page", 20)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "page and per_page must be integers"}), 400
+
+    filters, error = _branding_filters()
+    if error:
+        return error
+
+    base = (
+        select(BrandingDetail)
+        .join(Order, Order.id == BrandingDetail.order_id)
+        .where(*filters)
+    )
+    total = db.session.scalar(
+        select(func.count()).select_from(base.subquery())
+    )
+
+    rows = db.session.execute(
+        select(
+            Order.id,
+            Order.customer_name,
+            Order.phone,
+            Order.email,
+            Order.address,
+            Order.total,
+            Order.status,
+            Order.created_at,
+            BrandingDetail.logo,
+            BrandingDetail.colors,
+            BrandingDetail.notes,
+            BrandingDetail.deadline,
+            Payment.method.label("payment_method"),
+            Payment.status.label("payment_status"),
+        )
+        .select_from(BrandingDetail)
+        .join(Order, Order.id == BrandingDetail.order_id)
+        .outerjoin(Payment, Payment.order_id == Order.id)
+        .where(*filters)
+        .order_by(BrandingDetail.deadline.asc().nulls_last(), Order.id.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+    ).all()
+
+    items_by_order = {row.id: [] for row in rows}
+    if items_by_order:
+        for item in db.session.execute(
+            select(OrderItem.order_id, OrderItem.name, OrderItem.price, OrderItem.qty)
+            .where(OrderItem.order_id.in_(items_by_order))
+            .order_by(OrderItem.id)
+        ):
+            items_by_order[item.order_id].append({
+                "name": item.name,
+                "price": item.price or 0,
+                "qty": item.qty,
+                "subtotal": item.price * item.qty if item.price is not None else 0,
+            })
+
+    return jsonify({
+        "items": [
+            {
+                "id": row.id,
+                "customer": {
+                    "name": row.customer_name,
+                    "phone": row.phone,
+                    "email": row.email,
+                    "address": row.address,
+                },
+                "items": items_by_order[row.id],
+                "branding": {
+                    "logo": row.logo,
+                    "colors": row.colors,
+                    "notes": row.notes,
+                    "deadline": row.deadline,
+                },
+                "total": row.total,
+                "payment": (
+                    {"method": row.payment_method, "status": row.payment_status}
+                    if row.payment_method else None
+                ),
+                "status": row.status,
+                "created_at": row.created_at,
+            }
+            for row in rows
+        ],
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "total_pages": max(1, math.ceil(total / per_page)) if total else 1,
+    }), 200
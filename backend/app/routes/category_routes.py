@@ -1,9 +1,11 @@
 from flask import Blueprint, jsonify
 from app.models.category import Category
+from app.utils.db_routing import read_replica
 
 category_bp = Blueprint("categories", __name__)
 
 @category_bp.route("/", methods=["GET"])
+@read_replica
 def get_categories():
     categories = Category.query.all()
     return jsonify([
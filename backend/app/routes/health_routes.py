@@ -0,0 +1,28 @@
+from flask import Blueprint, current_app, jsonify
+from app.extensions import db, limiter
+from app.utils.db_health import check_database
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.route("", methods=["GET"])
+@limiter.exempt
+def liveness():
+    """Process is up; does not touch the database."""
+    return jsonify({"status": "ok"}), 200
+
+
+@health_bp.route("/ready", methods=["GET"])
+@limiter.exempt
+def readiness():
+    """Ready to serve traffic: the primary database answers SELECT 1."""
+    ok, latency_ms, error = check_database(db.engine)
+    if not ok:
+        current_app.logger.warning("Readiness check failed: %s", error)
+        return jsonify({"status": "unavailable", "database": "down"}), 503
+
+    return jsonify({
+        "status": "ok",
+        "database": "up",
+        "latency_ms": round(latency_ms, 2),
+    }), 200
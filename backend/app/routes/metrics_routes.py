@@ -0,0 +1,24 @@
+from flask import Blueprint, Response, current_app, jsonify, request
+from app.extensions import limiter
+from app.utils.metrics import render_metrics
+import hmac
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+@limiter.exempt
+def metrics():
+    """Prometheus scrape endpoint.
+
+    If METRICS_TOKEN is configured the scraper must send it as a bearer token.
+    """
+    expected = current_app.config.get("METRICS_TOKEN")
+    if expected:
+        auth = request.headers.get("Authorization", "")
+        token = auth[7:] if auth.startswith("Bearer ") else ""
+        if not hmac.compare_digest(token, expected):
+            return jsonify({"error": "Unauthorized"}), 401
+
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
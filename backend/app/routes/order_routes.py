@@ -1,16 +1,51 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from app.extensions import db
+from app.extensions import db, limiter
 from app.models.order import Order
 from app.models.order_item import OrderItem
 from app.models.branding import BrandingDetail
-from app.models.product import Product
 from app.models.payment import Payment
 from datetime import datetime
-import cloudinary.uploader
+from sqlalchemy import select, update
+import hmac
 import secrets
-from app.utils.email import send_email_smtp, build_order_confirmation_html
-from app.services.whatsapp import send_order_whatsapp_notification
+from app.utils.metrics import ORDERS_CREATED
+from app.services.image_uploads import PASSTHROUGH_EXTENSIONS, upload_images
+from app.services.asset_cleanup import queue_asset_deletion
+from app.services.signed_uploads import UploadVerificationError, sign_upload, verify_upload
+from app.services.co_purchase import record_order
+from app.services.notifications import ORDER_CREATED
+from app.services.outbox import enqueue_event
+from app.utils.idempotency import idempotent, not_replayable
+from app.services.inventory import pending_deltas
+from app.services.pricing import (
+    QuoteError,
+    delivery_fee_for,
+    load_quote,
+    parse_cart,
+    quote_cart,
+    sign_quote,
+    unit_price,
+)
+from app.services.stock_reservations import (
+    available_quantity,
+    commit_reservations,
+    commit_reservations_for_orders,
+    lock_products,
+    release_reservations,
+    release_reservations_for_orders,
+    reopen_reservations_for_orders,
+    reserve_stock,
+    reserved_quantities,
+)
+from app.services.order_status import (
+    ADMIN_STATUSES,
+    CANCELLED,
+    FULFILMENT_STATUSES,
+    PENDING,
+    allowed_from,
+    can_transition,
+)
 
 order_bp = Blueprint("orders", __name__)
 
@@ -25,11 +60,31 @@ def _require_admin():
         return jsonify({"error": "Admin access required"}), 403
     return None
 
-def send_order_email(to_email, subject, html_body):
-    send_email_smtp(to_email, subject, html_body)
+@order_bp.route("/quote", methods=["POST"])
+@limiter.limit("120 per minute")
+def quote_order():
+    """
+    Price a cart without creating an order.
+
+    Expected JSON: {"items": [{"product_id": 1, "qty": 2}, ...]}
+    Returns per-line effective prices and stock, the delivery fee and
+    totals. When every line can be ordered, quote_token can be passed to
+    POST /api/orders to keep these prices for ORDER_QUOTE_TTL_SECONDS.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        lines = parse_cart(data.get("items"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    quote = quote_cart(lines)
+    quote["quote_token"] = sign_quote(quote) if quote["orderable"] else None
+    quote["expires_in"] = current_app.config.get("ORDER_QUOTE_TTL_SECONDS", 600)
+    return jsonify(quote)
 
 
 @order_bp.route("", methods=["POST"])
+@idempotent("orders.create")
 def create_order():
     data = request.get_json()
 
@@ -49,10 +104,20 @@ def create_order():
             "error": f"Missing customer fields: {', '.join(missing_fields)}"
         }), 400
 
-    if not items:
-        return jsonify({"error": "No items in order"}), 400
+    try:
+        lines = parse_cart(items)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     try:
+        # A quote from POST /api/orders/quote fixes the prices for this cart
+        quoted_prices, quoted_delivery_fee = None, None
+        if data.get("quote_token"):
+            try:
+                quoted_prices, quoted_delivery_fee = load_quote(data["quote_token"], lines)
+            except QuoteError as e:
+                return jsonify({"error": str(e), "requote": True}), 409
+
         # 1️⃣ Create order
         order = Order(
             customer_name=customer["name"],
@@ -60,7 +125,7 @@ def create_order():
             email=customer.get("email"),
             address=customer["address"],
             total=0,
-            status="pending",
+            status=PENDING,
             order_access_token=secrets.token_urlsafe(32),
         )
 
@@ -69,6 +134,14 @@ def create_order():
 
         calculated_total = 0
         created_items = []
+        reserved_lines = []
+
+        # Lock the products and read what other unpaid orders hold
+        products = lock_products([
+            item.get("product_id") for item in items if item.get("product_id")
+        ])
+        reserved = reserved_quantities(list(products))
+        pending = pending_deltas(list(products))
 
         # 2️⃣ Create order items
         for item in items:
@@ -81,22 +154,28 @@ def create_order():
                     "error": "Invalid product_id or quantity"
                 }), 400
 
-            product = Product.query.get(product_id)
+            product = products.get(product_id)
             if not product:
                 db.session.rollback()
                 return jsonify({
                     "error": f"Product with ID {product_id} not found"
                 }), 404
 
-            # Stock validation
-            if product.stock_quantity is not None and product.stock_quantity < qty:
+            # Stock validation against on-hand minus active reservations
+            available = available_quantity(product, reserved, pending)
+            if available < qty:
                 db.session.rollback()
+                not_replayable()
                 return jsonify({
                     "error": f"Insufficient stock for {product.name}",
-                    "available": product.stock_quantity
+                    "available": max(available, 0)
                 }), 400
+            reserved[product.id] = reserved.get(product.id, 0) + qty
 
-            effective_price = product.get_effective_price()
+            if quoted_prices is not None:
+                effective_price = quoted_prices[product.id]
+            else:
+                effective_price = unit_price(product.get_effective_price())
 
             line_total = effective_price * qty
             calculated_total += line_total
@@ -114,11 +193,13 @@ def create_order():
                 "price": float(effective_price),
                 "qty": qty
             })
-            if product.stock_quantity is not None:
-                product.stock_quantity = product.stock_quantity - qty
+            reserved_lines.append((product.id, qty))
 
         # 3️⃣ Update total
-        delivery_fee = 0 if calculated_total >= 5000 else 500
+        if quoted_delivery_fee is not None:
+            delivery_fee = quoted_delivery_fee
+        else:
+            delivery_fee = delivery_fee_for(calculated_total)
         order.total = calculated_total + delivery_fee
 
         # 4️⃣ Create payment record
@@ -129,6 +210,9 @@ def create_order():
         )
         db.session.add(payment)
 
+        # Hold the stock until the order is paid, cancelled or times out
+        reserve_stock(order.id, reserved_lines)
+
         # 5️⃣ Branding (optional)
         branding = data.get("branding")
         if branding:
@@ -141,21 +225,24 @@ def create_order():
             )
             db.session.add(branding_detail)
 
-        db.session.commit()
+        # Confirmation email, owner WhatsApp and webhooks go out through
+        # the outbox, committed together with the order
+        enqueue_event(
+            ORDER_CREATED,
+            order.id,
+            {"items": created_items, "delivery_fee": float(delivery_fee)},
+            dedup_key=f"{ORDER_CREATED}:{order.id}",
+        )
 
-        # Send order confirmation email (non-blocking)
-        try:
-            if order.email:
-                email_body = build_order_confirmation_html(order)
-                send_order_email(order.email, "Your SmartNest Order Confirmation", email_body)
-        except Exception as e:
-            print(f"Order email failed: {str(e)}")
+        db.session.commit()
+        ORDERS_CREATED.inc()
 
-        # Notify owner via WhatsApp (non-blocking)
+        # Update the co-purchase index (non-blocking)
         try:
-            send_order_whatsapp_notification(order, created_items, delivery_fee)
+            record_order([item["product_id"] for item in items])
         except Exception as e:
-            print(f"WhatsApp notification failed: {str(e)}")
+            db.session.rollback()
+            print(f"Co-purchase index update failed: {str(e)}")
 
         return jsonify({
             "message": "Order placed successfully",
@@ -285,6 +372,97 @@ def get_order_detail(order_id):
     })
 
 
+MAX_BULK_STATUS_ORDERS = 500
+
+
+@order_bp.route("/status", methods=["PUT"])
+@jwt_required()
+def bulk_update_order_status():
+    """
+    Move many orders to one status in a single UPDATE.
+
+    Expected JSON: {"order_ids": [1, 2, 3], "status": "shipped"}
+    Each order gets a result: updated, unchanged (already in that status),
+    or an error (not found / transition not allowed).
+    """
+    auth_error = _require_admin()
+    if auth_error:
+        return auth_error
+    data = request.get_json(silent=True) or {}
+
+    new_status = data.get("status")
+    if new_status not in ADMIN_STATUSES:
+        return jsonify({
+            "error": f"Invalid status. Must be one of: {', '.join(ADMIN_STATUSES)}"
+        }), 400
+
+    order_ids = data.get("order_ids")
+    if (
+        not isinstance(order_ids, list) or not order_ids
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in order_ids)
+    ):
+        return jsonify({"error": "order_ids must be a non-empty list of integers"}), 400
+    order_ids = list(dict.fromkeys(order_ids))
+    if len(order_ids) > MAX_BULK_STATUS_ORDERS:
+        return jsonify({"error": f"At most {MAX_BULK_STATUS_ORDERS} orders per request"}), 400
+
+    current = dict(db.session.execute(
+        select(Order.id, Order.status).where(Order.id.in_(order_ids))
+    ).all())
+    eligible = [
+        order_id for order_id in order_ids
+        if order_id in current and can_transition(current[order_id], new_status)
+    ]
+
+    try:
+        updated = set()
+        if eligible:
+            # The status guard skips orders changed since they were read
+            updated = set(db.session.scalars(
+                update(Order)
+                .where(Order.id.in_(eligible), Order.status.in_(allowed_from(new_status)))
+                .values(status=new_status, updated_at=datetime.utcnow())
+                .returning(Order.id)
+                .execution_options(synchronize_session=False)
+            ))
+            if new_status in FULFILMENT_STATUSES:
+                commit_reservations_for_orders(sorted(updated))
+            elif new_status == CANCELLED:
+                release_reservations_for_orders(sorted(updated), "cancelled")
+            elif new_status == PENDING:
+                reopen_reservations_for_orders(sorted(updated))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "error": "Failed to update status",
+            "details": str(e)
+        }), 500
+
+    results = []
+    for order_id in order_ids:
+        old_status = current.get(order_id)
+        result = {"order_id": order_id, "old_status": old_status}
+        if old_status is None:
+            result.update(ok=False, error="Order not found")
+        elif order_id in updated:
+            result.update(ok=True, new_status=new_status)
+        elif old_status == new_status:
+            result.update(ok=True, new_status=new_status, unchanged=True)
+        elif order_id in eligible:
+            result.update(ok=False, error="Order status changed concurrently; retry")
+        else:
+            result.update(ok=False, error=f"Cannot change status from '{old_status}' to '{new_status}'")
+        results.append(result)
+
+    return jsonify({
+        "status": new_status,
+        "updated": len(updated),
+        "failed": sum(1 for r in results if not r["ok"]),
+        "results": results,
+    })
+
+
 @order_bp.route("/<int:order_id>/status", methods=["PUT"])
 @jwt_required()
 def update_order_status(order_id):
@@ -297,19 +475,29 @@ def update_order_status(order_id):
         return jsonify({"error": "Status is required"}), 400
 
     # Validate status
-    valid_statuses = ["pending", "processing", "shipped", "delivered", "cancelled"]
     new_status = data["status"]
     
-    if new_status not in valid_statuses:
+    if new_status not in ADMIN_STATUSES:
         return jsonify({
-            "error": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
+            "error": f"Invalid status. Must be one of: {', '.join(ADMIN_STATUSES)}"
         }), 400
 
     order = Order.query.get_or_404(order_id)
     old_status = order.status
+    if old_status != new_status and not can_transition(old_status, new_status):
+        return jsonify({
+            "error": f"Cannot change status from '{old_status}' to '{new_status}'"
+        }), 409
     order.status = new_status
 
     try:
+        # Fulfilment takes the held stock; cancelling gives it back
+        if new_status in FULFILMENT_STATUSES:
+            commit_reservations(order.id)
+        elif new_status == CANCELLED:
+            release_reservations(order.id, "cancelled")
+        elif new_status == PENDING and old_status != PENDING:
+            reopen_reservations_for_orders([order.id])
         db.session.commit()
         
         return jsonify({
@@ -337,15 +525,16 @@ def cancel_order(order_id):
     order = Order.query.get_or_404(order_id)
     
     # Only allow cancellation of pending orders
-    if order.status not in ["pending", "cancelled"]:
+    if order.status not in (PENDING, CANCELLED):
         return jsonify({
             "error": f"Cannot cancel order with status '{order.status}'"
         }), 400
     
     try:
-        order.status = "cancelled"
+        order.status = CANCELLED
         if order.payment:
             order.payment.status = "CANCELLED"
+        release_reservations(order.id, "cancelled")
         db.session.commit()
         
         return jsonify({
@@ -377,25 +566,24 @@ def upload_branding_logo(order_id):
         return jsonify({"error": "Invalid file type. Allowed: png, jpg, jpeg, gif, svg"}), 400
     
     try:
-        # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
-            file,
+        # Logos are printed, so keep the source format (PNG stays lossless,
+        # JPEG is re-encoded at IMAGE_QUALITY) while stripping metadata and
+        # capping the size. SVG and GIF logos are uploaded unchanged.
+        [upload] = upload_images(
+            [file],
+            output_format=None,
+            passthrough=PASSTHROUGH_EXTENSIONS,
+            max_dimension=current_app.config.get("IMAGE_LOGO_MAX_DIMENSION", 4000),
             folder="smartnest/branding_logos",
             allowed_formats=['png', 'jpg', 'jpeg', 'gif', 'svg']
         )
+        if not upload["ok"]:
+            if upload["reason"] == "invalid":
+                return jsonify({"error": upload["error"]}), 400
+            raise RuntimeError(upload["error"])
 
-        logo_url = result['secure_url']
-
-        # Update or create branding detail
-        if order.branding:
-            order.branding.logo = logo_url
-        else:
-            branding = BrandingDetail(
-                order_id=order.id,
-                logo=logo_url
-            )
-            db.session.add(branding)
-
+        logo_url = upload["result"]['secure_url']
+        _set_branding_logo(order, logo_url)
         db.session.commit()
 
         return jsonify({
@@ -409,4 +597,67 @@ def upload_branding_logo(order_id):
         return jsonify({
             "error": "Failed to upload logo",
             "details": str(e)
-        }), 500    
+        }), 500
+
+
+def _set_branding_logo(order, logo_url):
+    """Update or create the order's branding detail with a logo URL."""
+    if order.branding:
+        if order.branding.logo and order.branding.logo != logo_url:
+            queue_asset_deletion(order.branding.logo, "logo_replaced")
+        order.branding.logo = logo_url
+    else:
+        branding = BrandingDetail(
+            order_id=order.id,
+            logo=logo_url
+        )
+        db.session.add(branding)
+
+
+def _branding_folder(order_id):
+    return f"smartnest/branding_logos/{order_id}"
+
+
+def _order_token_valid(order):
+    token = (
+        request.headers.get("X-Order-Token")
+        or (request.get_json(silent=True) or {}).get("order_token")
+    )
+    return bool(token) and hmac.compare_digest(str(token), order.order_access_token or "")
+
+
+@order_bp.route("/<int:order_id>/branding/logo/sign", methods=["POST"])
+def sign_branding_logo_upload(order_id):
+    """Signed parameters for uploading a logo straight to Cloudinary"""
+    order = Order.query.get_or_404(order_id)
+    if not _order_token_valid(order):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    max_dimension = current_app.config.get("IMAGE_LOGO_MAX_DIMENSION", 4000)
+    return jsonify(sign_upload(
+        _branding_folder(order.id),
+        allowed_formats=sorted(ALLOWED_EXTENSIONS),
+        transformation=f"c_limit,w_{max_dimension},h_{max_dimension}",
+    )), 200
+
+
+@order_bp.route("/<int:order_id>/branding/logo/register", methods=["POST"])
+def register_branding_logo(order_id):
+    """Attach a logo uploaded directly to Cloudinary to the order"""
+    order = Order.query.get_or_404(order_id)
+    if not _order_token_valid(order):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        logo_url = verify_upload(data, _branding_folder(order.id))
+    except UploadVerificationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    _set_branding_logo(order, logo_url)
+    db.session.commit()
+
+    return jsonify({
+        "message": "Logo uploaded successfully",
+        "logo_url": logo_url
+    }), 200
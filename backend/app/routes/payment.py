@@ -1,14 +1,27 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.extensions import db, limiter
 from app.models.order import Order
 from app.models.payment import Payment
 from app.services.mpesa import stk_push, query_stk_status
-from app.utils.email import send_email_smtp, build_payment_confirmation_html
-from datetime import datetime
+from app.services.mpesa_callbacks import OUTCOME_STATUS, PROCESSED, process_callback, store_callback
+from app.utils.metrics import STK_PUSHES, MPESA_CALLBACKS
+from app.utils.idempotency import idempotent, not_replayable
+from app.services.stock_reservations import commit_reservations, rehold_reservations
+from app.services.order_status import CANCELLED, CONFIRMED, can_transition
+from app.services.payment_events import (
+    is_final_status,
+    payment_status_payload,
+    publish_payment_event,
+    subscribe_payment_events,
+)
+from datetime import datetime, timedelta
+from sqlalchemy import or_, update
+import json
+import queue
+import time
 import traceback
 import logging
-from decimal import Decimal, InvalidOperation
 import os
 
 payment_bp = Blueprint("payments", __name__)
@@ -23,30 +36,53 @@ def _get_order_token():
     )
 
 
-def _normalize_phone(phone):
-    if not phone:
-        return None
-    p = str(phone).strip()
-    if p.startswith("+"):
-        p = p[1:]
-    if p.startswith("0"):
-        p = "254" + p[1:]
-    elif not p.startswith("254"):
-        p = "254" + p
-    return p
+def _claim_stk_slot(payment):
+    """
+    Atomically mark an STK push as in flight for this payment.
+    Returns False if another push was started less than
+    STK_INFLIGHT_SECONDS ago.
+    """
+    now = datetime.utcnow()
+    window = timedelta(seconds=current_app.config.get("STK_INFLIGHT_SECONDS", 90))
+    result = db.session.execute(
+        update(Payment)
+        .where(
+            Payment.id == payment.id,
+            or_(Payment.stk_requested_at.is_(None), Payment.stk_requested_at < now - window),
+        )
+        .values(stk_requested_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
 
 
-def _amounts_match(a, b):
-    try:
-        da = Decimal(str(a)).quantize(Decimal("0.01"))
-        dbv = Decimal(str(b)).quantize(Decimal("0.01"))
-        return da == dbv
-    except (InvalidOperation, TypeError):
-        return False
+def _out_of_stock_response(short):
+    """409 for an order whose lapsed stock hold could not be taken again."""
+    return jsonify({
+        "success": False,
+        "error": "Some items in this order are no longer in stock",
+        "unavailable": [
+            {"product_id": product_id, "available": available}
+            for product_id, available in sorted(short.items())
+        ],
+    }), 409
+
+
+def _release_stk_slot(payment):
+    db.session.rollback()
+    db.session.execute(
+        update(Payment)
+        .where(Payment.id == payment.id)
+        .values(stk_requested_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
 
 
 @payment_bp.route("/mpesa/stk", methods=["POST"])
 @limiter.limit("5 per minute")
+@idempotent("payments.stk")
 def initiate_stk():
     """
     Initiate M-Pesa STK Push
@@ -78,6 +114,9 @@ def initiate_stk():
     order_token = _get_order_token()
     if not order_token or order_token != order.order_access_token:
         return jsonify({"error": "Unauthorized"}), 403
+
+    if order.status == CANCELLED:
+        return jsonify({"error": "Order was cancelled"}), 409
     
     # Get or create payment record
     payment = order.payment
@@ -93,6 +132,25 @@ def initiate_stk():
     # Check if already paid
     if payment.status == "PAID":
         return jsonify({"error": "Order already paid"}), 400
+
+    # A retry after a failed push or a timeout needs the stock held again.
+    # The payment is pending once more, so the sweeper leaves the new hold
+    # alone; _claim_stk_slot commits both.
+    short = rehold_reservations(order.id)
+    if short:
+        db.session.rollback()
+        return _out_of_stock_response(short)
+    if payment.status in ("FAILED", "CANCELLED"):
+        payment.status = "PENDING"
+
+    # Refuse a second prompt while the customer may still be answering one
+    if not _claim_stk_slot(payment):
+        STK_PUSHES.labels("in_flight").inc()
+        return jsonify({
+            "success": False,
+            "error": "A payment prompt was already sent to your phone. Complete it or wait a moment before retrying.",
+            "checkout_request_id": payment.mpesa_checkout_id,
+        }), 409
     
     # Initiate STK Push
     try:
@@ -107,6 +165,7 @@ def initiate_stk():
             payment.mpesa_checkout_id = result["checkout_request_id"]
             payment.status = "PENDING"
             db.session.commit()
+            STK_PUSHES.labels("accepted").inc()
             return jsonify({
                 "success": True,
                 "message": "STK push sent successfully",
@@ -114,6 +173,9 @@ def initiate_stk():
                 "customer_message": result.get("customer_message")
             }), 200
         else:
+            STK_PUSHES.labels("rejected").inc()
+            _release_stk_slot(payment)
+            not_replayable()
             return jsonify({
                 "success": False,
                 "error": result.get("error", "Failed to initiate payment")
@@ -121,6 +183,11 @@ def initiate_stk():
     
     except Exception as e:
         db.session.rollback()
+        STK_PUSHES.labels("error").inc()
+        try:
+            _release_stk_slot(payment)
+        except Exception:
+            db.session.rollback()
         logger.error("STK Push Error: %s", str(e))
         traceback.print_exc()
         return jsonify({
@@ -143,135 +210,37 @@ def mpesa_callback():
     if request.method == "OPTIONS":
         return jsonify({"ResultCode": 0, "ResultDesc": "Success"}), 200
     
-    # Use a separate try-catch to ensure we ALWAYS return 200
+    # Store first: once the raw callback is committed it can always be
+    # replayed (`flask mpesa replay`), whatever happens while processing it
     try:
-        # Get callback data
-        data = request.get_json()
-        
-        # Log the callback
+        data = request.get_json(silent=True)
+        if data is None:
+            data = {"raw": request.get_data(as_text=True)[:10000]}
+
         logger.info("M-Pesa callback received at %s", datetime.now().isoformat())
-        
-        # Validate data structure
-        if not data or "Body" not in data:
-            logger.warning("Invalid callback structure - missing Body")
-            return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"}), 200
-        
-        # Extract STK callback data
-        stk_callback = data.get("Body", {}).get("stkCallback", {})
-        
-        if not stk_callback:
-            logger.warning("Invalid callback structure - missing stkCallback")
-            return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"}), 200
-        
-        # Extract key fields
-        result_code = stk_callback.get("ResultCode")
-        result_desc = stk_callback.get("ResultDesc")
-        checkout_request_id = stk_callback.get("CheckoutRequestID")
-        merchant_request_id = stk_callback.get("MerchantRequestID")
-        
-        logger.info("Callback IDs received for checkout %s", checkout_request_id)
-        
-        # Find payment by checkout request ID
-        payment = Payment.query.filter_by(
-            mpesa_checkout_id=checkout_request_id
-        ).first()
-        
-        if not payment:
-            logger.warning("Payment not found for CheckoutRequestID: %s", checkout_request_id)
-            # Still return 200 - this is not an error from M-Pesa's perspective
-            return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"}), 200
-        
-        if payment.status == "PAID":
-            return jsonify({"ResultCode": 0, "ResultDesc": "Success"}), 200
-        
-        # Process based on result code
-        if result_code == 0:
-            # Extract callback metadata
-            callback_metadata = stk_callback.get("CallbackMetadata", {})
-            items = callback_metadata.get("Item", [])
-            
-            # Extract payment details
-            payment_details = {}
-            for item in items:
-                name = item.get("Name")
-                value = item.get("Value")
-                if name and value is not None:
-                    payment_details[name] = value
-            
-            # Get M-Pesa receipt number
-            mpesa_receipt = payment_details.get("MpesaReceiptNumber")
-            amount = payment_details.get("Amount")
-            phone = payment_details.get("PhoneNumber")
-
-            # Verify against M-Pesa query endpoint (defense-in-depth)
-            status_check = query_stk_status(checkout_request_id)
-            if str(status_check.get("ResultCode")) != "0":
-                logger.warning("Status query failed for %s", checkout_request_id)
-                return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"}), 200
-
-            if not _amounts_match(amount, payment.order.total if payment.order else None):
-                logger.warning("Amount mismatch for payment %s", payment.id)
-                return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"}), 200
-
-            if payment.order and _normalize_phone(payment.order.phone) != _normalize_phone(phone):
-                logger.warning("Phone mismatch for payment %s", payment.id)
-                return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"}), 200
-            
-            # Update payment status
-            payment.mark_as_paid(mpesa_receipt=mpesa_receipt)
-            
-            # Update order status
-            if payment.order:
-                payment.order.status = "CONFIRMED"
-            
-            # Commit to database
-            db.session.commit()
 
-            # Send payment confirmation email (non-blocking)
-            try:
-                if payment.order and payment.order.email:
-                    email_body = build_payment_confirmation_html(payment.order, payment)
-                    send_email_smtp(
-                        payment.order.email,
-                        "Payment Confirmed - SmartNest",
-                        email_body
-                    )
-            except Exception as e:
-                logger.error("Payment email failed: %s", str(e))
-        
-        else:
-            # Mark payment as failed
-            payment.mark_as_failed()
-            
-            # Update order status
-            if payment.order:
-                payment.order.status = "PAYMENT_FAILED"
-            
-            # Commit to database
-            db.session.commit()
-        
-        # CRITICAL: Always return 200 OK to M-Pesa
-        return jsonify({
-            "ResultCode": 0,
-            "ResultDesc": "Success"
-        }), 200
-    
+        entry = store_callback(data)
+        if entry is None:
+            # An identical payload was already stored: acknowledge, nothing to redo
+            MPESA_CALLBACKS.labels("duplicate").inc()
+            return jsonify({"ResultCode": 0, "ResultDesc": "Success"}), 200
     except Exception as e:
-        # Log the error but still return 200
-        logger.error("EXCEPTION in M-Pesa callback: %s", str(e))
+        logger.error("EXCEPTION storing M-Pesa callback: %s", str(e))
+        MPESA_CALLBACKS.labels("error").inc()
         traceback.print_exc()
-        
-        # Try to rollback any pending transaction
         try:
             db.session.rollback()
         except:
             pass
-        
         # CRITICAL: Still return 200 to prevent M-Pesa from retrying
-        return jsonify({
-            "ResultCode": 0,
-            "ResultDesc": "Accepted"
-        }), 200
+        return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"}), 200
+
+    outcome = process_callback(entry)
+
+    # CRITICAL: Always return 200 OK to M-Pesa
+    if OUTCOME_STATUS[outcome] == PROCESSED:
+        return jsonify({"ResultCode": 0, "ResultDesc": "Success"}), 200
+    return jsonify({"ResultCode": 0, "ResultDesc": "Accepted"}), 200
 
 
 @payment_bp.route("/mpesa/status/<checkout_request_id>", methods=["GET"])
@@ -324,21 +293,70 @@ def get_order_payment_status(order_id):
         if not order_token or order_token != order.order_access_token:
             return jsonify({"error": "Unauthorized"}), 403
         
-        payment = order.payment
-        
-        return jsonify({
-            "order_id": order.id,
-            "status": order.status,
-            "payment_status": payment.status if payment else "NONE",
-            "payment_method": payment.method if payment else None,
-            "paid_at": payment.paid_at.isoformat() if payment and payment.paid_at else None,
-            "total": float(order.total)
-        })
+        return jsonify(payment_status_payload(order))
     
     except Exception as e:
         print(f"Payment status error: {str(e)}")
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@payment_bp.route("/order/<int:order_id>/payment-status/stream", methods=["GET"])
+def stream_order_payment_status(order_id):
+    """
+    Server-Sent Events: push one "payment" event when the order's payment
+    changes (or immediately if it is already final), then close.
+    Sends "timeout" after PAYMENT_STREAM_TIMEOUT_SECONDS; EventSource
+    reconnects on its own. Pass the token as ?order_token= since
+    EventSource cannot set headers.
+    """
+    order = Order.query.get(order_id)
+    if not order:
+        return jsonify({"error": "Order not found"}), 404
+
+    order_token = _get_order_token()
+    if not order_token or order_token != order.order_access_token:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    timeout = current_app.config.get("PAYMENT_STREAM_TIMEOUT_SECONDS", 25)
+    heartbeat = current_app.config.get("PAYMENT_STREAM_HEARTBEAT_SECONDS", 10)
+
+    # Subscribe before reading the status so a change in between is not lost.
+    events, unsubscribe = subscribe_payment_events(order.id)
+    current = payment_status_payload(order)
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            if is_final_status(current):
+                yield _sse("payment", current)
+                return
+
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield _sse("timeout", current)
+                    return
+                try:
+                    event = events.get(timeout=min(remaining, heartbeat))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse("payment", event)
+                return
+        finally:
+            unsubscribe()
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
     
 # Add this route to your payment.py file
 
@@ -359,6 +377,18 @@ def mark_cod_payment(order_id):
         if not order_token or order_token != order.order_access_token:
             return jsonify({"error": "Unauthorized"}), 403
         
+        if not can_transition(order.status, CONFIRMED):
+            return jsonify({
+                "success": False,
+                "error": f"Cannot confirm an order that is '{order.status}'"
+            }), 409
+
+        # Take the stock back if the hold lapsed after a failed M-Pesa attempt
+        short = rehold_reservations(order.id)
+        if short:
+            db.session.rollback()
+            return _out_of_stock_response(short)
+
         # Get or create payment record for this order
         payment = order.payment
         if not payment:
@@ -373,17 +403,20 @@ def mark_cod_payment(order_id):
             payment.method = "cod"
             payment.status = "PENDING"
         
-        # Update order status
-        order.status = "CONFIRMED"
+        order.status = CONFIRMED
+
+        # Cash on delivery: the order is confirmed, so keep the stock
+        commit_reservations(order.id)
         
         db.session.commit()
+        publish_payment_event(order)
         
         return jsonify({
             "success": True,
             "message": "COD order confirmed",
             "order_id": order.id,
             "payment_method": "cod",
-            "status": "CONFIRMED"
+            "status": order.status
         }), 200
     
     except Exception as e:
@@ -1,9 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from app.models.product import Product
 from app.models.product_image import ProductImage
 from app.extensions import db
-from cloudinary.uploader import upload
 from flask_jwt_extended import jwt_required, get_jwt
+from app.utils.cache import invalidate_catalog
+from app.services.image_uploads import failed_uploads, upload_images
+from app.services.asset_cleanup import queue_asset_deletion
+from app.services.signed_uploads import UploadVerificationError, sign_upload, verify_upload
 
 product_image_bp = Blueprint("product_images", __name__)
 
@@ -28,38 +31,108 @@ def upload_product_images(product_id):
     if not files:
         return {"error": "No images provided"}, 400
 
+    results = upload_images(
+        files,
+        folder="smartnest/products",
+        resource_type="image"
+    )
+    failed = failed_uploads(results)
+
+    uploaded = _add_images(product, [r["result"]["secure_url"] for r in results if r["ok"]])
+
+    if not uploaded:
+        status = 400 if all(f["reason"] == "invalid" for f in failed) else 502
+        return jsonify({"error": "No images were uploaded", "failed": failed}), status
+
+    db.session.commit()
+    invalidate_catalog()
+    return _uploaded_response(uploaded, failed)
+
+
+def _product_folder(product_id):
+    return f"smartnest/products/{product_id}"
+
+
+def _add_images(product, urls):
+    """Append ProductImage rows after the product's existing images."""
     uploaded = []
     start_position = len(product.images)
     has_primary = any(img.is_primary for img in product.images)
 
-    for index, file in enumerate(files):
-        result = upload(
-            file,
-            folder="smartnest/products",
-            resource_type="image"
-        )
-
+    for url in urls:
         product_image = ProductImage(
             product_id=product.id,
-            image_url=result["secure_url"],
-            is_primary=(not has_primary and index == 0),
-            position=start_position + index
+            image_url=url,
+            is_primary=(not has_primary and not uploaded),
+            position=start_position + len(uploaded)
         )
 
         db.session.add(product_image)
         uploaded.append(product_image)
+    return uploaded
 
-    db.session.commit()
 
-    return jsonify([
-        {
-            "id": img.id,
-            "image_url": img.image_url,
-            "is_primary": img.is_primary,
-            "position": img.position
-        }
-        for img in uploaded
-    ]), 201
+def _uploaded_response(uploaded, failed):
+    images = [img.to_dict() for img in uploaded]
+    if failed:
+        # Partial success: report which files were rejected.
+        return jsonify({"uploaded": images, "failed": failed}), 207
+    return jsonify(images), 201
+
+
+@product_image_bp.route("/<int:product_id>/images/sign", methods=["POST"])
+@jwt_required()
+def sign_product_image_upload(product_id):
+    """Signed parameters for uploading images straight to Cloudinary."""
+    auth_error = _require_admin()
+    if auth_error:
+        return auth_error
+    Product.query.get_or_404(product_id)
+
+    max_dimension = current_app.config.get("IMAGE_MAX_DIMENSION", 2000)
+    return jsonify(sign_upload(
+        _product_folder(product_id),
+        allowed_formats=["jpg", "jpeg", "png", "webp"],
+        transformation=f"c_limit,w_{max_dimension},h_{max_dimension}",
+    )), 200
+
+
+@product_image_bp.route("/<int:product_id>/images/register", methods=["POST"])
+@jwt_required()
+def register_product_images(product_id):
+    """Create ProductImage rows for images uploaded directly to Cloudinary."""
+    auth_error = _require_admin()
+    if auth_error:
+        return auth_error
+    product = Product.query.get_or_404(product_id)
+
+    items = (request.get_json(silent=True) or {}).get("images")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "images must be a non-empty list"}), 400
+
+    existing = {img.image_url for img in product.images}
+    urls, failed = [], []
+    for index, item in enumerate(items):
+        public_id = item.get("public_id") if isinstance(item, dict) else None
+        try:
+            if not isinstance(item, dict):
+                raise UploadVerificationError("Each image must be an object")
+            url = verify_upload(item, _product_folder(product_id))
+        except UploadVerificationError as e:
+            failed.append({"index": index, "public_id": public_id, "reason": "invalid", "error": str(e)})
+            continue
+        if url in existing or url in urls:
+            failed.append({"index": index, "public_id": public_id, "reason": "invalid", "error": "Image already registered"})
+            continue
+        urls.append(url)
+
+    uploaded = _add_images(product, urls)
+    if not uploaded:
+        return jsonify({"error": "No images were registered", "failed": failed}), 400
+
+    db.session.commit()
+    invalidate_catalog()
+    return _uploaded_response(uploaded, failed)
 
 @product_image_bp.route("/images/<int:image_id>", methods=["DELETE"])
 @jwt_required()
@@ -69,9 +142,10 @@ def delete_product_image(image_id):
         return auth_error
     image = ProductImage.query.get_or_404(image_id)
 
-    # Optional: delete from Cloudinary here
+    queue_asset_deletion(image.image_url, "product_image_deleted")
     db.session.delete(image)
     db.session.commit()
+    invalidate_catalog()
 
     return {"message": "Image deleted"}, 200
     
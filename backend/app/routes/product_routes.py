@@ -1,5 +1,7 @@
-from flask import Blueprint, jsonify, request
-from datetime import datetime
+from flask import Blueprint, current_app, g, jsonify, request
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+import hashlib
 import math
 from app.models.product import Product
 from app.models.category import Category
@@ -7,6 +9,31 @@ from app.models.product_image import ProductImage
 from app.models.product_rating import ProductRating
 from app.extensions import db
 from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import select, func, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from app.utils.db_routing import read_replica
+from app.utils.cache import catalog_cache, invalidate_catalog
+from app.utils.query_stats import query_budget
+from app.services.related_products import delete_related_for, related_product_ids
+from app.services.asset_cleanup import queue_asset_deletion
+from app.services.co_purchase import co_purchase_neighbours, delete_co_purchase_for
+from app.services.inventory import (
+    ADJUSTMENT,
+    RESTOCK,
+    on_hand_quantity,
+    record_movement,
+    set_opening_stock,
+    stock_as_of,
+)
+from app.utils.serializers import (
+    ADMIN_ONLY_PRODUCT_FIELDS,
+    product_columns,
+    PRIMARY_IMAGE_FIELDS,
+    PRODUCT_VIEWS,
+    resolve_product_fields,
+    serialize_image_row,
+    serialize_product_row,
+)
 
 product_bp = Blueprint("products", __name__)
 
@@ -45,102 +72,242 @@ def _parse_pagination():
     per_page = min(per_page, 100)
     return (page, per_page), None
 
-def _serialize_product(p, include_stock=False):
-    primary_image = None
-    if p.images:
-        primary = next((img for img in p.images if img.is_primary), None)
-        primary_image = primary.image_url if primary else p.images[0].image_url
-
-    data = {
-        "id": p.id,
-        "name": p.name,
-        "description": p.description,
-        "price": float(p.price),
-        "category": p.category.slug,
-        "is_branding": p.is_branding,
-        "discount_percent": p.discount_percent,
-        "discounted_price": float(p.get_discounted_price()) if p.discount_percent else None,
-        "effective_price": float(p.get_effective_price()),
-        "flash_sale_active": p.is_flash_sale_active(),
-        "flash_sale_percent": p.flash_sale_percent,
-        "flash_sale_start": p.flash_sale_start.isoformat() if p.flash_sale_start else None,
-        "flash_sale_end": p.flash_sale_end.isoformat() if p.flash_sale_end else None,
-        "rating_avg": round(p.rating_sum / p.rating_count, 2) if p.rating_count > 0 else 0,
-        "rating_count": p.rating_count,
-        "in_stock": p.stock_quantity > 0,
-        "image": primary_image,
-        "images": [img.to_dict() for img in p.images],
-    }
+def _parse_fields(default_view="detail", admin=False):
+    """Resolve ?fields=a,b,c or ?view=card|detail|admin to a field tuple."""
+    fields, message = resolve_product_fields(
+        view=request.args.get("view"),
+        fields=request.args.get("fields"),
+        default_view=default_view,
+    )
+    if message:
+        return None, (jsonify({"error": message}), 400)
+    if not admin and ADMIN_ONLY_PRODUCT_FIELDS.intersection(fields):
+        return None, (jsonify({"error": "Admin access required for these fields"}), 403)
+    return fields, None
+
+def _primary_image_column():
+    return (
+        select(ProductImage.image_url)
+        .where(ProductImage.product_id == Product.id)
+        .order_by(ProductImage.is_primary.desc(), ProductImage.position, ProductImage.id)
+        .limit(1)
+        .correlate(Product)
+        .scalar_subquery()
+        .label("primary_image")
+    )
 
-    if include_stock:
-        data["stock_quantity"] = p.stock_quantity
+def _images_json_column():
+    # Postgres only: aggregate the product's images in the same round-trip.
+    image = func.json_build_object(
+        "id", ProductImage.id,
+        "image_url", ProductImage.image_url,
+        "is_primary", ProductImage.is_primary,
+        "position", ProductImage.position,
+    )
+    return (
+        select(func.json_agg(aggregate_order_by(image, ProductImage.position, ProductImage.id)))
+        .where(ProductImage.product_id == Product.id)
+        .correlate(Product)
+        .scalar_subquery()
+        .label("images")
+    )
 
-    return data
+def _use_json_agg():
+    return db.engine.dialect.name == "postgresql"
 
-def _paginate_query(query, page, per_page):
-    total = query.count()
-    items = (
-        query
-        .offset((page - 1) * per_page)
-        .limit(per_page)
-        .all()
-    )
-    total_pages = max(1, math.ceil(total / per_page)) if total else 1
-    return items, total, total_pages
+def _catalog_select(fields, category_slug=None):
+    """Column-projected product query selecting only what ``fields`` needs."""
+    columns = product_columns(fields)
+    if "images" in fields:
+        if _use_json_agg():
+            columns += (_images_json_column(),)
+    elif PRIMARY_IMAGE_FIELDS.intersection(fields):
+        columns += (_primary_image_column(),)
 
-# GET (ALL or BY CATEGORY)
-@product_bp.route("", methods=["GET", "OPTIONS"])
-def get_products():
+    stmt = select(*columns).select_from(Product).join(
+        Category, Product.category_id == Category.id
+    )
+    if category_slug is not None:
+        stmt = stmt.where(Category.slug == category_slug)
+    return stmt.order_by(Product.id.asc())
+
+def _count_products(category_slug=None):
+    stmt = select(func.count(Product.id))
+    if category_slug is not None:
+        stmt = stmt.join(Category, Product.category_id == Category.id).where(
+            Category.slug == category_slug
+        )
+    return db.session.scalar(stmt)
+
+def _load_images(product_ids):
+    """Portable fallback: fetch images for a page of products in one query."""
+    images = {pid: [] for pid in product_ids}
+    if not product_ids:
+        return images
+    rows = db.session.execute(
+        select(
+            ProductImage.product_id,
+            ProductImage.id,
+            ProductImage.image_url,
+            ProductImage.is_primary,
+            ProductImage.position,
+        )
+        .where(ProductImage.product_id.in_(product_ids))
+        .order_by(ProductImage.product_id, ProductImage.position, ProductImage.id)
+    )
+    for row in rows:
+        images[row.product_id].append(serialize_image_row(row))
+    return images
+
+def _serialize_rows(rows, fields):
+    now = datetime.now()
+    if "images" not in fields:
+        return [serialize_product_row(r, fields, now=now) for r in rows]
+
+    if rows and "images" in rows[0]._fields:
+        images_by_id = {r.id: r.images or [] for r in rows}
+    else:
+        images_by_id = _load_images([r.id for r in rows])
+
+    return [
+        serialize_product_row(r, fields, images=images_by_id[r.id], now=now)
+        for r in rows
+    ]
+
+def _cached_json_response(cache_key, build):
+    """Serve build()'s payload through catalog_cache with an ETag.
+
+    build() returns the payload, or None for a 404. The serialized body is
+    cached for PRODUCT_CACHE_TTL_SECONDS, and so are its gzip/Brotli
+    variants (see app.utils.compression).
+    """
+    ttl = current_app.config.get("PRODUCT_CACHE_TTL_SECONDS", 60)
+    cached = catalog_cache.get(cache_key)
+    if cached is None:
+        payload = build()
+        if payload is None:
+            return jsonify({"error": "Product not found"}), 404
+        body = current_app.json.dumps(payload).encode()
+        cached = (body, hashlib.sha1(body).hexdigest())
+        catalog_cache.set(cache_key, cached, ttl)
+
+    body, etag = cached
+    g.compression_cache_key = (cache_key, etag)
+    g.compression_cache_ttl = ttl
+
+    response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"public, max-age={ttl}"
+    return response.make_conditional(request)
+
+
+def _list_products(default_view="detail", category_slug=None, admin=False):
     pagination, error = _parse_pagination()
+    if error:
+        return error
+    fields, error = _parse_fields(default_view, admin)
     if error:
         return error
 
-    query = Product.query.order_by(Product.id.asc())
+    if admin:
+        return jsonify(_list_payload(fields, pagination, category_slug))
+
+    cache_key = ("products", category_slug, fields, pagination)
+    return _cached_json_response(
+        cache_key, lambda: _list_payload(fields, pagination, category_slug)
+    )
+
+
+def _list_payload(fields, pagination, category_slug=None):
+    stmt = _catalog_select(fields, category_slug)
 
     if pagination:
         page, per_page = pagination
-        items, total, total_pages = _paginate_query(query, page, per_page)
-        result = [_serialize_product(p) for p in items]
-        return jsonify({
-            "items": result,
+        total = _count_products(category_slug)
+        rows = db.session.execute(
+            stmt.offset((page - 1) * per_page).limit(per_page)
+        ).all()
+        total_pages = max(1, math.ceil(total / per_page)) if total else 1
+        return {
+            "items": _serialize_rows(rows, fields),
             "page": page,
             "per_page": per_page,
             "total": total,
             "total_pages": total_pages,
-        })
+        }
+
+    rows = db.session.execute(stmt).all()
+    return _serialize_rows(rows, fields)
 
-    products = query.all()
-    result = [_serialize_product(p) for p in products]
-    return jsonify(result)
+# GET (ALL or BY CATEGORY)
+@product_bp.route("", methods=["GET", "OPTIONS"])
+@read_replica
+def get_products():
+    return _list_products()
 
 @product_bp.route("/admin", methods=["GET"])
 @jwt_required()
+@read_replica
 def get_products_admin():
     auth_error = _require_admin()
     if auth_error:
         return auth_error
 
-    pagination, error = _parse_pagination()
+    return _list_products(default_view="admin", admin=True)
+
+
+def _product_cards(ids):
+    """Card-view payloads for ``ids``, in the given order."""
+    if not ids:
+        return []
+    fields = PRODUCT_VIEWS["card"]
+    rows = db.session.execute(
+        _catalog_select(fields).where(Product.id.in_(ids))
+    ).all()
+    by_id = {r.id: r for r in rows}
+    return _serialize_rows([by_id[i] for i in ids if i in by_id], fields)
+
+# GET SINGLE PRODUCT
+@product_bp.route("/<int:id>", methods=["GET"])
+@read_replica
+@query_budget(4)
+def get_product(id):
+    fields, error = _parse_fields("detail")
     if error:
         return error
+    include_related = request.args.get("related", "1") != "0"
 
-    query = Product.query.order_by(Product.id.asc())
+    def build():
+        row = db.session.execute(
+            _catalog_select(fields).where(Product.id == id)
+        ).first()
+        if row is None:
+            return None
+
+        payload = _serialize_rows([row], fields)[0]
+        if include_related:
+            payload["related"] = _product_cards(related_product_ids(id))
+        return payload
+
+    return _cached_json_response(("product", id, fields, include_related), build)
 
-    if pagination:
-        page, per_page = pagination
-        items, total, total_pages = _paginate_query(query, page, per_page)
-        result = [_serialize_product(p, include_stock=True) for p in items]
-        return jsonify({
-            "items": result,
-            "page": page,
-            "per_page": per_page,
-            "total": total,
-            "total_pages": total_pages,
-        })
 
-    products = query.all()
-    result = [_serialize_product(p, include_stock=True) for p in products]
-    return jsonify(result)
+# FREQUENTLY BOUGHT TOGETHER
+@product_bp.route("/<int:id>/bought-together", methods=["GET"])
+@read_replica
+def get_bought_together(id):
+    try:
+        limit = max(1, min(int(request.args.get("limit", 10)), 10))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    neighbours = co_purchase_neighbours(id, limit)
+    counts = dict((other_id, count) for other_id, count in neighbours)
+    items = _product_cards([other_id for other_id, _ in neighbours])
+    for item in items:
+        item["co_purchase_count"] = counts[item["id"]]
+
+    return jsonify({"product_id": id, "items": items}), 200
 
 
 # CREATE PRODUCT
@@ -172,7 +339,7 @@ def create_product():
         price=data["price"],
         category_id=data["category_id"],
         is_branding=data.get("is_branding", False),
-        stock_quantity=stock_quantity,
+        stock_quantity=0,
         discount_percent=discount_percent,
         flash_sale_start=flash_sale_start,
         flash_sale_end=flash_sale_end,
@@ -181,6 +348,7 @@ def create_product():
 
     db.session.add(product)
     db.session.flush()  # get product.id BEFORE commit
+    set_opening_stock(product, stock_quantity or 0)
 
     # ✅ handle images properly
     images = data.get("images", [])
@@ -193,9 +361,77 @@ def create_product():
         db.session.add(image)
 
     db.session.commit()
+    invalidate_catalog()
 
     return jsonify(product.to_dict()), 201
 
+def _lock_product(product_id):
+    """Load a product FOR UPDATE so concurrent stock edits and orders apply in turn."""
+    return db.session.scalar(select(Product).where(Product.id == product_id).with_for_update())
+
+
+def _percent_error(data, field):
+    """Percent columns are integers: accept whole numbers 0..100 (10 or 10.0)."""
+    value = data.get(field)
+    if value is None:
+        return None
+    if (
+        isinstance(value, bool) or not isinstance(value, (int, float))
+        or value != int(value) or value < 0 or value > 100
+    ):
+        return jsonify({"error": f"{field} must be a whole number between 0 and 100"}), 400
+    return None
+
+
+def _percent(value):
+    """A percent that passed _percent_error, as stored (None -> 0)."""
+    return int(value or 0)
+
+
+def _validate_product_changes(data):
+    """Range checks for the stock and pricing fields present in ``data``."""
+    if "stock_quantity" in data and data["stock_quantity"] is not None and data["stock_quantity"] < 0:
+        return jsonify({"error": "stock_quantity must be 0 or greater"}), 400
+    stock_adjustment = data.get("stock_adjustment")
+    if stock_adjustment is not None and (
+        not isinstance(stock_adjustment, int) or isinstance(stock_adjustment, bool)
+    ):
+        return jsonify({"error": "stock_adjustment must be an integer"}), 400
+    return _percent_error(data, "discount_percent") or _percent_error(data, "flash_sale_percent")
+
+
+def _apply_stock_changes(product, data):
+    """Record stock changes in the inventory ledger.
+
+    stock_adjustment is relative (+restock / -adjustment), so sales made
+    while the admin was editing are kept. stock_quantity sets an absolute
+    count and must come with expected_stock_quantity, the on-hand count
+    the admin saw; if stock has moved since, nothing is recorded and a
+    409 response is returned so a sale is never reverted as an adjustment.
+    """
+    stock_adjustment = data.get("stock_adjustment")
+    note = data.get("stock_note")
+    if stock_adjustment:
+        record_movement(product.id, stock_adjustment,
+                        RESTOCK if stock_adjustment > 0 else ADJUSTMENT, note=note)
+    elif data.get("stock_quantity") is not None:
+        expected = data.get("expected_stock_quantity")
+        if not isinstance(expected, int) or isinstance(expected, bool):
+            return jsonify({
+                "error": "Send stock_adjustment, or stock_quantity with expected_stock_quantity"
+            }), 400
+        on_hand = on_hand_quantity(product)
+        if on_hand != expected:
+            return jsonify({
+                "error": "Stock changed since it was loaded",
+                "stock_quantity": on_hand,
+            }), 409
+        delta = data["stock_quantity"] - on_hand
+        if delta:
+            record_movement(product.id, delta, ADJUSTMENT, note=note)
+    return None
+
+
 # UPDATE PRODUCT
 @product_bp.route("/<int:id>", methods=["PUT"])
 @jwt_required()
@@ -203,36 +439,224 @@ def update_product(id):
     auth_error = _require_admin()
     if auth_error:
         return auth_error
-    product = Product.query.get_or_404(id)
+    product = _lock_product(id)
+    if product is None:
+        return jsonify({"error": "Product not found"}), 404
     data = request.json
 
-    if "stock_quantity" in data and data["stock_quantity"] is not None and data["stock_quantity"] < 0:
-        return jsonify({"error": "stock_quantity must be 0 or greater"}), 400
-    if "discount_percent" in data and data["discount_percent"] is not None:
-        if data["discount_percent"] < 0 or data["discount_percent"] > 100:
-            return jsonify({"error": "discount_percent must be between 0 and 100"}), 400
-    if "flash_sale_percent" in data and data["flash_sale_percent"] is not None:
-        if data["flash_sale_percent"] < 0 or data["flash_sale_percent"] > 100:
-            return jsonify({"error": "flash_sale_percent must be between 0 and 100"}), 400
+    error = _validate_product_changes(data)
+    if error:
+        return error
 
     product.name = data["name"]
     product.price = data["price"]
     product.category_id = data["category_id"]
     product.image_url = data.get("image_url")
     product.is_branding = data.get("is_branding", False)
-    product.stock_quantity = data.get("stock_quantity", product.stock_quantity)
-    product.discount_percent = data.get("discount_percent", product.discount_percent)
-    product.flash_sale_percent = data.get("flash_sale_percent", product.flash_sale_percent)
+    error = _apply_stock_changes(product, data)
+    if error:
+        db.session.rollback()
+        return error
+    product.discount_percent = _percent(data.get("discount_percent", product.discount_percent))
+    product.flash_sale_percent = _percent(data.get("flash_sale_percent", product.flash_sale_percent))
     if "flash_sale_start" in data:
         product.flash_sale_start = parse_iso_datetime(data.get("flash_sale_start"))
     if "flash_sale_end" in data:
         product.flash_sale_end = parse_iso_datetime(data.get("flash_sale_end"))
 
     db.session.commit()
+    invalidate_catalog()
 
     return jsonify({"message": "Product updated"})
 
 
+# PARTIALLY UPDATE PRODUCT (only the fields sent are changed)
+@product_bp.route("/<int:id>", methods=["PATCH"])
+@jwt_required()
+def patch_product(id):
+    auth_error = _require_admin()
+    if auth_error:
+        return auth_error
+    product = _lock_product(id)
+    if product is None:
+        return jsonify({"error": "Product not found"}), 404
+    data = request.get_json(silent=True) or {}
+
+    error = _validate_product_changes(data)
+    if error:
+        return error
+    if "name" in data and not data["name"]:
+        return jsonify({"error": "name cannot be empty"}), 400
+    if "price" in data:
+        try:
+            if Decimal(str(data["price"])) < 0:
+                raise ValueError
+        except (InvalidOperation, ValueError):
+            return jsonify({"error": "price must be a number, 0 or greater"}), 400
+    if "category_id" in data and not db.session.get(Category, data["category_id"]):
+        return jsonify({"error": "Category not found"}), 400
+
+    for field in ("name", "description", "price", "category_id", "is_branding"):
+        if field in data:
+            setattr(product, field, data[field])
+    for field in ("discount_percent", "flash_sale_percent"):
+        if field in data:
+            setattr(product, field, _percent(data[field]))
+    for field in ("flash_sale_start", "flash_sale_end"):
+        if field in data:
+            setattr(product, field, parse_iso_datetime(data[field]))
+    if (
+        product.flash_sale_start and product.flash_sale_end
+        and product.flash_sale_end <= product.flash_sale_start
+    ):
+        db.session.rollback()
+        return jsonify({"error": "flash_sale_end must be after flash_sale_start"}), 400
+    error = _apply_stock_changes(product, data)
+    if error:
+        db.session.rollback()
+        return error
+
+    db.session.commit()
+    invalidate_catalog()
+
+    return jsonify({"message": "Product updated", "product_id": product.id})
+
+
+MAX_BULK_PRICING_IDS = 1000
+
+
+def _bulk_pricing_filters(target):
+    """WHERE clauses for a bulk pricing target, or (None, error response)."""
+    filters = []
+    if "category_id" in target:
+        filters.append(Product.category_id == target["category_id"])
+    if "category_slug" in target:
+        filters.append(Product.category_id.in_(
+            select(Category.id).where(Category.slug == target["category_slug"])
+        ))
+    if "product_ids" in target:
+        ids = target["product_ids"]
+        if (
+            not isinstance(ids, list) or not ids or len(ids) > MAX_BULK_PRICING_IDS
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+        ):
+            return None, (jsonify({
+                "error": f"product_ids must be a list of 1 to {MAX_BULK_PRICING_IDS} integers"
+            }), 400)
+        filters.append(Product.id.in_(ids))
+    for key, compare in (("min_price", Product.price.__ge__), ("max_price", Product.price.__le__)):
+        if key in target:
+            try:
+                filters.append(compare(Decimal(str(target[key]))))
+            except InvalidOperation:
+                return None, (jsonify({"error": f"{key} must be a number"}), 400)
+
+    if not filters and target.get("all") is not True:
+        return None, (jsonify({
+            "error": "target needs category_id, category_slug, product_ids, "
+                     "min_price/max_price, or all: true"
+        }), 400)
+    return filters, None
+
+
+# BULK PRICING (discounts / flash sales for many products in one UPDATE)
+@product_bp.route("/pricing", methods=["PATCH"])
+@jwt_required()
+def bulk_update_pricing():
+    """
+    Expected JSON:
+    {
+        "target": {"category_slug": "mugs", "min_price": 500, "max_price": 2000},
+        "discount_percent": 10,
+        "flash_sale": {"percent": 20, "start": "...", "end": "..."}
+    }
+    Target filters are combined with AND. "flash_sale": null ends any
+    flash sale. At least one of discount_percent / flash_sale is required.
+    """
+    auth_error = _require_admin()
+    if auth_error:
+        return auth_error
+    data = request.get_json(silent=True) or {}
+
+    target = data.get("target")
+    if not isinstance(target, dict):
+        return jsonify({"error": "target is required"}), 400
+    filters, error = _bulk_pricing_filters(target)
+    if error:
+        return error
+
+    values = {}
+    if "discount_percent" in data:
+        error = _percent_error(data, "discount_percent")
+        if error:
+            return error
+        values["discount_percent"] = _percent(data["discount_percent"])
+    if "flash_sale" in data:
+        flash_sale = data["flash_sale"]
+        if flash_sale is None:
+            values.update(flash_sale_percent=0, flash_sale_start=None, flash_sale_end=None)
+        else:
+            if not isinstance(flash_sale, dict):
+                return jsonify({"error": "flash_sale must be an object or null"}), 400
+            error = _percent_error({"flash_sale.percent": flash_sale.get("percent")}, "flash_sale.percent")
+            if error:
+                return error
+            start = parse_iso_datetime(flash_sale.get("start"))
+            end = parse_iso_datetime(flash_sale.get("end"))
+            if not start or not end:
+                return jsonify({"error": "flash_sale.start and flash_sale.end are required"}), 400
+            if end <= start:
+                return jsonify({"error": "flash_sale_end must be after flash_sale_start"}), 400
+            values.update(
+                flash_sale_percent=_percent(flash_sale.get("percent")),
+                flash_sale_start=start,
+                flash_sale_end=end,
+            )
+    if not values:
+        return jsonify({"error": "Provide discount_percent and/or flash_sale"}), 400
+
+    updated = db.session.execute(
+        update(Product)
+        .where(*filters)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    invalidate_catalog()
+
+    return jsonify({"updated": updated, "changes": sorted(values)})
+
+
+# STOCK AS OF A POINT IN TIME (audits)
+@product_bp.route("/<int:id>/stock", methods=["GET"])
+@jwt_required()
+def get_product_stock(id):
+    auth_error = _require_admin()
+    if auth_error:
+        return auth_error
+    product = Product.query.get_or_404(id)
+
+    as_of = request.args.get("as_of")
+    if not as_of:
+        return jsonify({
+            "product_id": product.id,
+            "as_of": None,
+            "stock_quantity": on_hand_quantity(product),
+        })
+
+    at = parse_iso_datetime(as_of)
+    if at is None:
+        return jsonify({"error": "as_of must be an ISO 8601 datetime"}), 400
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return jsonify({
+        "product_id": product.id,
+        "as_of": at.isoformat(),
+        "stock_quantity": stock_as_of(product.id, at),
+    })
+
+
 # DELETE PRODUCT
 @product_bp.route("/<int:id>", methods=["DELETE"])
 @jwt_required()
@@ -242,40 +666,21 @@ def delete_product(id):
         return auth_error
     product = Product.query.get_or_404(id)
 
+    delete_related_for(product.id)
+    delete_co_purchase_for(product.id)
+    for image in product.images:
+        queue_asset_deletion(image.image_url, "product_deleted")
     db.session.delete(product)
     db.session.commit()
+    invalidate_catalog()
 
     return jsonify({"message": "Product deleted"})
 
 # GET PRODUCTS BY CATEGORY SLUG
 @product_bp.route("/category/<slug>", methods=["GET"])
+@read_replica
 def get_products_by_category(slug):
-    pagination, error = _parse_pagination()
-    if error:
-        return error
-
-    query = (
-        Product.query
-        .join(Category)
-        .filter(Category.slug == slug)
-        .order_by(Product.id.asc())
-    )
-
-    if pagination:
-        page, per_page = pagination
-        items, total, total_pages = _paginate_query(query, page, per_page)
-        result = [_serialize_product(p) for p in items]
-        return jsonify({
-            "items": result,
-            "page": page,
-            "per_page": per_page,
-            "total": total,
-            "total_pages": total_pages,
-        })
-
-    products = query.all()
-    result = [_serialize_product(p) for p in products]
-    return jsonify(result)
+    return _list_products(category_slug=slug)
 
 
 @product_bp.route("/<int:id>/ratings", methods=["POST"])
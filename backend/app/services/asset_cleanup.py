@@ -0,0 +1,194 @@
+"""Deferred deletion of Cloudinary assets that are no longer referenced.
+
+Deleting a product, a product image or replacing a branding logo calls
+queue_asset_deletion() inside the same transaction, so the asset's public
+ID is recorded only if the row change commits. `flask assets purge` then
+deletes queued assets through the Admin API in batches of up to 100 (the
+delete_resources limit), pausing between batches and backing off when
+Cloudinary reports a rate limit. `flask assets reconcile` lists uploaded
+assets that no row references.
+"""
+import time
+from datetime import datetime, timedelta
+
+import cloudinary.api
+import cloudinary.exceptions
+from flask import current_app
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.asset_deletion import AssetDeletion
+from app.models.branding import BrandingDetail
+from app.models.product_image import ProductImage
+from app.utils.image_urls import cloudinary_public_id
+from app.utils.metrics import track_outbound
+
+CLOUDINARY_DELETE_BATCH_LIMIT = 100
+
+
+def queue_asset_deletion(url, reason):
+    """Queue the Cloudinary asset behind ``url``; no-op for other URLs."""
+    public_id = cloudinary_public_id(url)
+    if public_id is None:
+        return None
+    return queue_public_id(public_id, reason)
+
+
+def queue_public_id(public_id, reason):
+    existing = db.session.scalar(
+        select(AssetDeletion).where(AssetDeletion.public_id == public_id)
+    )
+    if existing:
+        existing.status = "pending"
+        existing.reason = reason
+        existing.attempts = 0
+        return existing
+    entry = AssetDeletion(public_id=public_id, reason=reason)
+    db.session.add(entry)
+    return entry
+
+
+def referenced_public_ids():
+    """Public IDs of every asset referenced by a product image or logo."""
+    urls = db.session.scalars(select(ProductImage.image_url)).all()
+    urls += db.session.scalars(
+        select(BrandingDetail.logo).where(BrandingDetail.logo.isnot(None))
+    ).all()
+    return {pid for pid in map(cloudinary_public_id, urls) if pid}
+
+
+def _claim_batch(batch_size, after_id=0):
+    stmt = (
+        select(AssetDeletion)
+        .where(AssetDeletion.status == "pending", AssetDeletion.id > after_id)
+        .order_by(AssetDeletion.id)
+        .limit(batch_size)
+    )
+    if db.engine.dialect.name == "postgresql":
+        stmt = stmt.with_for_update(skip_locked=True)
+    return db.session.scalars(stmt).all()
+
+
+def purge_batch(batch_size=CLOUDINARY_DELETE_BATCH_LIMIT, deleter=None, after_id=0):
+    """Delete one batch of queued assets with id > ``after_id``.
+
+    Returns the claimed entries. Raises cloudinary.exceptions.RateLimited
+    when Cloudinary throttles us (the batch stays pending), and re-raises
+    other API errors after recording the attempt.
+    """
+    delete_resources = deleter or cloudinary.api.delete_resources
+    max_attempts = current_app.config.get("ASSET_PURGE_MAX_ATTEMPTS", 5)
+    batch = _claim_batch(min(batch_size, CLOUDINARY_DELETE_BATCH_LIMIT), after_id)
+    if not batch:
+        db.session.commit()
+        return []
+
+    now = datetime.utcnow()
+    # An asset can be queued and then referenced again (e.g. re-registered).
+    still_used = referenced_public_ids()
+    to_delete = []
+    for entry in batch:
+        if entry.public_id in still_used:
+            entry.status = "skipped"
+            entry.processed_at = now
+        else:
+            to_delete.append(entry)
+
+    def record(entry, error):
+        entry.attempts += 1
+        entry.last_error = error[:255]
+        if entry.attempts >= max_attempts:
+            entry.status = "failed"
+            entry.processed_at = now
+
+    if to_delete:
+        try:
+            with track_outbound("cloudinary", "delete_resources"):
+                response = delete_resources(
+                    [e.public_id for e in to_delete],
+                    resource_type="image",
+                )
+        except cloudinary.exceptions.RateLimited:
+            db.session.rollback()
+            raise
+        except Exception as e:
+            for entry in to_delete:
+                record(entry, str(e))
+            db.session.commit()
+            raise
+
+        deleted = response.get("deleted", {})
+        for entry in to_delete:
+            outcome = deleted.get(entry.public_id)
+            if outcome in ("deleted", "not_found"):
+                entry.attempts += 1
+                entry.status = "deleted"
+                entry.processed_at = now
+                entry.last_error = None
+            else:
+                record(entry, f"Cloudinary returned {outcome!r}")
+
+    db.session.commit()
+    return batch
+
+
+def purge_queued_assets(max_batches=None, batch_size=CLOUDINARY_DELETE_BATCH_LIMIT,
+                        interval=None, deleter=None, sleep=time.sleep):
+    """Process batches until the queue is empty, pausing between calls."""
+    interval = (
+        current_app.config.get("ASSET_PURGE_INTERVAL_SECONDS", 1.0)
+        if interval is None else interval
+    )
+    processed = batches = last_id = 0
+    while max_batches is None or batches < max_batches:
+        try:
+            batch = purge_batch(batch_size, deleter, after_id=last_id)
+        except cloudinary.exceptions.RateLimited as e:
+            current_app.logger.warning("Cloudinary rate limit hit, stopping purge: %s", e)
+            break
+        except Exception as e:
+            current_app.logger.error("Cloudinary delete failed, stopping purge: %s", e)
+            break
+        if not batch:
+            break
+        processed += len(batch)
+        last_id = batch[-1].id
+        batches += 1
+        sleep(interval)
+    return processed
+
+
+def find_orphaned_assets(prefix="smartnest/", min_age_hours=24, lister=None):
+    """Uploaded assets under ``prefix`` that no row references.
+
+    Assets younger than ``min_age_hours`` are ignored so direct uploads
+    that have not been registered yet are not reported.
+    """
+    list_resources = lister or cloudinary.api.resources
+    cutoff = datetime.utcnow() - timedelta(hours=min_age_hours)
+    referenced = referenced_public_ids()
+    queued = set(db.session.scalars(
+        select(AssetDeletion.public_id).where(AssetDeletion.status == "pending")
+    ))
+
+    orphans = []
+    cursor = None
+    while True:
+        with track_outbound("cloudinary", "list_resources"):
+            page = list_resources(
+                type="upload", resource_type="image", prefix=prefix,
+                max_results=500, next_cursor=cursor,
+            )
+        for resource in page.get("resources", []):
+            public_id = resource["public_id"]
+            created_at = datetime.strptime(resource["created_at"], "%Y-%m-%dT%H:%M:%SZ")
+            if public_id in referenced or public_id in queued or created_at > cutoff:
+                continue
+            orphans.append({
+                "public_id": public_id,
+                "bytes": resource.get("bytes", 0),
+                "created_at": resource["created_at"],
+            })
+        cursor = page.get("next_cursor")
+        if not cursor:
+            return orphans
@@ -0,0 +1,154 @@
+"""Co-purchase ("bought together") index built from order_item.
+
+co_purchase_pairs holds the sparse co-occurrence matrix: for every two
+products that appear in the same order, the number of such orders, in
+both directions. co_purchase_neighbours keeps the top CO_PURCHASE_TOP_K
+entries of each row as one JSON list, so serving recommendations is a
+primary-key lookup.
+
+`flask copurchase rebuild` builds both tables from the full order
+history; record_order() applies one new order incrementally.
+"""
+import heapq
+from collections import Counter, defaultdict
+from datetime import datetime
+from itertools import groupby, permutations
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.extensions import db
+from app.models.co_purchase import CoPurchaseNeighbours, CoPurchasePair
+from app.models.order_item import OrderItem
+
+CO_PURCHASE_TOP_K = 10
+
+
+def _order_baskets():
+    """Yield the set of distinct product ids in each order."""
+    rows = db.session.execute(
+        select(OrderItem.order_id, OrderItem.product_id)
+        .order_by(OrderItem.order_id)
+        .execution_options(yield_per=5000)
+    )
+    for _, items in groupby(rows, key=lambda row: row.order_id):
+        yield {row.product_id for row in items}
+
+
+def count_pairs(baskets):
+    """Counter of (product_id, other_product_id) -> orders containing both."""
+    pairs = Counter()
+    for basket in baskets:
+        if len(basket) > 1:
+            pairs.update(permutations(basket, 2))
+    return pairs
+
+
+def top_neighbours(pair_counts, k=CO_PURCHASE_TOP_K):
+    """{product_id: [[other_id, count], ...]} best first, ties by id."""
+    rows = defaultdict(list)
+    for (product_id, other_id), count in pair_counts.items():
+        rows[product_id].append((count, other_id))
+    return {
+        product_id: [
+            [other_id, count]
+            for count, other_id in heapq.nsmallest(k, row, key=lambda c: (-c[0], c[1]))
+        ]
+        for product_id, row in rows.items()
+    }
+
+
+def rebuild_co_purchase_index(k=CO_PURCHASE_TOP_K):
+    """Rebuild both tables from all orders. Returns (products, pairs)."""
+    pair_counts = count_pairs(_order_baskets())
+    neighbours = top_neighbours(pair_counts, k)
+    now = datetime.utcnow()
+
+    db.session.execute(delete(CoPurchaseNeighbours))
+    db.session.execute(delete(CoPurchasePair))
+    if pair_counts:
+        db.session.execute(insert(CoPurchasePair), [
+            {"product_id": a, "other_product_id": b, "order_count": n}
+            for (a, b), n in pair_counts.items()
+        ])
+        db.session.execute(insert(CoPurchaseNeighbours), [
+            {"product_id": product_id, "neighbours": row, "updated_at": now}
+            for product_id, row in neighbours.items()
+        ])
+    db.session.commit()
+    return len(neighbours), len(pair_counts)
+
+
+def _upsert_insert():
+    dialect = db.session.get_bind(mapper=CoPurchasePair).dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    return None
+
+
+def _increment_pairs(pairs):
+    dialect_insert = _upsert_insert()
+    if dialect_insert is not None:
+        stmt = dialect_insert(CoPurchasePair).values([
+            {"product_id": a, "other_product_id": b, "order_count": 1}
+            for a, b in pairs
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["product_id", "other_product_id"],
+            set_={"order_count": CoPurchasePair.order_count + 1},
+        )
+        db.session.execute(stmt)
+        return
+
+    for a, b in pairs:
+        pair = db.session.get(CoPurchasePair, (a, b))
+        if pair:
+            pair.order_count += 1
+        else:
+            db.session.add(CoPurchasePair(product_id=a, other_product_id=b, order_count=1))
+    db.session.flush()
+
+
+def _refresh_neighbours(product_ids, k=CO_PURCHASE_TOP_K):
+    now = datetime.utcnow()
+    for product_id in product_ids:
+        rows = db.session.execute(
+            select(CoPurchasePair.other_product_id, CoPurchasePair.order_count)
+            .where(CoPurchasePair.product_id == product_id)
+            .order_by(CoPurchasePair.order_count.desc(), CoPurchasePair.other_product_id)
+            .limit(k)
+        ).all()
+        db.session.merge(CoPurchaseNeighbours(
+            product_id=product_id,
+            neighbours=[[other_id, count] for other_id, count in rows],
+            updated_at=now,
+        ))
+
+
+def record_order(product_ids, k=CO_PURCHASE_TOP_K):
+    """Add one committed order's products to the index and commit."""
+    basket = sorted(set(product_ids))
+    if len(basket) < 2:
+        return
+    _increment_pairs(list(permutations(basket, 2)))
+    _refresh_neighbours(basket, k)
+    db.session.commit()
+
+
+def co_purchase_neighbours(product_id, limit=CO_PURCHASE_TOP_K):
+    """Top co-purchased [[product_id, order_count], ...] for a product."""
+    row = db.session.get(CoPurchaseNeighbours, product_id)
+    return (row.neighbours if row else [])[:limit]
+
+
+def delete_co_purchase_for(product_id):
+    """Drop index rows for a product that is being deleted."""
+    db.session.execute(delete(CoPurchasePair).where(
+        (CoPurchasePair.product_id == product_id)
+        | (CoPurchasePair.other_product_id == product_id)
+    ))
+    db.session.execute(
+        delete(CoPurchaseNeighbours).where(CoPurchaseNeighbours.product_id == product_id)
+    )
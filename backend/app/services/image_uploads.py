@@ -0,0 +1,145 @@
+"""Validate, shrink and upload images to Cloudinary concurrently.
+
+Each file is decoded with Pillow, rotated per its EXIF orientation,
+downscaled to fit IMAGE_MAX_DIMENSION and re-encoded without metadata
+(WebP for product photos) before it is sent, so uploads are smaller and
+never carry EXIF/GPS data. Uploads run on a bounded thread pool and every
+file gets its own result, so one bad file does not fail the batch.
+
+The uploader is injectable: pass any ``uploader(file, **options)`` that
+returns a dict with "secure_url" (e.g. a stub in tests).
+"""
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary.uploader
+from flask import current_app
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.utils.metrics import track_outbound
+
+# Formats a caller may choose to pass through untouched (Pillow cannot
+# render SVG, and re-encoding would drop GIF animation). Passed-through
+# files are not validated, so only the branding-logo upload allows them.
+PASSTHROUGH_EXTENSIONS = frozenset({"svg", "gif"})
+
+_SAVE_OPTIONS = {
+    "WEBP": {"method": 4},
+    "JPEG": {"optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+}
+
+
+class ImageRejected(ValueError):
+    """The file is not an acceptable image."""
+
+
+def _extension(filename):
+    return filename.rsplit(".", 1)[1].lower() if filename and "." in filename else ""
+
+
+def prepare_image(data, max_dimension, output_format="WEBP", quality=82):
+    """Return re-encoded image bytes without metadata.
+
+    ``output_format=None`` keeps the source format (JPEG stays JPEG,
+    everything else becomes PNG) for uploads that must stay lossless.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            source_format = image.format
+            image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ImageRejected("Not a valid image file") from e
+
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    fmt = output_format or ("JPEG" if source_format == "JPEG" else "PNG")
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA", "L", "LA") and fmt != "PNG":
+        image = image.convert("RGBA")
+
+    options = dict(_SAVE_OPTIONS.get(fmt, {}))
+    if fmt in ("WEBP", "JPEG"):
+        options["quality"] = quality
+
+    out = io.BytesIO()
+    image.save(out, format=fmt, **options)
+    return out.getvalue()
+
+
+def _process_and_upload(upload_fn, data, filename, upload_options, prepare_options, passthrough):
+    if prepare_options is not None and _extension(filename) not in passthrough:
+        data = prepare_image(data, **prepare_options)
+
+    with track_outbound("cloudinary", "upload"):
+        return upload_fn(io.BytesIO(data), **upload_options)
+
+
+def upload_images(files, uploader=None, output_format="WEBP", max_dimension=None,
+                  preprocess=True, passthrough=(), **upload_options):
+    """Upload werkzeug FileStorage objects; results are in input order.
+
+    Every file is decoded and re-encoded by prepare_image unless its
+    extension is in ``passthrough`` (a subset of PASSTHROUGH_EXTENSIONS).
+
+    Each result is ``{"index", "filename", "ok": True, "result"}`` or
+    ``{"index", "filename", "ok": False, "reason", "error"}`` where reason
+    is "invalid" (the file was rejected) or "upload_error".
+    """
+    config = current_app.config
+    upload_fn = uploader or cloudinary.uploader.upload
+    passthrough = PASSTHROUGH_EXTENSIONS & set(passthrough)
+    max_bytes = config.get("IMAGE_MAX_UPLOAD_BYTES", 10 * 1024 * 1024)
+    prepare_options = {
+        "max_dimension": max_dimension or config.get("IMAGE_MAX_DIMENSION", 2000),
+        "output_format": output_format,
+        "quality": config.get("IMAGE_QUALITY", 82),
+    } if preprocess else None
+
+    def failure(index, filename, reason, error):
+        return {"index": index, "filename": filename, "ok": False, "reason": reason, "error": error}
+
+    results = [None] * len(files)
+    jobs = []
+    workers = max(1, min(config.get("IMAGE_UPLOAD_WORKERS", 4), len(files) or 1))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-upload") as pool:
+        for index, file in enumerate(files):
+            filename = file.filename or f"file-{index}"
+            # Read in the request thread; workers never touch the request.
+            data = file.read(max_bytes + 1)
+            if not data:
+                results[index] = failure(index, filename, "invalid", "Empty file")
+                continue
+            if len(data) > max_bytes:
+                results[index] = failure(
+                    index, filename, "invalid",
+                    f"File exceeds {max_bytes // (1024 * 1024)} MB limit",
+                )
+                continue
+            future = pool.submit(
+                _process_and_upload, upload_fn, data, filename, upload_options,
+                prepare_options, passthrough,
+            )
+            jobs.append((index, filename, future))
+
+        for index, filename, future in jobs:
+            try:
+                result = future.result()
+                results[index] = {"index": index, "filename": filename, "ok": True, "result": result}
+            except ImageRejected as e:
+                results[index] = failure(index, filename, "invalid", str(e))
+            except Exception as e:
+                current_app.logger.warning("Image upload failed for %s: %s", filename, e)
+                results[index] = failure(index, filename, "upload_error", "Upload failed")
+
+    return results
+
+
+def failed_uploads(results):
+    return [
+        {"index": r["index"], "filename": r["filename"], "reason": r["reason"], "error": r["error"]}
+        for r in results if not r["ok"]
+    ]
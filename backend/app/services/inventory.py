@@ -0,0 +1,170 @@
+"""Inventory ledger: record stock movements, fold them, query past stock.
+
+Stock changes are written as inventory_movements rows instead of edits to
+products.stock_quantity, so concurrent sales never contend on the product
+row and every change has a history:
+
+* on-hand stock = products.stock_quantity + movements whose folded_at is
+  NULL (pending_stock_column);
+* ``flask inventory compact`` marks every committed, unfolded movement
+  folded, adds the totals to stock_quantity and writes an
+  inventory_snapshots row per product it touched, all in one transaction.
+  A movement whose transaction is still open is not visible to it yet and
+  is simply folded by a later run, however long that transaction takes;
+* stock_as_of(product_id, at) starts from the latest snapshot taken at or
+  before ``at`` and adds the movements it does not include.
+"""
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, insert, literal, or_, select, update
+
+from app.extensions import db
+from app.models.inventory import InventoryMovement, InventorySnapshot
+from app.models.product import Product
+
+OPENING = "opening"
+SALE = "sale"
+RESTOCK = "restock"
+ADJUSTMENT = "adjustment"
+RETURN = "return"            # sold stock put back (order cancelled or reopened)
+
+
+def record_movement(product_id, quantity_delta, kind, order_id=None, note=None):
+    db.session.add(InventoryMovement(
+        product_id=product_id,
+        quantity_delta=quantity_delta,
+        kind=kind,
+        order_id=order_id,
+        note=note,
+        created_at=datetime.utcnow(),
+    ))
+
+
+def record_movements(rows):
+    """Insert several movements in one executemany; rows are dicts."""
+    if not rows:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(InventoryMovement), [
+        {"order_id": None, "note": None, "created_at": now, **row} for row in rows
+    ])
+
+
+def pending_deltas(product_ids):
+    """{product_id: sum of unfolded movements} for the given products."""
+    if not product_ids:
+        return {}
+    rows = db.session.execute(
+        select(InventoryMovement.product_id, func.sum(InventoryMovement.quantity_delta))
+        .where(
+            InventoryMovement.product_id.in_(product_ids),
+            InventoryMovement.folded_at.is_(None),
+        )
+        .group_by(InventoryMovement.product_id)
+    )
+    return {product_id: int(total or 0) for product_id, total in rows}
+
+
+def on_hand_quantity(product, pending=None):
+    if pending is None:
+        pending = pending_deltas([product.id])
+    return product.stock_quantity + pending.get(product.id, 0)
+
+
+def set_opening_stock(product, quantity):
+    """Record a new product's initial stock as an already-folded movement."""
+    now = datetime.utcnow()
+    db.session.add(InventoryMovement(
+        product_id=product.id,
+        quantity_delta=quantity,
+        kind=OPENING,
+        created_at=now,
+        folded_at=now,
+    ))
+    product.stock_quantity = quantity
+
+
+def compact_movements(now=None):
+    """Fold committed, unfolded movements into products.stock_quantity.
+
+    Marking the movements and adding them to stock happen in one
+    transaction, from the rows the marking UPDATE itself returned, so each
+    movement is counted exactly once. Concurrent runs wait on each other's
+    row locks and skip what the other folded.
+
+    Returns (products folded, movements folded).
+    """
+    now = now or datetime.utcnow()
+    folded = db.session.execute(
+        update(InventoryMovement)
+        .where(InventoryMovement.folded_at.is_(None))
+        .values(folded_at=now)
+        .returning(InventoryMovement.product_id, InventoryMovement.quantity_delta)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not folded:
+        db.session.commit()
+        return 0, 0
+
+    deltas = {}
+    for product_id, quantity_delta in folded:
+        deltas[product_id] = deltas.get(product_id, 0) + quantity_delta
+
+    products = Product.__table__
+    db.session.execute(
+        products.update()
+        .where(products.c.id == bindparam("product_id"))
+        .values(stock_quantity=products.c.stock_quantity + bindparam("delta")),
+        # In id order, like lock_products, so checkouts cannot deadlock with it
+        [{"product_id": product_id, "delta": delta} for product_id, delta in sorted(deltas.items())],
+    )
+    db.session.execute(
+        insert(InventorySnapshot).from_select(
+            ["product_id", "quantity", "taken_at"],
+            select(
+                Product.id,
+                Product.stock_quantity,
+                literal(now, InventorySnapshot.taken_at.type),
+            ).where(Product.id.in_(list(deltas))),
+        )
+    )
+    db.session.commit()
+    return len(deltas), len(folded)
+
+
+def stock_as_of(product_id, at):
+    """On-hand stock of a product at ``at`` (UTC), or None before its first movement."""
+    snapshot = db.session.execute(
+        select(InventorySnapshot.taken_at, InventorySnapshot.quantity)
+        .where(
+            InventorySnapshot.product_id == product_id,
+            InventorySnapshot.taken_at <= at,
+        )
+        .order_by(InventorySnapshot.taken_at.desc())
+        .limit(1)
+    ).first()
+
+    movements = (
+        select(
+            func.coalesce(func.sum(InventoryMovement.quantity_delta), 0),
+            func.count(InventoryMovement.id),
+        ).where(
+            InventoryMovement.product_id == product_id,
+            InventoryMovement.created_at <= at,
+        )
+    )
+    if snapshot is None:
+        quantity = 0
+    else:
+        # Movements the snapshot does not include: folded by a later run
+        # (even if created earlier) or not folded yet
+        taken_at, quantity = snapshot
+        movements = movements.where(or_(
+            InventoryMovement.folded_at.is_(None),
+            InventoryMovement.folded_at > taken_at,
+        ))
+
+    delta, count = db.session.execute(movements).one()
+    if snapshot is None and count == 0:
+        return None
+    return quantity + int(delta)
@@ -3,6 +3,7 @@ import base64
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from app.utils.metrics import track_outbound
 
 # Load .env from parent directory if needed
 import sys
@@ -42,7 +43,8 @@ def get_access_token():
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=15)
+        with track_outbound("mpesa", "oauth"):
+            response = requests.get(url, headers=headers, timeout=15)
         response.raise_for_status()
         return response.json()["access_token"]
     except Exception as e:
@@ -107,7 +109,8 @@ def stk_push(phone, amount, order_id):
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=20)
+        with track_outbound("mpesa", "stk_push"):
+            response = requests.post(url, json=payload, headers=headers, timeout=20)
         result = response.json()
         
         # M-Pesa returns ResponseCode "0" for success
@@ -169,7 +172,8 @@ def query_stk_status(checkout_request_id):
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=20)
+        with track_outbound("mpesa", "stk_query"):
+            response = requests.post(url, json=payload, headers=headers, timeout=20)
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -0,0 +1,290 @@
+"""Durable inbox for M-Pesa STK callbacks.
+
+mpesa_callback() stores every raw callback in mpesa_callbacks and commits
+before doing anything else, then processes it:
+
+* a repeat of the same callback (CheckoutRequestID + payload hash) hits
+  the unique index on insert and is acknowledged straight away - no
+  payment lookup, no Daraja status query. A different payload for the
+  same CheckoutRequestID is processed normally, so a forged or early
+  callback stored first cannot cause the genuine result to be dropped;
+* the payment/order changes are committed in the same transaction that
+  marks the entry processed or rejected;
+* anything that may succeed later (an exception, a Daraja status query
+  that did not confirm, a callback that beat the STK push response to
+  the database) leaves the entry failed.
+
+`flask mpesa replay` and POST /api/admin/payments/mpesa-callbacks/replay
+reprocess failed entries in batches, up to MPESA_CALLBACK_MAX_ATTEMPTS
+times, along with entries stuck in received for longer than
+MPESA_CALLBACK_STALE_SECONDS (the worker died mid-way).
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from flask import current_app
+from sqlalchemy import and_, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.mpesa_callback import MpesaCallback
+from app.models.payment import Payment
+from app.services.mpesa import query_stk_status
+from app.services.notifications import PAYMENT_CONFIRMED
+from app.services.order_status import CONFIRMED, PAYMENT_FAILED, can_transition
+from app.services.outbox import enqueue_event
+from app.services.payment_events import publish_payment_event
+from app.services.stock_reservations import commit_reservations
+from app.utils.metrics import MPESA_CALLBACKS
+
+RECEIVED = "received"
+PROCESSED = "processed"
+REJECTED = "rejected"
+FAILED = "failed"
+
+# Callback outcome -> entry status
+OUTCOME_STATUS = {
+    "paid": PROCESSED,
+    "failed": PROCESSED,
+    "duplicate": PROCESSED,
+    "invalid": REJECTED,
+    "amount_mismatch": REJECTED,
+    "phone_mismatch": REJECTED,
+    "unknown_payment": FAILED,
+    "verification_failed": FAILED,
+    "error": FAILED,
+}
+
+
+def _normalize_phone(phone):
+    if not phone:
+        return None
+    p = str(phone).strip()
+    if p.startswith("+"):
+        p = p[1:]
+    if p.startswith("0"):
+        p = "254" + p[1:]
+    elif not p.startswith("254"):
+        p = "254" + p
+    return p
+
+
+def _amounts_match(a, b):
+    try:
+        da = Decimal(str(a)).quantize(Decimal("0.01"))
+        dbv = Decimal(str(b)).quantize(Decimal("0.01"))
+        return da == dbv
+    except (InvalidOperation, TypeError):
+        return False
+
+
+def _stk_callback(payload):
+    if not isinstance(payload, dict):
+        return {}
+    return (payload.get("Body") or {}).get("stkCallback") or {}
+
+
+def store_callback(payload, now=None):
+    """Insert and commit the raw callback.
+
+    Returns the new entry, or None when this exact callback was already
+    received.
+    """
+    now = now or datetime.utcnow()
+    stk_callback = _stk_callback(payload)
+    try:
+        result_code = int(stk_callback.get("ResultCode"))
+    except (TypeError, ValueError):
+        result_code = None
+    entry = MpesaCallback(
+        checkout_request_id=stk_callback.get("CheckoutRequestID"),
+        merchant_request_id=stk_callback.get("MerchantRequestID"),
+        result_code=result_code,
+        payload=payload,
+        payload_hash=hashlib.sha256(
+            json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()
+        ).hexdigest(),
+        status=RECEIVED,
+        attempts=1,
+        received_at=now,
+        attempted_at=now,
+    )
+    db.session.add(entry)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    return entry
+
+
+def _apply_callback(payload):
+    """Apply a callback to its payment without committing.
+
+    Returns (outcome, payment or None).
+    """
+    stk_callback = _stk_callback(payload)
+    if not stk_callback:
+        current_app.logger.warning("Invalid callback structure - missing stkCallback")
+        return "invalid", None
+
+    result_code = stk_callback.get("ResultCode")
+    checkout_request_id = stk_callback.get("CheckoutRequestID")
+    current_app.logger.info("Callback IDs received for checkout %s", checkout_request_id)
+
+    payment = Payment.query.filter_by(mpesa_checkout_id=checkout_request_id).first()
+    if not payment:
+        current_app.logger.warning(
+            "Payment not found for CheckoutRequestID: %s", checkout_request_id
+        )
+        return "unknown_payment", None
+
+    if payment.status == "PAID":
+        return "duplicate", payment
+
+    if result_code != 0:
+        payment.mark_as_failed()
+        if payment.order and can_transition(payment.order.status, PAYMENT_FAILED):
+            payment.order.status = PAYMENT_FAILED
+        return "failed", payment
+
+    payment_details = {}
+    for item in stk_callback.get("CallbackMetadata", {}).get("Item", []):
+        name = item.get("Name")
+        value = item.get("Value")
+        if name and value is not None:
+            payment_details[name] = value
+    mpesa_receipt = payment_details.get("MpesaReceiptNumber")
+
+    # Verify against M-Pesa query endpoint (defense-in-depth)
+    status_check = query_stk_status(checkout_request_id)
+    if str(status_check.get("ResultCode")) != "0":
+        current_app.logger.warning("Status query failed for %s", checkout_request_id)
+        return "verification_failed", payment
+
+    if not _amounts_match(payment_details.get("Amount"),
+                          payment.order.total if payment.order else None):
+        current_app.logger.warning("Amount mismatch for payment %s", payment.id)
+        return "amount_mismatch", payment
+
+    if payment.order and _normalize_phone(payment.order.phone) != _normalize_phone(
+            payment_details.get("PhoneNumber")):
+        current_app.logger.warning("Phone mismatch for payment %s", payment.id)
+        return "phone_mismatch", payment
+
+    payment.mark_as_paid(mpesa_receipt=mpesa_receipt)
+    if payment.order and can_transition(payment.order.status, CONFIRMED):
+        payment.order.status = CONFIRMED
+
+    # Paid: the held stock is sold
+    commit_reservations(payment.order_id)
+
+    # Payment confirmation email goes out through the outbox
+    enqueue_event(
+        PAYMENT_CONFIRMED,
+        payment.order_id,
+        {"payment_id": payment.id, "mpesa_receipt": mpesa_receipt},
+        dedup_key=f"{PAYMENT_CONFIRMED}:{payment.id}",
+    )
+    return "paid", payment
+
+
+def _finish(entry, outcome, error=None):
+    entry.outcome = outcome
+    entry.status = OUTCOME_STATUS[outcome]
+    entry.last_error = error[:255] if error else None
+    if entry.status != FAILED:
+        entry.processed_at = datetime.utcnow()
+
+
+def process_callback(entry):
+    """Process a stored callback; returns its outcome.
+
+    Never raises: an exception rolls the payment changes back and leaves
+    the entry failed for replay (or, if even that cannot be saved, in
+    received until it is picked up as stale).
+    """
+    entry_id = entry.id
+    payment = None
+    try:
+        outcome, payment = _apply_callback(entry.payload)
+        _finish(entry, outcome)
+        db.session.commit()
+    except Exception as e:
+        current_app.logger.exception("EXCEPTION processing M-Pesa callback %s: %s", entry_id, e)
+        db.session.rollback()
+        outcome, payment = "error", None
+        try:
+            _finish(entry, outcome, str(e))
+            db.session.commit()
+        except Exception as save_error:
+            current_app.logger.error(
+                "Could not record failure of M-Pesa callback %s: %s", entry_id, save_error
+            )
+            db.session.rollback()
+
+    MPESA_CALLBACKS.labels(outcome).inc()
+    if outcome in ("paid", "failed") and payment is not None and payment.order:
+        publish_payment_event(payment.order)
+    return outcome
+
+
+def _claim_batch(batch_size, after_id=0, ids=None, include_rejected=False, now=None):
+    """Mark up to ``batch_size`` replayable entries as received and commit."""
+    now = now or datetime.utcnow()
+    config = current_app.config
+    stale = now - timedelta(seconds=config.get("MPESA_CALLBACK_STALE_SECONDS", 300))
+    if ids:
+        # Explicitly chosen entries are replayed whatever their attempts
+        replayable = and_(
+            MpesaCallback.id.in_(ids),
+            MpesaCallback.status != PROCESSED,
+            or_(MpesaCallback.status != RECEIVED, MpesaCallback.attempted_at < stale),
+        )
+    else:
+        statuses = [FAILED, REJECTED] if include_rejected else [FAILED]
+        replayable = or_(
+            and_(
+                MpesaCallback.status.in_(statuses),
+                MpesaCallback.attempts < config.get("MPESA_CALLBACK_MAX_ATTEMPTS", 10),
+            ),
+            and_(MpesaCallback.status == RECEIVED, MpesaCallback.attempted_at < stale),
+        )
+    stmt = (
+        select(MpesaCallback)
+        .where(replayable, MpesaCallback.id > after_id)
+        .order_by(MpesaCallback.id)
+        .limit(batch_size)
+    )
+    if db.engine.dialect.name == "postgresql":
+        stmt = stmt.with_for_update(skip_locked=True)
+    entries = db.session.scalars(stmt).all()
+    for entry in entries:
+        entry.status = RECEIVED
+        entry.attempts += 1
+        entry.attempted_at = now
+    db.session.commit()
+    return entries
+
+
+def replay_callbacks(batch_size=50, max_batches=None, ids=None, include_rejected=False):
+    """Reprocess failed (and stale) callbacks, oldest first.
+
+    Each entry is tried at most once per call. Returns
+    {"replayed": n, "processed": n, "rejected": n, "failed": n}.
+    """
+    counts = {"replayed": 0, PROCESSED: 0, REJECTED: 0, FAILED: 0}
+    batches = last_id = 0
+    while max_batches is None or batches < max_batches:
+        entries = _claim_batch(batch_size, last_id, ids, include_rejected)
+        if not entries:
+            break
+        for entry in entries:
+            outcome = process_callback(entry)
+            counts["replayed"] += 1
+            counts[OUTCOME_STATUS[outcome]] += 1
+        last_id = entries[-1].id
+        batches += 1
+    return counts
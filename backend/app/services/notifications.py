@@ -0,0 +1,114 @@
+"""Outbox handlers: what delivering each domain event means.
+
+Each handler receives the OutboxEvent and must raise if delivery failed
+so the relay retries it; returning normally marks the handler delivered
+for that event. Handlers skip quietly when their channel is not
+configured. Every URL in OUTBOX_WEBHOOK_URLS gets its own handler, so a
+failing endpoint does not cause redelivery to the others.
+"""
+import hashlib
+import hmac
+import json
+
+import requests
+from flask import current_app
+
+from app.extensions import db
+from app.models.order import Order
+from app.models.payment import Payment
+from app.services.whatsapp import send_order_whatsapp_notification
+from app.utils.email import (
+    build_order_confirmation_html,
+    build_payment_confirmation_html,
+    send_email_smtp,
+)
+from app.utils.metrics import track_outbound
+
+ORDER_CREATED = "order.created"
+PAYMENT_CONFIRMED = "payment.confirmed"
+
+
+def _smtp_configured():
+    config = current_app.config
+    return all(config.get(key) for key in ("SMTP_SERVER", "SMTP_PORT", "SMTP_EMAIL", "SMTP_PASSWORD"))
+
+
+def order_confirmation_email(event):
+    order = db.session.get(Order, event.aggregate_id)
+    if order is None or not order.email or not _smtp_configured():
+        return
+    send_email_smtp(
+        order.email,
+        "Your SmartNest Order Confirmation",
+        build_order_confirmation_html(order),
+    )
+
+
+def order_whatsapp_notification(event):
+    order = db.session.get(Order, event.aggregate_id)
+    if order is None:
+        return
+    send_order_whatsapp_notification(
+        order, event.payload.get("items", []), event.payload.get("delivery_fee", 0)
+    )
+
+
+def payment_confirmation_email(event):
+    payment = db.session.get(Payment, event.payload.get("payment_id"))
+    if payment is None or payment.order is None or not payment.order.email:
+        return
+    if not _smtp_configured():
+        return
+    send_email_smtp(
+        payment.order.email,
+        "Payment Confirmed - SmartNest",
+        build_payment_confirmation_html(payment.order, payment),
+    )
+
+
+def post_webhook(url, event):
+    """POST the event as JSON, signed with OUTBOX_WEBHOOK_SECRET.
+
+    Receivers should dedupe on X-Event-Id: delivery is at-least-once.
+    """
+    body = json.dumps({
+        "id": event.id,
+        "type": event.event_type,
+        "aggregate_id": event.aggregate_id,
+        "created_at": event.created_at.isoformat() + "Z",
+        "data": event.payload,
+    }, separators=(",", ":"), default=str).encode()
+    headers = {"Content-Type": "application/json", "X-Event-Id": str(event.id)}
+    secret = current_app.config.get("OUTBOX_WEBHOOK_SECRET")
+    if secret:
+        digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        headers["X-Signature"] = f"sha256={digest}"
+    with track_outbound("webhook", "post"):
+        response = requests.post(url, data=body, headers=headers, timeout=10)
+    response.raise_for_status()
+
+
+EVENT_HANDLERS = {
+    ORDER_CREATED: [
+        ("email", order_confirmation_email),
+        ("whatsapp", order_whatsapp_notification),
+    ],
+    PAYMENT_CONFIRMED: [
+        ("email", payment_confirmation_email),
+    ],
+}
+
+
+def webhook_urls():
+    raw = current_app.config.get("OUTBOX_WEBHOOK_URLS") or ""
+    return [url.strip() for url in raw.split(",") if url.strip()]
+
+
+def handlers_for(event_type):
+    """[(handler name, callable(event)), ...] for an event type."""
+    handlers = list(EVENT_HANDLERS.get(event_type, []))
+    for url in webhook_urls():
+        # Hashed so URLs carrying credentials do not end up in outbox_deliveries
+        name = "webhook:" + hashlib.sha256(url.encode()).hexdigest()[:16]
+        handlers.append((name, lambda event, url=url: post_webhook(url, event)))
+    return handlers
@@ -0,0 +1,45 @@
+"""Order status values and the transitions allowed between them.
+
+Customer-facing flows move orders out of "pending" (payment confirmed or
+failed); admins drive fulfilment. Anything not listed in TRANSITIONS is
+refused, and setting an order to the status it already has is a no-op.
+"""
+PENDING = "pending"
+CONFIRMED = "CONFIRMED"            # paid via M-Pesa or confirmed as COD
+PAYMENT_FAILED = "PAYMENT_FAILED"
+PROCESSING = "processing"
+SHIPPED = "shipped"
+DELIVERED = "delivered"
+CANCELLED = "cancelled"
+
+TRANSITIONS = {
+    PENDING: {CONFIRMED, PAYMENT_FAILED, PROCESSING, CANCELLED},
+    PAYMENT_FAILED: {PENDING, CONFIRMED, PROCESSING, CANCELLED},
+    # Cancelling after stock was committed returns it (release_reservations)
+    CONFIRMED: {PROCESSING, SHIPPED, CANCELLED},
+    # back to pending when an admin reverses a payment; the sold stock is
+    # returned and held again (reopen_reservations_for_orders)
+    PROCESSING: {PENDING, SHIPPED, CANCELLED},
+    SHIPPED: {DELIVERED},
+    DELIVERED: set(),
+    CANCELLED: set(),
+}
+
+# Statuses an admin may set through the order status endpoints
+ADMIN_STATUSES = (PENDING, PROCESSING, SHIPPED, DELIVERED, CANCELLED)
+
+# Reaching one of these takes the order's reserved stock
+FULFILMENT_STATUSES = frozenset({PROCESSING, SHIPPED, DELIVERED})
+
+# Orders still waiting to be paid; an admin marking the payment PAID moves
+# them on to PROCESSING
+AWAITING_PAYMENT_STATUSES = frozenset({PENDING, PAYMENT_FAILED})
+
+
+def can_transition(current, new):
+    return new in TRANSITIONS.get(current, ())
+
+
+def allowed_from(new):
+    """Statuses an order may be in to move to ``new``."""
+    return sorted(status for status, targets in TRANSITIONS.items() if new in targets)
@@ -0,0 +1,223 @@
+"""Transactional outbox for notifications and domain events.
+
+Routes call enqueue_event() before their commit, so an event is stored if
+and only if the order/payment change it describes is. `flask outbox relay`
+then delivers events in batches:
+
+* claim_batch() picks due pending events (FOR UPDATE SKIP LOCKED on
+  PostgreSQL, so several relay workers never claim the same rows) and
+  leases them for OUTBOX_LEASE_SECONDS by pushing available_at forward;
+  a worker that dies mid-batch leaves its events to be picked up again
+  once the lease runs out;
+* the lease end doubles as a fencing token: before each handler runs,
+  and when the outcome is saved, the worker renews/updates the event only
+  WHERE available_at still equals the lease it set. If the batch ran
+  long and another worker has re-claimed the event, the update matches
+  nothing and this worker drops the event instead of delivering it twice.
+  OUTBOX_LEASE_SECONDS must exceed the slowest single handler (SMTP 10s,
+  WhatsApp 20s, webhooks 10s by default);
+* each handler from app/services/notifications.py runs once per event;
+  successful handlers are recorded in outbox_deliveries, so a retry only
+  re-runs the ones that failed;
+* failures back off exponentially until OUTBOX_MAX_ATTEMPTS, then the
+  event is marked failed (`flask outbox retry` requeues it).
+
+Delivery is at-least-once: a handler can run twice if the worker dies
+between delivering and recording it. dedup_key keeps the same event from
+being enqueued twice (e.g. a repeated M-Pesa callback).
+"""
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from app.extensions import db
+from app.models.outbox import OutboxDelivery, OutboxEvent
+from app.services.notifications import handlers_for
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def enqueue_event(event_type, aggregate_id, payload=None, dedup_key=None):
+    """Add an event to the current transaction; the caller commits.
+
+    Returns None when an event with this dedup_key already exists.
+    """
+    if dedup_key is not None and db.session.scalar(
+        select(OutboxEvent.id).where(OutboxEvent.dedup_key == dedup_key)
+    ):
+        return None
+    event = OutboxEvent(
+        event_type=event_type,
+        aggregate_id=aggregate_id,
+        payload=payload or {},
+        dedup_key=dedup_key,
+        status=PENDING,
+        available_at=datetime.utcnow(),
+    )
+    db.session.add(event)
+    return event
+
+
+def _backoff(attempts):
+    base = current_app.config.get("OUTBOX_RETRY_BASE_SECONDS", 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 6 * 3600))
+
+
+def _lease():
+    return timedelta(seconds=current_app.config.get("OUTBOX_LEASE_SECONDS", 120))
+
+
+def claim_batch(batch_size, now=None):
+    """Lease up to ``batch_size`` due events to this worker and commit.
+
+    Returns (events, lease end).
+    """
+    now = now or datetime.utcnow()
+    lease_end = now + _lease()
+    stmt = (
+        select(OutboxEvent)
+        .where(OutboxEvent.status == PENDING, OutboxEvent.available_at <= now)
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+    )
+    if db.engine.dialect.name == "postgresql":
+        stmt = stmt.with_for_update(skip_locked=True)
+    events = db.session.scalars(stmt).all()
+    for event in events:
+        event.attempts += 1
+        event.available_at = lease_end
+    db.session.commit()
+    return events, lease_end
+
+
+def _update_if_leased(event_id, lease_end, **values):
+    """Update the event only while this worker still holds its lease."""
+    result = db.session.execute(
+        update(OutboxEvent)
+        .where(
+            OutboxEvent.id == event_id,
+            OutboxEvent.status == PENDING,
+            OutboxEvent.available_at == lease_end,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _renew_lease(event_id, lease_end):
+    """Extend the lease; returns the new lease end, or None if it was lost."""
+    renewed = datetime.utcnow() + _lease()
+    return renewed if _update_if_leased(event_id, lease_end, available_at=renewed) else None
+
+
+def deliver_event(event, lease_end, now=None):
+    """Run the event's outstanding handlers; returns True once all delivered.
+
+    Returns False without touching the event if its lease was lost.
+    """
+    event_id, event_type, attempts = event.id, event.event_type, event.attempts
+    delivered = set(db.session.scalars(
+        select(OutboxDelivery.handler).where(OutboxDelivery.event_id == event_id)
+    ))
+    errors = []
+    for name, handler in handlers_for(event_type):
+        if name in delivered:
+            continue
+        lease_end = _renew_lease(event_id, lease_end)
+        if lease_end is None:
+            current_app.logger.warning(
+                "Outbox event %s lease lost before handler %s; leaving it", event_id, name
+            )
+            return False
+        try:
+            handler(event)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(
+                "Outbox event %s handler %s failed: %s", event_id, name, e
+            )
+            errors.append(f"{name}: {e}")
+            continue
+        db.session.add(OutboxDelivery(event_id=event_id, handler=name))
+        db.session.commit()
+
+    now = now or datetime.utcnow()
+    if not errors:
+        outcome = {"status": DONE, "processed_at": now, "last_error": None}
+    elif attempts >= current_app.config.get("OUTBOX_MAX_ATTEMPTS", 8):
+        outcome = {"status": FAILED, "processed_at": now,
+                   "last_error": "; ".join(errors)[:255]}
+    else:
+        outcome = {"available_at": now + _backoff(attempts),
+                   "last_error": "; ".join(errors)[:255]}
+    if not _update_if_leased(event_id, lease_end, **outcome):
+        current_app.logger.warning("Outbox event %s lease lost before saving its outcome", event_id)
+        return False
+    return not errors
+
+
+def relay_batch(batch_size=None):
+    """Claim and deliver one batch; returns the number of events claimed."""
+    batch_size = batch_size or current_app.config.get("OUTBOX_BATCH_SIZE", 50)
+    events, lease_end = claim_batch(batch_size)
+    for event in events:
+        deliver_event(event, lease_end)
+    return len(events)
+
+
+def relay_outbox(once=False, batch_size=None, poll_interval=None, sleep=time.sleep):
+    """Deliver events until the outbox is drained (``once``) or forever.
+
+    Returns the number of events processed.
+    """
+    poll_interval = (
+        current_app.config.get("OUTBOX_POLL_INTERVAL_SECONDS", 1.0)
+        if poll_interval is None else poll_interval
+    )
+    processed = 0
+    while True:
+        count = relay_batch(batch_size)
+        processed += count
+        if count:
+            continue
+        if once:
+            return processed
+        sleep(poll_interval)
+
+
+def retry_failed_events(event_type=None):
+    """Requeue failed events; handlers already delivered are still skipped."""
+    stmt = (
+        update(OutboxEvent)
+        .where(OutboxEvent.status == FAILED)
+        .values(status=PENDING, attempts=0, available_at=datetime.utcnow(), processed_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    if event_type:
+        stmt = stmt.where(OutboxEvent.event_type == event_type)
+    count = db.session.execute(stmt).rowcount
+    db.session.commit()
+    return count
+
+
+def purge_delivered_events(older_than_days):
+    """Delete done events older than ``older_than_days``."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    old_events = select(OutboxEvent.id).where(
+        OutboxEvent.status == DONE,
+        OutboxEvent.processed_at < cutoff,
+    )
+    db.session.execute(
+        delete(OutboxDelivery).where(OutboxDelivery.event_id.in_(old_events))
+    )
+    count = db.session.execute(
+        delete(OutboxEvent).where(OutboxEvent.id.in_(old_events))
+    ).rowcount
+    db.session.commit()
+    return count
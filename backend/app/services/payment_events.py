@@ -0,0 +1,213 @@
+"""Push order payment status changes to clients waiting on an SSE stream.
+
+Publishers (M-Pesa callback, COD confirmation, admin status changes) call
+publish_payment_event(order) after committing. Subscribers register a
+queue for one order in this process's hub. PAYMENT_EVENTS_BACKEND picks
+how an event reaches the hub of every worker:
+
+* "local"    - deliver in-process only (single worker / development);
+* "postgres" - NOTIFY on the app database; each worker runs one LISTEN
+               thread that feeds its hub;
+* "redis"    - PUBLISH / SUBSCRIBE on PAYMENT_EVENTS_REDIS_URL (needs the
+               optional ``redis`` package).
+
+Listener threads start lazily on the first subscription, so they are
+never created in a pre-fork master process.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+import sqlalchemy as sa
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "payment_events"
+FINAL_PAYMENT_STATUSES = {"PAID", "FAILED", "CANCELLED"}
+
+
+def payment_status_payload(order):
+    """Status sent to clients; ``final`` tells them to stop listening."""
+    payment = order.payment
+    payload = {
+        "order_id": order.id,
+        "status": order.status,
+        "payment_status": payment.status if payment else "NONE",
+        "payment_method": payment.method if payment else None,
+        "paid_at": payment.paid_at.isoformat() if payment and payment.paid_at else None,
+        "total": float(order.total),
+    }
+    payload["final"] = is_final_status(payload)
+    return payload
+
+
+def is_final_status(payload):
+    """No further change is expected without admin action."""
+    return (
+        payload["payment_status"] in FINAL_PAYMENT_STATUSES
+        or payload["payment_method"] == "cod"
+    )
+
+
+class PaymentEventHub:
+    """Per-process fan-out of events to the queues waiting on an order."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, order_id):
+        q = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(order_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, order_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(order_id)
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[order_id]
+
+    def deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(event.get("order_id"), ()))
+        for q in subscribers:
+            q.put(event)
+
+
+class LocalBackend:
+    def __init__(self, hub):
+        self.hub = hub
+
+    def start(self):
+        pass
+
+    def publish(self, event):
+        self.hub.deliver(event)
+
+
+class _ListenerBackend:
+    """Runs _listen() on a daemon thread, restarting it after errors."""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="payment-events", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        backoff = 1
+        while True:
+            try:
+                self._listen()
+                backoff = 1
+            except Exception as e:
+                logger.warning("Payment event listener failed, retrying in %ss: %s", backoff, e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _dispatch(self, raw):
+        try:
+            self.hub.deliver(json.loads(raw))
+        except (TypeError, ValueError):
+            logger.warning("Ignoring malformed payment event: %r", raw)
+
+
+class PostgresBackend(_ListenerBackend):
+    def __init__(self, hub, database_url):
+        super().__init__(hub)
+        self.engine = sa.create_engine(database_url, pool_size=1, max_overflow=2, pool_pre_ping=True)
+
+    def publish(self, event):
+        with self.engine.begin() as conn:
+            conn.execute(
+                sa.text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": CHANNEL, "payload": json.dumps(event)},
+            )
+
+    def _listen(self):
+        raw = self.engine.raw_connection()
+        try:
+            conn = raw.driver_connection
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._dispatch(conn.notifies.pop(0).payload)
+        finally:
+            raw.invalidate()
+
+
+class RedisBackend(_ListenerBackend):
+    def __init__(self, hub, redis_url):
+        super().__init__(hub)
+        import redis
+
+        self.client = redis.Redis.from_url(redis_url)
+
+    def publish(self, event):
+        self.client.publish(CHANNEL, json.dumps(event))
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(CHANNEL)
+            for message in pubsub.listen():
+                self._dispatch(message["data"])
+        finally:
+            pubsub.close()
+
+
+def init_payment_events(app):
+    hub = PaymentEventHub()
+    backend_name = app.config.get("PAYMENT_EVENTS_BACKEND", "local")
+    if backend_name == "postgres":
+        backend = PostgresBackend(hub, app.config["SQLALCHEMY_DATABASE_URI"])
+    elif backend_name == "redis":
+        backend = RedisBackend(hub, app.config["PAYMENT_EVENTS_REDIS_URL"])
+    elif backend_name == "local":
+        backend = LocalBackend(hub)
+    else:
+        raise ValueError(f"Unknown PAYMENT_EVENTS_BACKEND: {backend_name}")
+    app.extensions["payment_events"] = backend
+
+
+def _backend():
+    return current_app.extensions["payment_events"]
+
+
+def publish_payment_event(order):
+    """Announce an order's committed payment status; never raises."""
+    try:
+        _backend().publish(payment_status_payload(order))
+    except Exception as e:
+        logger.warning("Payment event publish failed for order %s: %s", order.id, e)
+
+
+def subscribe_payment_events(order_id):
+    """Return (queue, unsubscribe) for this order's events in this process.
+
+    unsubscribe() does not need an app context, so streaming responses can
+    call it after the request context is gone.
+    """
+    backend = _backend()
+    backend.start()
+    q = backend.hub.subscribe(order_id)
+    return q, lambda: backend.hub.unsubscribe(order_id, q)
@@ -0,0 +1,139 @@
+"""Cart pricing shared by the quote endpoint and create_order.
+
+quote_cart prices a whole cart with one column-projected query (effective
+price and available stock per product). The result can be sealed into a
+short-lived signed token; create_order accepts it and uses the quoted
+unit prices instead of re-pricing each line.
+"""
+from decimal import Decimal
+
+from flask import current_app
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.product import Product
+from app.utils.serializers import product_columns, serialize_product_row
+
+FREE_DELIVERY_THRESHOLD = Decimal("5000")
+DELIVERY_FEE = Decimal("500")
+
+QUOTE_FIELDS = ("id", "name", "effective_price", "available_stock")
+_QUOTE_SALT = "order-quote"
+
+
+class QuoteError(ValueError):
+    """The quote token is invalid, expired or does not match the cart."""
+
+
+def unit_price(value):
+    """Price charged per unit: rounded to cents the same way everywhere."""
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def delivery_fee_for(subtotal):
+    return Decimal("0") if Decimal(subtotal) >= FREE_DELIVERY_THRESHOLD else DELIVERY_FEE
+
+
+def parse_cart(items):
+    """[(product_id, qty), ...] from request items, or raise ValueError."""
+    if not items:
+        raise ValueError("No items in order")
+    if not isinstance(items, list):
+        raise ValueError("Invalid product_id or quantity")
+    lines = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Invalid product_id or quantity")
+        product_id = item.get("product_id")
+        qty = item.get("qty", 0)
+        if not isinstance(product_id, int) or not isinstance(qty, int) or qty <= 0:
+            raise ValueError("Invalid product_id or quantity")
+        lines.append((product_id, qty))
+    return lines
+
+
+def quote_cart(lines):
+    """Price [(product_id, qty), ...] in one query.
+
+    Returns a dict with per-line prices and availability, subtotal,
+    delivery_fee, total and ``orderable`` (every product exists and has
+    enough available stock for the whole cart).
+    """
+    product_ids = {product_id for product_id, _ in lines}
+    rows = db.session.execute(
+        select(*product_columns(QUOTE_FIELDS)).where(Product.id.in_(product_ids))
+    ).all()
+    products = {row.id: serialize_product_row(row, QUOTE_FIELDS) for row in rows}
+
+    wanted = {}
+    for product_id, qty in lines:
+        wanted[product_id] = wanted.get(product_id, 0) + qty
+
+    subtotal = Decimal("0")
+    quoted = []
+    missing = []
+    for product_id, qty in lines:
+        product = products.get(product_id)
+        if product is None:
+            missing.append(product_id)
+            continue
+        price = unit_price(product["effective_price"])
+        line_total = price * qty
+        subtotal += line_total
+        available = max(product["available_stock"], 0)
+        quoted.append({
+            "product_id": product_id,
+            "name": product["name"],
+            "qty": qty,
+            "unit_price": price,
+            "line_total": line_total,
+            "available": available,
+            "in_stock": available >= wanted[product_id],
+        })
+
+    delivery_fee = delivery_fee_for(subtotal)
+    return {
+        "items": quoted,
+        "missing_product_ids": missing,
+        "subtotal": subtotal,
+        "delivery_fee": delivery_fee,
+        "total": subtotal + delivery_fee,
+        "orderable": not missing and all(line["in_stock"] for line in quoted),
+    }
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt=_QUOTE_SALT)
+
+
+def sign_quote(quote):
+    return _serializer().dumps({
+        "items": [
+            [line["product_id"], line["qty"], str(line["unit_price"])]
+            for line in quote["items"]
+        ],
+        "delivery_fee": str(quote["delivery_fee"]),
+    })
+
+
+def load_quote(token, lines):
+    """Return ({product_id: unit_price}, delivery_fee) from a quote token.
+
+    Raises QuoteError unless the token is valid, unexpired and quotes
+    exactly these cart lines.
+    """
+    max_age = current_app.config.get("ORDER_QUOTE_TTL_SECONDS", 600)
+    try:
+        data = _serializer().loads(token, max_age=max_age)
+    except SignatureExpired:
+        raise QuoteError("Quote has expired")
+    except BadSignature:
+        raise QuoteError("Invalid quote token")
+
+    quoted_lines = sorted((product_id, qty) for product_id, qty, _ in data["items"])
+    if quoted_lines != sorted(lines):
+        raise QuoteError("Quote does not match the cart")
+
+    prices = {product_id: Decimal(price) for product_id, _, price in data["items"]}
+    return prices, Decimal(data["delivery_fee"])
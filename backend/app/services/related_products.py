@@ -0,0 +1,168 @@
+"""Precompute the "related products" list shown on product detail pages.
+
+Candidates are scored from three signals:
+
+* co-purchase: how many orders contain both products (co_purchase_pairs);
+* same category;
+* price proximity: 1 - |a - b| / max(a, b).
+
+The top RELATED_PRODUCTS_LIMIT candidates per product are written to
+product_related, so the detail endpoint only does an indexed lookup.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, or_, select
+
+from app.extensions import db
+from app.models.co_purchase import CoPurchasePair
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.product import Product
+from app.models.related_product import RelatedProduct
+
+RELATED_PRODUCTS_LIMIT = 8
+
+CO_PURCHASE_WEIGHT = 3.0
+SAME_CATEGORY_WEIGHT = 1.0
+PRICE_PROXIMITY_WEIGHT = 1.0
+
+
+def _price_proximity(a, b):
+    a, b = float(a or 0), float(b or 0)
+    high = max(a, b)
+    if high <= 0:
+        return 1.0
+    return 1.0 - abs(a - b) / high
+
+
+def _co_purchase_counts(product_ids=None):
+    """{product_id: {other_id: orders containing both}} from the co-purchase index."""
+    stmt = select(
+        CoPurchasePair.product_id,
+        CoPurchasePair.other_product_id,
+        CoPurchasePair.order_count,
+    )
+    if product_ids is not None:
+        stmt = stmt.where(CoPurchasePair.product_id.in_(product_ids))
+
+    counts = defaultdict(dict)
+    for product_id, other_id, n in db.session.execute(stmt):
+        counts[product_id][other_id] = n
+    return counts
+
+
+def score_related(product_ids=None, limit=RELATED_PRODUCTS_LIMIT):
+    """Return {product_id: [(related_id, score), ...]} best first."""
+    catalog = db.session.execute(
+        select(Product.id, Product.category_id, Product.price)
+    ).all()
+    by_category = defaultdict(list)
+    for row in catalog:
+        by_category[row.category_id].append(row)
+
+    if product_ids is None:
+        targets = catalog
+    else:
+        wanted = set(product_ids)
+        targets = [row for row in catalog if row.id in wanted]
+    co_purchase = _co_purchase_counts(None if product_ids is None else [t.id for t in targets])
+    price_of = {row.id: row.price for row in catalog}
+    category_of = {row.id: row.category_id for row in catalog}
+
+    result = {}
+    for target in targets:
+        bought_with = co_purchase.get(target.id, {})
+        max_bought = max(bought_with.values(), default=0)
+
+        candidate_ids = {row.id for row in by_category[target.category_id]}
+        candidate_ids.update(oid for oid in bought_with if oid in price_of)
+        candidate_ids.discard(target.id)
+
+        scored = []
+        for cid in candidate_ids:
+            score = PRICE_PROXIMITY_WEIGHT * _price_proximity(target.price, price_of[cid])
+            if category_of[cid] == target.category_id:
+                score += SAME_CATEGORY_WEIGHT
+            if max_bought:
+                score += CO_PURCHASE_WEIGHT * bought_with.get(cid, 0) / max_bought
+            scored.append((cid, round(score, 4)))
+
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        result[target.id] = scored[:limit]
+    return result
+
+
+def stale_product_ids():
+    """Products with no related list, or bought since their list was built."""
+    last_built = (
+        select(RelatedProduct.product_id, func.max(RelatedProduct.computed_at).label("computed_at"))
+        .group_by(RelatedProduct.product_id)
+        .subquery()
+    )
+    never_built = select(Product.id).outerjoin(
+        last_built, last_built.c.product_id == Product.id
+    ).where(last_built.c.product_id.is_(None))
+
+    bought_since = (
+        select(OrderItem.product_id)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(last_built, last_built.c.product_id == OrderItem.product_id)
+        .where(Order.created_at > last_built.c.computed_at)
+        .distinct()
+    )
+    ids = set(db.session.scalars(never_built))
+    ids.update(db.session.scalars(bought_since))
+    return sorted(ids)
+
+
+def rebuild_related_products(product_ids=None, limit=RELATED_PRODUCTS_LIMIT):
+    """Recompute and store related lists. ``None`` rebuilds every product.
+
+    Returns the number of products whose list was rewritten.
+    """
+    if product_ids is not None and not product_ids:
+        return 0
+
+    scores = score_related(product_ids, limit)
+    if not scores:
+        return 0
+
+    now = datetime.utcnow()
+    targets = list(scores)
+    db.session.execute(
+        delete(RelatedProduct).where(RelatedProduct.product_id.in_(targets))
+    )
+    rows = [
+        {
+            "product_id": product_id,
+            "related_product_id": related_id,
+            "rank": rank,
+            "score": score,
+            "computed_at": now,
+        }
+        for product_id, related in scores.items()
+        for rank, (related_id, score) in enumerate(related)
+    ]
+    if rows:
+        db.session.execute(insert(RelatedProduct), rows)
+    db.session.commit()
+    return len(targets)
+
+
+def delete_related_for(product_id):
+    """Drop rows pointing to or from a product that is being deleted."""
+    db.session.execute(
+        delete(RelatedProduct).where(or_(
+            RelatedProduct.product_id == product_id,
+            RelatedProduct.related_product_id == product_id,
+        ))
+    )
+
+
+def related_product_ids(product_id):
+    return list(db.session.scalars(
+        select(RelatedProduct.related_product_id)
+        .where(RelatedProduct.product_id == product_id)
+        .order_by(RelatedProduct.rank)
+    ))
@@ -0,0 +1,84 @@
+"""Signed direct-to-Cloudinary uploads.
+
+The API signs upload parameters (sign_upload) and the browser posts the
+file straight to Cloudinary, so image bytes never pass through a Flask
+worker. The browser then registers the upload result; verify_upload
+checks Cloudinary's response signature, that the asset landed in the
+folder we signed for, and that it was uploaded within
+SIGNED_UPLOAD_TTL_SECONDS, before we store its URL.
+"""
+import hmac
+import re
+import time
+
+import cloudinary
+import cloudinary.utils
+from flask import current_app
+
+_FORMAT_RE = re.compile(r"^[a-z0-9]{2,5}$")
+
+
+class UploadVerificationError(ValueError):
+    """A registered upload did not pass verification."""
+
+
+def sign_upload(folder, **params):
+    """Signed parameters the browser sends with its upload request."""
+    config = cloudinary.config()
+    params = {
+        key: ",".join(value) if isinstance(value, (list, tuple)) else value
+        for key, value in params.items()
+    }
+    params.update(folder=folder, timestamp=int(time.time()))
+    signature = cloudinary.utils.api_sign_request(
+        params, config.api_secret, config.signature_algorithm
+    )
+    return {
+        **params,
+        "signature": signature,
+        "api_key": config.api_key,
+        "cloud_name": config.cloud_name,
+        "upload_url": cloudinary.utils.cloudinary_api_url("upload", resource_type="image"),
+        "expires_in": current_app.config.get("SIGNED_UPLOAD_TTL_SECONDS", 900),
+    }
+
+
+def verify_upload(result, folder):
+    """Return the delivery URL for a verified upload result.
+
+    ``result`` holds public_id, version and signature from Cloudinary's
+    upload response, and optionally format.
+    """
+    public_id = str(result.get("public_id") or "")
+    signature = str(result.get("signature") or "")
+    try:
+        version = int(result.get("version"))
+    except (TypeError, ValueError):
+        raise UploadVerificationError("version is required")
+
+    if not public_id or not signature:
+        raise UploadVerificationError("public_id and signature are required")
+    if not public_id.startswith(folder.rstrip("/") + "/"):
+        raise UploadVerificationError("Upload is not in the expected folder")
+
+    config = cloudinary.config()
+    expected = cloudinary.utils.api_sign_request(
+        {"public_id": public_id, "version": version},
+        config.api_secret,
+        config.signature_algorithm,
+    )
+    if not hmac.compare_digest(signature, expected):
+        raise UploadVerificationError("Invalid upload signature")
+
+    ttl = current_app.config.get("SIGNED_UPLOAD_TTL_SECONDS", 900)
+    if time.time() - version > ttl:
+        raise UploadVerificationError("Upload is too old to register")
+
+    fmt = result.get("format")
+    if fmt is not None and not _FORMAT_RE.match(str(fmt)):
+        raise UploadVerificationError("Invalid format")
+
+    url, _ = cloudinary.utils.cloudinary_url(
+        public_id, version=version, format=fmt, secure=True, resource_type="image"
+    )
+    return url
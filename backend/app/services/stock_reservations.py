@@ -0,0 +1,304 @@
+"""Hold stock for unpaid orders instead of decrementing it up front.
+
+create_order reserves each line; the reservation is then either
+
+* committed, when the order is paid (M-Pesa callback, admin), confirmed
+  as cash on delivery or moved on to fulfilment - a sale movement takes
+  the reserved quantity off on-hand stock (app/services/inventory.py); or
+* released, when the order is cancelled, its payment ends FAILED or
+  CANCELLED, or it passes expires_at (STOCK_RESERVATION_TTL_MINUTES).
+
+Retrying the payment of an order whose hold lapsed (failed STK push,
+timeout) holds its stock again first, if it is still available
+(rehold_reservations). A payment that lands after the hold lapsed still
+records the sale, and logs an error if that oversells the product.
+
+Cancelling an order whose stock was already committed records a return
+movement that puts it back; moving a committed order back to pending
+(an admin reversing a payment) returns the stock and holds it again.
+
+Releases for failed payments and timeouts are done in bulk by
+``flask reservations sweep``, which should run every minute or so.
+Available stock is on-hand stock minus the product's active
+reservations (see reserved_quantity_column in the model), an aggregate
+served by ix_stock_reservations_product_status.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, select, update
+
+from app.extensions import db
+from app.models.payment import Payment
+from app.models.product import Product
+from app.models.stock_reservation import StockReservation
+from app.services.inventory import (
+    RETURN,
+    SALE,
+    on_hand_quantity,
+    pending_deltas,
+    record_movements,
+)
+
+ACTIVE = "active"
+COMMITTED = "committed"
+RELEASED = "released"
+
+RELEASE_ON_PAYMENT_STATUSES = ("FAILED", "CANCELLED")
+
+# Released holds that a later payment may still take: the order was not
+# cancelled, its payment failed or it ran out of time
+LAPSED_REASONS = ("payment_failed", "expired")
+
+
+def reserved_quantities(product_ids):
+    """{product_id: actively reserved quantity} for the given products."""
+    if not product_ids:
+        return {}
+    rows = db.session.execute(
+        select(StockReservation.product_id, func.sum(StockReservation.quantity))
+        .where(
+            StockReservation.product_id.in_(product_ids),
+            StockReservation.status == ACTIVE,
+        )
+        .group_by(StockReservation.product_id)
+    )
+    return {product_id: int(total or 0) for product_id, total in rows}
+
+
+def lock_products(product_ids):
+    """Load products FOR UPDATE so concurrent orders check stock in turn."""
+    if not product_ids:
+        return {}
+    products = db.session.scalars(
+        select(Product)
+        .where(Product.id.in_(sorted(set(product_ids))))
+        .order_by(Product.id)
+        .with_for_update()
+    )
+    return {product.id: product for product in products}
+
+
+def available_quantity(product, reserved, pending):
+    """On-hand (folded stock + pending movements) minus active reservations."""
+    return on_hand_quantity(product, pending) - reserved.get(product.id, 0)
+
+
+def reserve_stock(order_id, lines, now=None):
+    """Add active reservations for [(product_id, qty), ...] of an order."""
+    now = now or datetime.utcnow()
+    ttl = timedelta(minutes=current_app.config.get("STOCK_RESERVATION_TTL_MINUTES", 30))
+    for product_id, qty in lines:
+        db.session.add(StockReservation(
+            order_id=order_id,
+            product_id=product_id,
+            quantity=qty,
+            status=ACTIVE,
+            expires_at=now + ttl,
+            created_at=now,
+        ))
+
+
+def rehold_reservations(order_id, now=None):
+    """Hold an order's lapsed stock again before its payment is retried.
+
+    Reservations released for a failed payment or a timeout become active
+    for another STOCK_RESERVATION_TTL_MINUTES if every product still has
+    the stock; otherwise nothing changes. Returns {product_id: available}
+    for the products that are short ({} when the order holds its stock).
+    """
+    reservations = db.session.scalars(
+        select(StockReservation).where(
+            StockReservation.order_id == order_id,
+            StockReservation.status == RELEASED,
+            StockReservation.release_reason.in_(LAPSED_REASONS),
+        )
+    ).all()
+    if not reservations:
+        return {}
+
+    wanted = {}
+    for reservation in reservations:
+        wanted[reservation.product_id] = wanted.get(reservation.product_id, 0) + reservation.quantity
+    products = lock_products(list(wanted))
+    reserved = reserved_quantities(list(products))
+    pending = pending_deltas(list(products))
+    short = {}
+    for product_id, qty in wanted.items():
+        product = products.get(product_id)
+        available = available_quantity(product, reserved, pending) if product else 0
+        if available < qty:
+            short[product_id] = max(available, 0)
+    if short:
+        return short
+
+    now = now or datetime.utcnow()
+    ttl = timedelta(minutes=current_app.config.get("STOCK_RESERVATION_TTL_MINUTES", 30))
+    for reservation in reservations:
+        reservation.status = ACTIVE
+        reservation.release_reason = None
+        reservation.resolved_at = None
+        reservation.expires_at = now + ttl
+    return {}
+
+
+def commit_reservations(order_id):
+    """Record the sale of an order's held stock.
+
+    Active reservations are committed, and so are lapsed ones (released
+    for a failed payment or a timeout): the order was paid or is being
+    fulfilled, so the stock leaves either way. If that takes a product
+    below zero available it was oversold, which is logged as an error.
+    Reservations released because the order was cancelled are left alone.
+    Returns the number of reservations committed.
+    """
+    return commit_reservations_for_orders([order_id])
+
+
+def commit_reservations_for_orders(order_ids):
+    """commit_reservations for several orders with one select and one insert."""
+    if not order_ids:
+        return 0
+    reservations = db.session.scalars(
+        select(StockReservation).where(
+            StockReservation.order_id.in_(order_ids),
+            or_(
+                StockReservation.status == ACTIVE,
+                and_(
+                    StockReservation.status == RELEASED,
+                    StockReservation.release_reason.in_(LAPSED_REASONS),
+                ),
+            ),
+        )
+    ).all()
+    lapsed = [r for r in reservations if r.status == RELEASED]
+    now = datetime.utcnow()
+    record_movements([
+        {
+            "product_id": reservation.product_id,
+            "quantity_delta": -reservation.quantity,
+            "kind": SALE,
+            "order_id": reservation.order_id,
+        }
+        for reservation in reservations
+    ])
+    for reservation in reservations:
+        reservation.status = COMMITTED
+        reservation.release_reason = None
+        reservation.resolved_at = now
+    if lapsed:
+        _log_oversold(lapsed)
+    return len(reservations)
+
+
+def _log_oversold(reservations):
+    """Log products that a sale of lapsed reservations took below zero."""
+    product_ids = sorted({r.product_id for r in reservations})
+    products = db.session.scalars(select(Product).where(Product.id.in_(product_ids)))
+    reserved = reserved_quantities(product_ids)
+    pending = pending_deltas(product_ids)
+    for product in products:
+        available = available_quantity(product, reserved, pending)
+        if available < 0:
+            orders = sorted({r.order_id for r in reservations if r.product_id == product.id})
+            current_app.logger.error(
+                "Product %s oversold by %d: orders %s were paid after their "
+                "stock reservation lapsed", product.id, -available, orders
+            )
+
+
+def release_reservations(order_id, reason):
+    """Release an order's active reservations straight away."""
+    return release_reservations_for_orders([order_id], reason)
+
+
+def release_reservations_for_orders(order_ids, reason):
+    """Release active reservations and return committed ones to stock.
+
+    Returns the number of reservations released.
+    """
+    if not order_ids:
+        return 0
+    now = datetime.utcnow()
+    returned = _return_committed(order_ids)
+    for reservation in returned:
+        reservation.status = RELEASED
+        reservation.release_reason = reason
+        reservation.resolved_at = now
+    result = db.session.execute(
+        update(StockReservation)
+        .where(
+            StockReservation.order_id.in_(order_ids),
+            StockReservation.status == ACTIVE,
+        )
+        .values(status=RELEASED, release_reason=reason, resolved_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount + len(returned)
+
+
+def reopen_reservations_for_orders(order_ids, now=None):
+    """Return committed stock of orders moved back to pending and hold it
+    again for STOCK_RESERVATION_TTL_MINUTES. Returns the number reopened."""
+    if not order_ids:
+        return 0
+    now = now or datetime.utcnow()
+    ttl = timedelta(minutes=current_app.config.get("STOCK_RESERVATION_TTL_MINUTES", 30))
+    returned = _return_committed(order_ids)
+    for reservation in returned:
+        reservation.status = ACTIVE
+        reservation.expires_at = now + ttl
+        reservation.resolved_at = None
+    return len(returned)
+
+
+def _return_committed(order_ids):
+    """Record return movements for the orders' committed reservations."""
+    reservations = db.session.scalars(
+        select(StockReservation).where(
+            StockReservation.order_id.in_(order_ids),
+            StockReservation.status == COMMITTED,
+        )
+    ).all()
+    record_movements([
+        {
+            "product_id": reservation.product_id,
+            "quantity_delta": reservation.quantity,
+            "kind": RETURN,
+            "order_id": reservation.order_id,
+        }
+        for reservation in reservations
+    ])
+    return reservations
+
+
+def sweep_reservations(now=None):
+    """Release, in two set-based UPDATEs, reservations whose payment ended
+    FAILED/CANCELLED and those past expires_at.
+
+    Returns {"payment_failed": n, "expired": n}.
+    """
+    now = now or datetime.utcnow()
+    failed_orders = select(Payment.order_id).where(
+        Payment.status.in_(RELEASE_ON_PAYMENT_STATUSES)
+    )
+    failed = db.session.execute(
+        update(StockReservation)
+        .where(
+            StockReservation.status == ACTIVE,
+            StockReservation.order_id.in_(failed_orders),
+        )
+        .values(status=RELEASED, release_reason="payment_failed", resolved_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    expired = db.session.execute(
+        update(StockReservation)
+        .where(
+            StockReservation.status == ACTIVE,
+            StockReservation.expires_at < now,
+        )
+        .values(status=RELEASED, release_reason="expired", resolved_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return {"payment_failed": failed, "expired": expired}
@@ -1,5 +1,6 @@
 import os
 import requests
+from app.utils.metrics import track_outbound
 
 
 def _normalize_msisdn(raw_number: str) -> str:
@@ -56,8 +57,7 @@ def send_order_whatsapp_notification(order, items, delivery_fee):
         "Content-Type": "application/json"
     }
 
-    try:
+    # Errors propagate so the outbox relay retries the delivery
+    with track_outbound("whatsapp", "send_message"):
         response = requests.post(url, json=payload, headers=headers, timeout=20)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        print(f"WhatsApp notification failed: {str(e)}")
+    response.raise_for_status()
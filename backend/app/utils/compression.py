@@ -0,0 +1,93 @@
+"""gzip / Brotli response compression.
+
+Responses are compressed when the client accepts it, the mimetype is in
+COMPRESS_MIMETYPES and the body is at least COMPRESS_MIN_SIZE bytes.
+Brotli is used when the optional ``brotli`` package is installed and the
+client prefers it. Compressible responses always get ``Vary:
+Accept-Encoding``; a strong ETag is downgraded to weak once the body is
+encoded, so If-None-Match keeps matching across encodings.
+
+Views serving cached payloads can set ``g.compression_cache_key`` (and
+``g.compression_cache_ttl``) to keep the encoded bodies in catalog_cache,
+so repeated requests are not recompressed.
+"""
+import gzip
+
+from flask import current_app, g, request
+
+from app.utils.cache import catalog_cache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+DEFAULT_COMPRESS_MIMETYPES = (
+    "application/json",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/csv",
+    "application/javascript",
+)
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(data, encoding):
+    config = current_app.config
+    if encoding == "br":
+        return brotli.compress(data, quality=config.get("COMPRESS_BR_LEVEL", 4))
+    return gzip.compress(data, compresslevel=config.get("COMPRESS_GZIP_LEVEL", 6), mtime=0)
+
+
+def _encoded_body(response, encoding):
+    key = g.get("compression_cache_key")
+    if key is None:
+        return compress(response.get_data(), encoding)
+
+    cache_key = ("encoded", key, encoding)
+    body = catalog_cache.get(cache_key)
+    if body is None:
+        body = compress(response.get_data(), encoding)
+        catalog_cache.set(cache_key, body, g.get("compression_cache_ttl", 60))
+    return body
+
+
+def _compress_response(response):
+    config = current_app.config
+    if not config.get("COMPRESS_ENABLED", True):
+        return response
+    if response.mimetype not in config.get("COMPRESS_MIMETYPES", DEFAULT_COMPRESS_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or not 200 <= response.status_code < 300
+        or response.status_code in (204, 206)
+        or "Content-Encoding" in response.headers
+        or response.content_length is None
+        or response.content_length < config.get("COMPRESS_MIN_SIZE", 1024)
+    ):
+        return response
+
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if not encoding:
+        return response
+
+    response.set_data(_encoded_body(response, encoding))
+    response.headers["Content-Encoding"] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.after_request(_compress_response)
@@ -0,0 +1,25 @@
+import time
+
+from sqlalchemy import text
+
+
+def pool_stats(engine):
+    """Return a snapshot of the engine's connection pool counters."""
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            stats[name] = fn()
+    return stats
+
+
+def check_database(engine):
+    """Run a trivial query and return (ok, latency_ms, error)."""
+    start = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as exc:
+        return False, (time.perf_counter() - start) * 1000, str(exc)
+    return True, (time.perf_counter() - start) * 1000, None
@@ -0,0 +1,90 @@
+"""Route read-only request queries to a replica database.
+
+Views decorated with @read_replica send plain SELECTs to the "replica"
+bind (SQLALCHEMY_BINDS["replica"], from DATABASE_REPLICA_URL). Everything
+else stays on the primary:
+
+* any INSERT/UPDATE/DELETE and SELECT ... FOR UPDATE;
+* every query issued after the session has written something, so a
+  request always reads its own writes;
+* all queries while the replica fails its health check, which is
+  re-run at most every REPLICA_HEALTH_CHECK_SECONDS.
+"""
+import threading
+import time
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app, g, has_request_context
+from flask_sqlalchemy.session import Session
+
+from app.utils.db_health import check_database
+
+REPLICA_BIND_KEY = "replica"
+
+_health_lock = threading.Lock()
+_replica_health = {"ok": True, "checked_at": 0.0}
+
+
+def read_replica(fn):
+    """Allow a view's read-only queries to be served by the replica."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        g.use_read_replica = True
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def _replica_available(engine):
+    interval = current_app.config.get("REPLICA_HEALTH_CHECK_SECONDS", 30)
+    now = time.monotonic()
+    if now - _replica_health["checked_at"] < interval:
+        return _replica_health["ok"]
+
+    with _health_lock:
+        if now - _replica_health["checked_at"] >= interval:
+            ok, _, error = check_database(engine)
+            if not ok and _replica_health["ok"]:
+                current_app.logger.warning(
+                    "Read replica unavailable, falling back to primary: %s", error
+                )
+            _replica_health.update(ok=ok, checked_at=time.monotonic())
+    return _replica_health["ok"]
+
+
+def _is_plain_select(clause):
+    return (
+        isinstance(clause, sa.sql.Select)
+        and clause._for_update_arg is None
+    )
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that can send reads to the replica bind."""
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self._has_written = False
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            self._has_written = True
+        super().flush(objects)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and clause is not None and not _is_plain_select(clause):
+            self._has_written = True
+
+        if (
+            bind is None
+            and not self._has_written
+            and not self._flushing
+            and has_request_context()
+            and g.get("use_read_replica")
+            and _is_plain_select(clause)
+        ):
+            replica = self._db.engines.get(REPLICA_BIND_KEY)
+            if replica is not None and _replica_available(replica):
+                return replica
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -2,6 +2,7 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import current_app
+from app.utils.metrics import track_outbound
 
 
 def send_email_smtp(to_email, subject, html_body, reply_to=None):
@@ -34,7 +35,8 @@ def send_email_smtp(to_email, subject, html_body, reply_to=None):
         smtp_timeout,
     )
     try:
-        with smtplib.SMTP(smtp_server, smtp_port, timeout=smtp_timeout) as server:
+        with track_outbound("smtp", "send"), \
+                smtplib.SMTP(smtp_server, smtp_port, timeout=smtp_timeout) as server:
             server.starttls()
             server.login(smtp_email, smtp_password)
             server.sendmail(smtp_email, [to_email], msg.as_string())
@@ -0,0 +1,176 @@
+"""Idempotency-Key support for endpoints that clients retry.
+
+A view wrapped with @idempotent(scope) runs at most once per
+(scope, Idempotency-Key):
+
+* the first request claims the key in idempotency_keys, runs the view and
+  stores its response. Only 2xx responses and validation errors (400/422)
+  are stored; anything else - and a 400 the view flagged with
+  not_replayable(), e.g. "insufficient stock" - releases the key so a
+  retry runs the view again against current state;
+* a repeat with the same body gets the stored response back with an
+  ``Idempotent-Replayed: true`` header, without running the view;
+* a repeat while the first is still running gets 409, and a repeat with a
+  different body gets 422.
+
+Completed responses are also kept in a small per-worker cache so replays
+usually skip the database. Requests without the header are unaffected.
+Expired rows are removed by ``flask idempotency purge``.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, g, jsonify, make_response, request
+from sqlalchemy import and_, delete
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.idempotency_key import IdempotencyKey
+from app.utils.cache import TTLCache
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+# Error statuses that are stored and replayed: the same body fails the same way
+REPLAYABLE_ERROR_STATUSES = frozenset({400, 422})
+
+# (scope, key) -> (request_hash, status_code, body, mimetype)
+replay_cache = TTLCache(maxsize=4096)
+
+
+def not_replayable():
+    """Mark the current error response as depending on state that can
+    change (stock, an upstream rejection), so it is not stored."""
+    g.idempotency_not_replayable = True
+
+
+def _replayable(response):
+    if 200 <= response.status_code < 300:
+        return True
+    return (
+        response.status_code in REPLAYABLE_ERROR_STATUSES
+        and not g.get("idempotency_not_replayable", False)
+    )
+
+
+def _request_hash():
+    return hashlib.sha256(request.get_data()).hexdigest()
+
+
+def _replay(status_code, body, mimetype):
+    response = current_app.response_class(body, status=status_code, mimetype=mimetype)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _claim(scope, key, request_hash):
+    """Insert an in-progress row. Returns the existing row if already claimed."""
+    now = datetime.utcnow()
+    db.session.execute(delete(IdempotencyKey).where(and_(
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.key == key,
+        IdempotencyKey.expires_at < now,
+    )))
+    lock_seconds = current_app.config.get("IDEMPOTENCY_LOCK_SECONDS", 60)
+    db.session.add(IdempotencyKey(
+        scope=scope,
+        key=key,
+        request_hash=request_hash,
+        created_at=now,
+        expires_at=now + timedelta(seconds=lock_seconds),
+    ))
+    try:
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+        return db.session.get(IdempotencyKey, (scope, key))
+
+
+def _store(scope, key, response):
+    # Drop anything the view left uncommitted, as teardown would have.
+    db.session.rollback()
+    row = db.session.get(IdempotencyKey, (scope, key))
+    if row is None:
+        return
+
+    if not _replayable(response):
+        db.session.delete(row)
+        db.session.commit()
+        return
+
+    ttl = current_app.config.get("IDEMPOTENCY_TTL_SECONDS", 86400)
+    body = response.get_data(as_text=True)
+    row.status_code = response.status_code
+    row.response_body = body
+    row.mimetype = response.mimetype
+    row.expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+    db.session.commit()
+    replay_cache.set(
+        (scope, key),
+        (row.request_hash, row.status_code, body, row.mimetype),
+        min(ttl, 300),
+    )
+
+
+def idempotent(scope):
+    """Replay the stored response for a repeated Idempotency-Key."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+            request_hash = _request_hash()
+            cached = replay_cache.get((scope, key))
+            if cached is None:
+                existing = _claim(scope, key, request_hash)
+                if existing is not None:
+                    if existing.status_code is None:
+                        response = jsonify({"error": "A request with this Idempotency-Key is still being processed"})
+                        response.status_code = 409
+                        response.headers["Retry-After"] = "1"
+                        return response
+                    cached = (existing.request_hash, existing.status_code,
+                              existing.response_body, existing.mimetype)
+
+            if cached is not None:
+                stored_hash, status_code, body, mimetype = cached
+                if stored_hash != request_hash:
+                    return jsonify({"error": f"{HEADER} was already used with a different request"}), 422
+                return _replay(status_code, body, mimetype)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                db.session.rollback()
+                db.session.execute(delete(IdempotencyKey).where(and_(
+                    IdempotencyKey.scope == scope, IdempotencyKey.key == key,
+                )))
+                db.session.commit()
+                raise
+
+            try:
+                _store(scope, key, response)
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception("Idempotency store failed for %s:%s", scope, key)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def purge_expired_keys():
+    """Delete expired rows. Returns how many were removed."""
+    result = db.session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.utcnow())
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,73 @@
+"""Responsive Cloudinary delivery URLs for stored image URLs.
+
+A stored image_url points at the original upload. image_variants derives
+width-bucketed URLs (c_limit + f_auto,q_auto, so the CDN picks the format
+and quality per browser) and a srcset string from it. Results are pure
+functions of the URL and are memoised per process. URLs that are not
+plain Cloudinary upload URLs are returned unchanged.
+"""
+import re
+from functools import lru_cache
+
+SRCSET_WIDTHS = (320, 640, 960, 1280, 1920)
+# Sized for ~300px product cards on 2x displays.
+THUMBNAIL_WIDTH = 640
+
+_UPLOAD_URL_RE = re.compile(
+    r"^(?P<prefix>https?://res\.cloudinary\.com/[^/]+/image/upload/)(?P<rest>.+)$"
+)
+# A leading path segment that is already a transformation (e.g. "w_300,c_fill").
+_TRANSFORMATION_RE = re.compile(r"^[a-z]{1,3}_[^/,]+(,[a-z]{1,3}_[^/,]+)*$")
+_VERSION_RE = re.compile(r"^v\d+$")
+
+
+def _split_upload_url(url):
+    match = _UPLOAD_URL_RE.match(url or "")
+    if not match:
+        return None
+    rest = match.group("rest")
+    if _TRANSFORMATION_RE.match(rest.split("/", 1)[0]):
+        return None
+    return match.group("prefix"), rest
+
+
+def cloudinary_public_id(url):
+    """Public ID of a Cloudinary upload URL, or None for other URLs."""
+    match = _UPLOAD_URL_RE.match(url or "")
+    if not match:
+        return None
+    segments = match.group("rest").split("/")
+    while segments and _TRANSFORMATION_RE.match(segments[0]):
+        segments.pop(0)
+    if segments and _VERSION_RE.match(segments[0]):
+        segments.pop(0)
+    if not segments:
+        return None
+    public_id = "/".join(segments)
+    return public_id.rsplit(".", 1)[0] if "." in segments[-1] else public_id
+
+
+def transformed_url(url, width):
+    """``url`` resized to at most ``width`` px with automatic format/quality."""
+    parts = _split_upload_url(url)
+    if parts is None:
+        return url
+    prefix, rest = parts
+    return f"{prefix}c_limit,f_auto,q_auto,w_{width}/{rest}"
+
+
+@lru_cache(maxsize=8192)
+def image_variants(url):
+    """{"thumbnail_url", "srcset"} for an image URL."""
+    if not url:
+        return {"thumbnail_url": None, "srcset": None}
+    if _split_upload_url(url) is None:
+        return {"thumbnail_url": url, "srcset": None}
+    return {
+        "thumbnail_url": transformed_url(url, THUMBNAIL_WIDTH),
+        "srcset": ", ".join(f"{transformed_url(url, w)} {w}w" for w in SRCSET_WIDTHS),
+    }
+
+
+def thumbnail_url(url):
+    return image_variants(url)["thumbnail_url"] if url else None
@@ -0,0 +1,71 @@
+"""JSON provider that serializes Decimal, datetime and date natively.
+
+Uses orjson when it is installed and falls back to the stdlib json module
+otherwise. Both paths emit Decimals as numbers and dates/datetimes in ISO
+8601, so models and serializers can hand raw column values to jsonify.
+"""
+import dataclasses
+import decimal
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class AppJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or (kwargs.keys() - {"indent", "separators"}):
+            return super().dumps(obj, **kwargs)
+
+        data = orjson.dumps(
+            obj,
+            default=_default,
+            option=self._orjson_options(indent=bool(kwargs.get("indent"))),
+        )
+        # orjson always emits UTF-8; honour ensure_ascii via the stdlib path.
+        if self.ensure_ascii and not data.isascii():
+            return super().dumps(obj, **kwargs)
+        return data.decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(
+            obj,
+            default=_default,
+            option=self._orjson_options(indent=indent) | orjson.OPT_APPEND_NEWLINE,
+        )
+        return self._app.response_class(body, mimetype=self.mimetype)
+
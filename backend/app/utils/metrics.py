@@ -0,0 +1,144 @@
+"""Prometheus metrics for request latency, outbound calls and business events.
+
+When PROMETHEUS_MULTIPROC_DIR is set (required under gunicorn with more
+than one worker), prometheus_client writes samples to per-process files in
+that directory and the /metrics endpoint aggregates them on scrape.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+from app.utils.db_health import pool_stats
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["blueprint", "endpoint", "method"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "HTTP responses by status code",
+    ["blueprint", "endpoint", "method", "status"],
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the SQLAlchemy pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured SQLAlchemy pool size",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections opened beyond the pool size",
+    multiprocess_mode="livesum",
+)
+
+OUTBOUND_LATENCY = Histogram(
+    "outbound_request_duration_seconds",
+    "Latency of calls to external services",
+    ["service", "operation", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30),
+)
+
+ORDERS_CREATED = Counter("orders_created_total", "Orders successfully created")
+STK_PUSHES = Counter("mpesa_stk_pushes_total", "M-Pesa STK push attempts", ["result"])
+MPESA_CALLBACKS = Counter(
+    "mpesa_callbacks_total",
+    "M-Pesa callbacks processed",
+    ["outcome"],
+)
+RATE_LIMIT_BREACHES = Counter(
+    "rate_limit_breaches_total",
+    "Requests rejected by a rate limit",
+    ["endpoint", "limit"],
+)
+
+
+@contextmanager
+def track_outbound(service, operation):
+    """Time a call to an external service (mpesa, whatsapp, smtp, cloudinary)."""
+    start = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        OUTBOUND_LATENCY.labels(service, operation, outcome).observe(
+            time.perf_counter() - start
+        )
+
+
+def _update_pool_gauges(engine):
+    stats = pool_stats(engine)
+    if "checkedout" in stats:
+        DB_POOL_CHECKED_OUT.set(stats["checkedout"])
+    if "size" in stats:
+        DB_POOL_SIZE.set(stats["size"])
+    if "overflow" in stats:
+        DB_POOL_OVERFLOW.set(max(stats["overflow"], 0))
+
+
+def render_metrics():
+    """Return (body, content_type) for the /metrics endpoint."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_metrics(app, db):
+    """Record latency and status for every request handled by the app."""
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def remember_response_status(response):
+        g.response_status = response.status_code
+        return response
+
+    # Recorded on teardown so that requests ending in an unhandled exception
+    # (which skip after_request when exceptions propagate) are still counted.
+    @app.teardown_request
+    def record_request_metrics(exc):
+        started = g.pop("request_started_at", None)
+        if started is None or request.endpoint == "metrics.metrics":
+            return
+
+        status = 500 if exc is not None else g.pop("response_status", 500)
+        blueprint = request.blueprint or "app"
+        endpoint = request.endpoint or "unmatched"
+        REQUEST_LATENCY.labels(blueprint, endpoint, request.method).observe(
+            time.perf_counter() - started
+        )
+        REQUEST_COUNT.labels(
+            blueprint, endpoint, request.method, str(status)
+        ).inc()
+
+        try:
+            _update_pool_gauges(db.engine)
+        except Exception:
+            app.logger.debug("Unable to read DB pool stats", exc_info=True)
@@ -0,0 +1,106 @@
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in testing mode when an endpoint issues more queries than allowed."""
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL queries a view may issue.
+
+    The budget is checked when every request is torn down. Over-budget requests are
+    logged, and raise QueryBudgetExceeded when the app is in testing mode
+    so that N+1 regressions fail the test suite.
+    """
+    def decorator(fn):
+        # functools.wraps copies __dict__, so the attribute survives
+        # jwt_required() and other wrapping decorators.
+        fn._query_budget = max_queries
+        return fn
+    return decorator
+
+
+def get_query_stats():
+    """Return (query_count, total_db_ms) for the current request."""
+    if not has_request_context():
+        return 0, 0.0
+    return g.get("sql_query_count", 0), g.get("sql_query_ms", 0.0)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed_ms = (time.perf_counter() - start_times.pop()) * 1000
+
+    if not has_request_context():
+        return
+
+    g.sql_query_count = g.get("sql_query_count", 0) + 1
+    g.sql_query_ms = g.get("sql_query_ms", 0.0) + elapsed_ms
+
+    threshold_ms = current_app.config.get("SLOW_QUERY_THRESHOLD_MS", 200)
+    if threshold_ms is not None and elapsed_ms >= threshold_ms:
+        current_app.logger.warning(
+            "Slow query (%.1f ms) in endpoint=%s: %s",
+            elapsed_ms,
+            request.endpoint,
+            " ".join(statement.split())[:1000],
+        )
+
+
+def _attach_engine_listeners(engine):
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def init_query_stats(app, db):
+    """Hook SQLAlchemy cursor events and report per-request query stats."""
+    with app.app_context():
+        for engine in db.engines.values():
+            _attach_engine_listeners(engine)
+
+    @app.before_request
+    def reset_query_stats():
+        g.sql_query_count = 0
+        g.sql_query_ms = 0.0
+
+    @app.after_request
+    def add_server_timing(response):
+        if app.config.get("SERVER_TIMING_ENABLED"):
+            count, total_ms = get_query_stats()
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={total_ms:.1f};desc="{count} queries"',
+            )
+        return response
+
+    # Checked on teardown rather than after_request so that requests which
+    # end in an unhandled exception are still held to their budget.
+    @app.teardown_request
+    def check_query_budget(exc):
+        count, _ = get_query_stats()
+
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, "_query_budget", None)
+        if budget is None:
+            budget = app.config.get("SQL_QUERY_BUDGET")
+
+        if budget is not None and count > budget:
+            message = (
+                f"Endpoint {request.endpoint} issued {count} queries "
+                f"(budget {budget})"
+            )
+            # Never mask the exception the request is already failing with.
+            if app.testing and exc is None:
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
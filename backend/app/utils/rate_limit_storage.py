@@ -0,0 +1,151 @@
+"""Database-backed storage for Flask-Limiter.
+
+Set RATELIMIT_STORAGE_URI=database:// to keep rate limit counters in the
+application database (table rate_limit_counters), so every gunicorn
+worker and instance shares them without running Redis. Counters are
+updated with one atomic INSERT ... ON CONFLICT DO UPDATE per hit, on a
+small dedicated engine so limiter writes never join a request's
+transaction. Supports the fixed-window and sliding-window-counter
+strategies.
+
+For larger deployments point RATELIMIT_STORAGE_URI at Redis instead
+(redis://...); nothing else changes.
+"""
+import random
+import time
+from math import floor
+
+import sqlalchemy as sa
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Purge expired counters on roughly one in this many increments.
+PURGE_EVERY = 500
+
+
+class DatabaseStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    STORAGE_SCHEME = ["database"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, database_url=None,
+                 pool_size=2, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        if not database_url:
+            raise ValueError("database:// rate limit storage needs a database_url option")
+        from app.models.rate_limit import RateLimitCounter
+
+        self.table = RateLimitCounter.__table__
+        engine_options = {"pool_pre_ping": True}
+        if database_url.startswith(("postgres://", "postgresql")):
+            engine_options.update(pool_size=pool_size, max_overflow=pool_size)
+        self.engine = sa.create_engine(database_url, **engine_options)
+        if self.engine.dialect.name == "postgresql":
+            self._insert = postgresql.insert
+        elif self.engine.dialect.name == "sqlite":
+            self._insert = sqlite.insert
+        else:
+            raise ValueError(f"Unsupported database for rate limits: {self.engine.dialect.name}")
+
+    @property
+    def base_exceptions(self):
+        return sa.exc.SQLAlchemyError
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        t = self.table
+        stmt = self._insert(t).values(key=key, count=amount, expires_at=now + expiry)
+        expired = t.c.expires_at <= now
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.key],
+            set_={
+                "count": sa.case((expired, stmt.excluded.count), else_=t.c.count + stmt.excluded.count),
+                "expires_at": sa.case((expired, stmt.excluded.expires_at), else_=t.c.expires_at),
+            },
+        ).returning(t.c.count)
+        with self.engine.begin() as conn:
+            count = conn.execute(stmt).scalar_one()
+            if random.randrange(PURGE_EVERY) == 0:
+                conn.execute(sa.delete(t).where(t.c.expires_at <= now))
+        return count
+
+    def decr(self, key, amount=1):
+        t = self.table
+        with self.engine.begin() as conn:
+            conn.execute(
+                sa.update(t)
+                .where(t.c.key == key, t.c.expires_at > time.time())
+                .values(count=sa.case((t.c.count > amount, t.c.count - amount), else_=0))
+            )
+
+    def _row(self, key):
+        t = self.table
+        with self.engine.connect() as conn:
+            return conn.execute(
+                sa.select(t.c.count, t.c.expires_at)
+                .where(t.c.key == key, t.c.expires_at > time.time())
+            ).first()
+
+    def get(self, key):
+        row = self._row(key)
+        return row.count if row else 0
+
+    def get_expiry(self, key):
+        row = self._row(key)
+        return row.expires_at if row else time.time()
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(sa.text("SELECT 1"))
+            return True
+        except sa.exc.SQLAlchemyError:
+            return False
+
+    def reset(self):
+        with self.engine.begin() as conn:
+            return conn.execute(sa.delete(self.table)).rowcount
+
+    def clear(self, key):
+        with self.engine.begin() as conn:
+            conn.execute(sa.delete(self.table).where(self.table.c.key == key))
+
+    # sliding-window-counter strategy, mirroring limits' MemoryStorage
+
+    def _sliding_window_info(self, previous_key, current_key, expiry, now):
+        previous_count = self.get(previous_key)
+        current_count = self.get(current_key)
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count, previous_ttl, current_count, _ = self._sliding_window_info(
+            previous_key, current_key, expiry, now
+        )
+        if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+            return False
+
+        current_count = self.incr(current_key, 2 * expiry, amount=amount)
+        if floor(previous_count * previous_ttl / expiry + current_count) > limit:
+            # A concurrent hit won the race; give the slot back.
+            self.decr(current_key, amount)
+            return False
+        return True
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._sliding_window_info(previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        self.clear(previous_key)
+        self.clear(current_key)
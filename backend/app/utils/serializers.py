@@ -0,0 +1,186 @@
+"""Build API payloads from plain row tuples instead of ORM instances.
+
+Product payloads are assembled field by field from PRODUCT_FIELDS. Each
+field names the columns it reads, so callers can select only what the
+requested field set needs (product_columns) and serialize the resulting
+rows without identity-map bookkeeping or attribute instrumentation.
+Decimal and datetime values are left as-is for the app JSON provider.
+"""
+from datetime import datetime
+
+from app.models.category import Category
+from app.models.inventory import pending_stock_column
+from app.models.stock_reservation import reserved_quantity_column
+from app.utils.image_urls import image_variants, thumbnail_url
+from app.models.product import (
+    Product,
+    compute_discounted_price,
+    compute_effective_price,
+    flash_sale_window_active,
+)
+
+_PRICING = (
+    Product.price,
+    Product.discount_percent,
+    Product.flash_sale_percent,
+    Product.flash_sale_start,
+    Product.flash_sale_end,
+)
+_FLASH_WINDOW = (Product.flash_sale_start, Product.flash_sale_end)
+_RATING = (Product.rating_sum, Product.rating_count)
+# Folded stock plus unfolded ledger movements
+_ON_HAND = (Product.stock_quantity, pending_stock_column())
+# ...and what unpaid orders are holding
+_STOCK = _ON_HAND + (reserved_quantity_column(),)
+
+
+def _on_hand_stock(row, ctx):
+    return row.stock_quantity + row.pending_stock_delta
+
+
+def _available_stock(row, ctx):
+    return _on_hand_stock(row, ctx) - row.reserved_quantity
+
+
+def _effective_price(row, ctx):
+    return compute_effective_price(
+        row.price,
+        row.discount_percent,
+        row.flash_sale_percent,
+        row.flash_sale_start,
+        row.flash_sale_end,
+        ctx["now"],
+    )
+
+
+def _primary_image(row, ctx):
+    images = ctx.get("images")
+    if images:
+        primary = next((img for img in images if img["is_primary"]), None)
+        return (primary or images[0])["image_url"]
+    return getattr(row, "primary_image", None)
+
+
+def _images(row, ctx):
+    return [{**img, **image_variants(img["image_url"])} for img in ctx.get("images") or []]
+
+
+# field name -> (columns read, value function)
+# "image", "thumbnail_url" and "images" read image data the caller loads
+# separately: a primary_image column on the row, or ctx["images"].
+PRODUCT_FIELDS = {
+    "id": ((Product.id,), lambda row, ctx: row.id),
+    "name": ((Product.name,), lambda row, ctx: row.name),
+    "description": ((Product.description,), lambda row, ctx: row.description),
+    "price": ((Product.price,), lambda row, ctx: row.price),
+    "category": (
+        (Category.slug.label("category_slug"),),
+        lambda row, ctx: row.category_slug,
+    ),
+    "is_branding": ((Product.is_branding,), lambda row, ctx: row.is_branding),
+    "discount_percent": (
+        (Product.discount_percent,),
+        lambda row, ctx: row.discount_percent,
+    ),
+    "discounted_price": (
+        (Product.price, Product.discount_percent),
+        lambda row, ctx: (
+            compute_discounted_price(row.price, row.discount_percent)
+            if row.discount_percent else None
+        ),
+    ),
+    "effective_price": (_PRICING, _effective_price),
+    "flash_sale_active": (
+        _FLASH_WINDOW,
+        lambda row, ctx: flash_sale_window_active(
+            row.flash_sale_start, row.flash_sale_end, ctx["now"]
+        ),
+    ),
+    "flash_sale_percent": (
+        (Product.flash_sale_percent,),
+        lambda row, ctx: row.flash_sale_percent,
+    ),
+    "flash_sale_start": ((Product.flash_sale_start,), lambda row, ctx: row.flash_sale_start),
+    "flash_sale_end": ((Product.flash_sale_end,), lambda row, ctx: row.flash_sale_end),
+    "rating_avg": (
+        _RATING,
+        lambda row, ctx: round(row.rating_sum / row.rating_count, 2) if row.rating_count > 0 else 0,
+    ),
+    "rating_count": ((Product.rating_count,), lambda row, ctx: row.rating_count),
+    "in_stock": (_STOCK, lambda row, ctx: _available_stock(row, ctx) > 0),
+    "stock_quantity": (_ON_HAND, _on_hand_stock),
+    "available_stock": (_STOCK, _available_stock),
+    "image": ((), _primary_image),
+    "thumbnail_url": ((), lambda row, ctx: thumbnail_url(_primary_image(row, ctx))),
+    "images": ((), _images),
+}
+# Fields served from the primary image when "images" is not loaded.
+PRIMARY_IMAGE_FIELDS = frozenset({"image", "thumbnail_url"})
+
+_CARD_FIELDS = (
+    "id", "name", "price", "category", "is_branding", "discount_percent",
+    "discounted_price", "effective_price", "flash_sale_active",
+    "flash_sale_percent", "flash_sale_start", "flash_sale_end",
+    "rating_avg", "rating_count", "in_stock", "image", "thumbnail_url",
+)
+_DETAIL_FIELDS = _CARD_FIELDS + ("description", "images")
+
+PRODUCT_VIEWS = {
+    "card": _CARD_FIELDS,
+    "detail": _DETAIL_FIELDS,
+    "admin": _DETAIL_FIELDS + ("stock_quantity", "available_stock"),
+}
+# Only served by admin endpoints.
+ADMIN_ONLY_PRODUCT_FIELDS = frozenset({"stock_quantity", "available_stock"})
+# Names accepted before the card/detail presets existed.
+PRODUCT_VIEW_ALIASES = {"summary": "card", "full": "detail"}
+
+
+def resolve_product_fields(view=None, fields=None, default_view="detail"):
+    """Return (field tuple, error message) for a view preset or fields list.
+
+    ``fields`` is a comma-separated string and wins over ``view``; "id" is
+    always included.
+    """
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in PRODUCT_FIELDS]
+        if unknown:
+            return None, f"Unknown fields: {', '.join(unknown)}"
+        if "id" not in requested:
+            requested.insert(0, "id")
+        return tuple(dict.fromkeys(requested)), None
+
+    view = PRODUCT_VIEW_ALIASES.get(view, view) or default_view
+    if view not in PRODUCT_VIEWS:
+        return None, f"view must be one of: {', '.join(PRODUCT_VIEWS)}"
+    return PRODUCT_VIEWS[view], None
+
+
+def product_columns(fields):
+    """Deduplicated columns needed to serialize ``fields``; id always first."""
+    columns = {"id": Product.id}
+    for field in fields:
+        for column in PRODUCT_FIELDS[field][0]:
+            columns.setdefault(column.key, column)
+    return tuple(columns.values())
+
+
+def serialize_image_row(row):
+    return {
+        "id": row.id,
+        "image_url": row.image_url,
+        "is_primary": row.is_primary,
+        "position": row.position,
+    }
+
+
+def serialize_product_row(row, fields, images=None, now=None):
+    """Serialize ``fields`` of a product row.
+
+    ``images`` (dicts ordered by position) backs the "images" field and,
+    when given, the "image"/"thumbnail_url" fields; otherwise those read
+    the row's primary_image column.
+    """
+    ctx = {"now": now or datetime.now(), "images": images}
+    return {field: PRODUCT_FIELDS[field][1](row, ctx) for field in fields}
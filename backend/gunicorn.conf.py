@@ -0,0 +1,21 @@
+"""Gunicorn hooks.
+
+Run with PROMETHEUS_MULTIPROC_DIR pointing at an empty, writable directory
+so that /metrics aggregates samples from every worker.
+
+Workers are threaded (gthread) so that clients holding a payment-status
+stream open (/api/payments/order/<id>/payment-status/stream) do not tie up
+a whole worker each.
+"""
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,43 @@
+"""add co_purchase_pairs and co_purchase_neighbours tables
+
+Revision ID: 5e1f7a2b9c3d
+Revises: d046b42e9c6f
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1f7a2b9c3d'
+down_revision = 'd046b42e9c6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'co_purchase_pairs',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('other_product_id', sa.Integer(), nullable=False),
+        sa.Column('order_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['other_product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('product_id', 'other_product_id')
+    )
+    op.create_index('ix_co_purchase_pairs_product_count', 'co_purchase_pairs', ['product_id', 'order_count'])
+    op.create_table(
+        'co_purchase_neighbours',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('neighbours', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('product_id')
+    )
+
+
+def downgrade():
+    op.drop_table('co_purchase_neighbours')
+    op.drop_index('ix_co_purchase_pairs_product_count', table_name='co_purchase_pairs')
+    op.drop_table('co_purchase_pairs')
@@ -0,0 +1,39 @@
+"""add asset_deletions queue for Cloudinary cleanup
+
+Revision ID: 7c4d2e8f1a6b
+Revises: 5e1f7a2b9c3d
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4d2e8f1a6b'
+down_revision = '5e1f7a2b9c3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'asset_deletions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('public_id', sa.String(length=255), nullable=False),
+        sa.Column('resource_type', sa.String(length=20), nullable=False),
+        sa.Column('reason', sa.String(length=50), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('public_id')
+    )
+    op.create_index('ix_asset_deletions_status_id', 'asset_deletions', ['status', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_asset_deletions_status_id', table_name='asset_deletions')
+    op.drop_table('asset_deletions')
@@ -0,0 +1,47 @@
+"""add mpesa_callbacks inbox
+
+Revision ID: a7b9c1d3e5f6
+Revises: f6a8b0c2d4e5
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7b9c1d3e5f6'
+down_revision = 'f6a8b0c2d4e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'mpesa_callbacks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('checkout_request_id', sa.String(length=100), nullable=True),
+        sa.Column('merchant_request_id', sa.String(length=100), nullable=True),
+        sa.Column('result_code', sa.Integer(), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('payload_hash', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('outcome', sa.String(length=30), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(length=255), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('attempted_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('checkout_request_id', 'payload_hash',
+                            name='uq_mpesa_callbacks_checkout_payload')
+    )
+    op.create_index('ix_mpesa_callbacks_merchant_request_id', 'mpesa_callbacks',
+                    ['merchant_request_id'])
+    op.create_index('ix_mpesa_callbacks_status_id', 'mpesa_callbacks', ['status', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_mpesa_callbacks_status_id', table_name='mpesa_callbacks')
+    op.drop_index('ix_mpesa_callbacks_merchant_request_id', table_name='mpesa_callbacks')
+    op.drop_table('mpesa_callbacks')
@@ -0,0 +1,25 @@
+"""index branding_detail order_id and deadline
+
+Revision ID: b2e4f6a8c0d1
+Revises: 9a1b3c5d7e2f
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2e4f6a8c0d1'
+down_revision = '9a1b3c5d7e2f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_branding_detail_order_id'), 'branding_detail', ['order_id'])
+    op.create_index(op.f('ix_branding_detail_deadline'), 'branding_detail', ['deadline'])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_branding_detail_deadline'), table_name='branding_detail')
+    op.drop_index(op.f('ix_branding_detail_order_id'), table_name='branding_detail')
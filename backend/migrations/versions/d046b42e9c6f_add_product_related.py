@@ -0,0 +1,38 @@
+"""add product_related table for precomputed related products
+
+Revision ID: d046b42e9c6f
+Revises: 8b3c9d1f4c2a
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd046b42e9c6f'
+down_revision = '8b3c9d1f4c2a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'product_related',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('related_product_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['related_product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('product_id', 'related_product_id', name='uq_product_related_pair')
+    )
+    op.create_index('ix_product_related_product_rank', 'product_related', ['product_id', 'rank'])
+
+
+def downgrade():
+    op.drop_index('ix_product_related_product_rank', table_name='product_related')
+    op.drop_table('product_related')
@@ -0,0 +1,46 @@
+"""add stock_reservations
+
+Revision ID: d4e6f8a0b2c3
+Revises: c3d5e7f9a1b2
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e6f8a0b2c3'
+down_revision = 'c3d5e7f9a1b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stock_reservations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('release_reason', sa.String(length=30), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('resolved_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_reservations_order_id'), 'stock_reservations', ['order_id'])
+    op.create_index('ix_stock_reservations_product_status', 'stock_reservations',
+                    ['product_id', 'status', 'quantity'])
+    op.create_index('ix_stock_reservations_status_expires', 'stock_reservations',
+                    ['status', 'expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_stock_reservations_status_expires', table_name='stock_reservations')
+    op.drop_index('ix_stock_reservations_product_status', table_name='stock_reservations')
+    op.drop_index(op.f('ix_stock_reservations_order_id'), table_name='stock_reservations')
+    op.drop_table('stock_reservations')
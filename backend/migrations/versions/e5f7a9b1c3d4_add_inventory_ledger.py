@@ -0,0 +1,72 @@
+"""add inventory_movements ledger and inventory_snapshots
+
+Revision ID: e5f7a9b1c3d4
+Revises: d4e6f8a0b2c3
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f7a9b1c3d4'
+down_revision = 'd4e6f8a0b2c3'
+branch_labels = None
+depends_on = None
+
+_BigId = sa.BigInteger().with_variant(sa.Integer(), 'sqlite')
+
+
+def upgrade():
+    op.create_table(
+        'inventory_movements',
+        sa.Column('id', _BigId, autoincrement=True, nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity_delta', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=True),
+        sa.Column('note', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('folded_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inventory_movements_unfolded', 'inventory_movements',
+                    ['product_id', 'quantity_delta'],
+                    postgresql_where=sa.text('folded_at IS NULL'),
+                    sqlite_where=sa.text('folded_at IS NULL'))
+    op.create_index('ix_inventory_movements_product_created', 'inventory_movements',
+                    ['product_id', 'created_at'])
+    op.create_table(
+        'inventory_snapshots',
+        sa.Column('id', _BigId, autoincrement=True, nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('taken_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inventory_snapshots_product_taken', 'inventory_snapshots',
+                    ['product_id', 'taken_at'])
+
+    # Current stock becomes each product's opening movement, already folded
+    op.execute(
+        "INSERT INTO inventory_movements "
+        "(product_id, quantity_delta, kind, created_at, folded_at) "
+        "SELECT id, stock_quantity, 'opening', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP "
+        "FROM products"
+    )
+
+
+def downgrade():
+    # Fold anything pending back into stock_quantity before dropping the ledger
+    op.execute(
+        "UPDATE products SET stock_quantity = stock_quantity + COALESCE(("
+        "SELECT SUM(m.quantity_delta) FROM inventory_movements m "
+        "WHERE m.product_id = products.id AND m.folded_at IS NULL"
+        "), 0)"
+    )
+    op.drop_index('ix_inventory_snapshots_product_taken', table_name='inventory_snapshots')
+    op.drop_table('inventory_snapshots')
+    op.drop_index('ix_inventory_movements_product_created', table_name='inventory_movements')
+    op.drop_index('ix_inventory_movements_unfolded', table_name='inventory_movements')
+    op.drop_table('inventory_movements')
@@ -0,0 +1,51 @@
+"""add outbox_events and outbox_deliveries
+
+Revision ID: f6a8b0c2d4e5
+Revises: e5f7a9b1c3d4
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a8b0c2d4e5'
+down_revision = 'e5f7a9b1c3d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('aggregate_id', sa.Integer(), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('dedup_key', sa.String(length=150), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(length=255), nullable=True),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('dedup_key')
+    )
+    op.create_index('ix_outbox_events_status_available', 'outbox_events',
+                    ['status', 'available_at', 'id'])
+    op.create_table(
+        'outbox_deliveries',
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('handler', sa.String(length=100), nullable=False),
+        sa.Column('delivered_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['event_id'], ['outbox_events.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('event_id', 'handler')
+    )
+
+
+def downgrade():
+    op.drop_table('outbox_deliveries')
+    op.drop_index('ix_outbox_events_status_available', table_name='outbox_events')
+    op.drop_table('outbox_events')
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmark product catalog serialization against a database.
+
+Seeds a scratch database with a synthetic catalog, then times the full
+list-endpoint work (query, build payloads, encode JSON) for the same rows
+along two paths:
+
+* ORM: Product instances with their category and images eager-loaded,
+  serialized attribute by attribute as the catalog used to be;
+* Core: the column-projected select and row serializer that
+  GET /api/products uses today.
+
+Both paths encode with the app's JSON provider; a third run encodes the
+Core payload with Flask's default provider to show the encoder's share.
+
+Run from backend/:  python scripts/bench_serialization.py [num_products]
+
+Uses a temporary SQLite file unless BENCH_DATABASE_URL is set. Point that
+only at a scratch database: tables are created and filled there.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+_scratch_dir = tempfile.mkdtemp(prefix="bench-serialization-")
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(_scratch_dir, 'bench.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "bench-secret-key-" + "x" * 32)
+os.environ.setdefault("JWT_SECRET_KEY", "bench-jwt-secret-key-" + "y" * 32)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import joinedload, selectinload  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.category import Category  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.product_image import ProductImage  # noqa: E402
+from app.routes.product_routes import _catalog_select, _serialize_rows  # noqa: E402
+from app.utils.json_provider import orjson  # noqa: E402
+from app.utils.serializers import PRODUCT_VIEWS  # noqa: E402
+
+
+def _legacy_serialize(p):
+    """The serializer as it was before the row-tuple path."""
+    primary_image = None
+    if p.images:
+        primary = next((img for img in p.images if img.is_primary), None)
+        primary_image = primary.image_url if primary else p.images[0].image_url
+    return {
+        "id": p.id,
+        "name": p.name,
+        "description": p.description,
+        "price": float(p.price),
+        "category": p.category.slug,
+        "is_branding": p.is_branding,
+        "discount_percent": p.discount_percent,
+        "discounted_price": float(p.get_discounted_price()) if p.discount_percent else None,
+        "effective_price": float(p.get_effective_price()),
+        "flash_sale_active": p.is_flash_sale_active(),
+        "flash_sale_percent": p.flash_sale_percent,
+        "flash_sale_start": p.flash_sale_start.isoformat() if p.flash_sale_start else None,
+        "flash_sale_end": p.flash_sale_end.isoformat() if p.flash_sale_end else None,
+        "rating_avg": round(p.rating_sum / p.rating_count, 2) if p.rating_count > 0 else 0,
+        "rating_count": p.rating_count,
+        "in_stock": p.stock_quantity > 0,
+        "image": primary_image,
+        "images": [
+            {
+                "id": img.id,
+                "image_url": img.image_url,
+                "is_primary": img.is_primary,
+                "position": img.position,
+            }
+            for img in p.images
+        ],
+    }
+
+
+def seed_catalog(n):
+    now = datetime.utcnow()
+    category = Category(name="Mugs", slug="mugs")
+    db.session.add(category)
+    db.session.flush()
+    db.session.execute(insert(Product), [
+        dict(
+            id=i,
+            name=f"Product {i}",
+            description="A branded product " * 20,
+            price=Decimal("1499.00") + i,
+            category_id=category.id,
+            is_branding=i % 3 == 0,
+            stock_quantity=i % 50,
+            discount_percent=10 if i % 4 == 0 else 0,
+            flash_sale_start=now - timedelta(days=1) if i % 5 == 0 else None,
+            flash_sale_end=now + timedelta(days=1) if i % 5 == 0 else None,
+            flash_sale_percent=20 if i % 5 == 0 else 0,
+            rating_sum=i % 25,
+            rating_count=i % 5,
+        )
+        for i in range(1, n + 1)
+    ])
+    db.session.execute(insert(ProductImage), [
+        dict(
+            product_id=i,
+            image_url=f"https://res.cloudinary.com/demo/image/upload/p{i}_{k}.jpg",
+            is_primary=k == 0,
+            position=k,
+        )
+        for i in range(1, n + 1)
+        for k in range(3)
+    ])
+    db.session.commit()
+
+
+def orm_payload():
+    products = (
+        Product.query
+        .options(joinedload(Product.category), selectinload(Product.images))
+        .order_by(Product.id)
+        .all()
+    )
+    return [_legacy_serialize(p) for p in products]
+
+
+def core_payload():
+    fields = PRODUCT_VIEWS["detail"]
+    return _serialize_rows(db.session.execute(_catalog_select(fields)).all(), fields)
+
+
+def _time(label, fn, repeat=5):
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        # Start each run with an empty identity map, as a request would
+        db.session.expunge_all()
+        start = time.perf_counter()
+        size = len(fn())
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<44} {best * 1000:8.1f} ms  {size / 1024:8.0f} KiB")
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    app = create_app()
+    default_json = DefaultJSONProvider(app)
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        seed_catalog(n)
+        dialect = db.engine.dialect.name
+
+        print(f"Serializing {n} products on {dialect} (orjson {'on' if orjson else 'off'})")
+        print("=" * 72)
+        orm = _time("ORM instances + app JSON provider",
+                    lambda: app.json.dumps(orm_payload()))
+        core = _time("Core rows + app JSON provider",
+                     lambda: app.json.dumps(core_payload()))
+        _time("Core rows + Flask default JSON provider",
+              lambda: default_json.dumps(core_payload()))
+        print("=" * 72)
+        print(f"Core vs ORM speedup: {orm / core:.2f}x")
+        db.session.remove()
+        db.engine.dispose()
+
+    shutil.rmtree(_scratch_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Config reads the environment at import time, so this must run before
+# the app package is imported.
+_db_dir = tempfile.mkdtemp(prefix="smartnest-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("SECRET_KEY", "test-secret-key-" + "x" * 32)
+os.environ.setdefault("JWT_SECRET_KEY", "test-jwt-secret-key-" + "y" * 32)
+os.environ.setdefault("CLOUDINARY_CLOUD_NAME", "test")
+os.environ.setdefault("CLOUDINARY_API_KEY", "test")
+os.environ.setdefault("CLOUDINARY_API_SECRET", "test")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app, db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.testing = True
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers(app):
+    from flask_jwt_extended import create_access_token
+
+    token = create_access_token(identity="1", additional_claims={"role": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def make_product(app):
+    """Create a product with ``stock`` units on hand; returns its id."""
+    from app.models import Category, Product
+
+    def make(stock=10, price=100, name=None):
+        category = Category.query.filter_by(slug="test").first()
+        if category is None:
+            category = Category(name="Test", slug="test")
+            db.session.add(category)
+            db.session.flush()
+        product = Product(
+            name=name or f"Product {Product.query.count() + 1}",
+            price=price,
+            category_id=category.id,
+            stock_quantity=stock,
+            description="A test product",
+        )
+        db.session.add(product)
+        db.session.commit()
+        return product.id
+
+    return make
+
+
+CUSTOMER = {
+    "name": "Wanjiru",
+    "phone": "0712345678",
+    "address": "Moi Avenue, Nairobi",
+    "email": "wanjiru@example.com",
+}
+
+
+@pytest.fixture
+def customer():
+    return dict(CUSTOMER)
+
+
+@pytest.fixture
+def place_order(client):
+    """POST /api/orders for {product_id: qty}; returns the response JSON."""
+
+    def place(lines, **extra):
+        response = client.post("/api/orders", json={
+            "customer": CUSTOMER,
+            "items": [{"product_id": pid, "qty": qty} for pid, qty in lines.items()],
+            **extra,
+        })
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()
+
+    return place
+
+
+@pytest.fixture
+def stock_levels(app):
+    """(on-hand, available) for a product, read fresh from the database."""
+    from app.models import Product
+
+    def levels(product_id):
+        db.session.expire_all()
+        return db.session.get(Product, product_id).stock_levels()
+
+    return levels
+
+
+class FakeMpesa:
+    """Stands in for Daraja: STK pushes succeed or fail on demand and the
+    status query confirms whatever the last callback claimed."""
+
+    def __init__(self):
+        self.accept_push = True
+        self.confirm_status = True
+        self.pushes = []
+
+    def stk_push(self, phone, amount, order_id):
+        self.pushes.append((phone, amount, order_id))
+        if not self.accept_push:
+            return {"success": False, "error": "Request rejected"}
+        return {"success": True, "checkout_request_id": f"ws_CO_{order_id}_{len(self.pushes)}"}
+
+    def query_stk_status(self, checkout_request_id):
+        return {"ResultCode": "0" if self.confirm_status else "1032"}
+
+    @staticmethod
+    def callback(checkout_request_id, amount=None, phone="254712345678",
+                 result_code=0, receipt="QKT123ABC"):
+        body = {
+            "MerchantRequestID": "29115-34620561-1",
+            "CheckoutRequestID": checkout_request_id,
+            "ResultCode": result_code,
+            "ResultDesc": "Processed" if result_code == 0 else "Request cancelled by user",
+        }
+        if result_code == 0:
+            body["CallbackMetadata"] = {"Item": [
+                {"Name": "Amount", "Value": amount},
+                {"Name": "MpesaReceiptNumber", "Value": receipt},
+                {"Name": "TransactionDate", "Value": 20261019120000},
+                {"Name": "PhoneNumber", "Value": int(phone)},
+            ]}
+        return {"Body": {"stkCallback": body}}
+
+
+@pytest.fixture
+def mpesa(monkeypatch):
+    fake = FakeMpesa()
+    monkeypatch.setattr("app.routes.payment.stk_push", fake.stk_push)
+    monkeypatch.setattr("app.services.mpesa_callbacks.query_stk_status", fake.query_stk_status)
+    return fake
@@ -0,0 +1,134 @@
+import uuid
+
+import pytest
+
+from app import db
+from app.models import Order
+from app.models.idempotency_key import IdempotencyKey
+from app.services.inventory import RESTOCK, record_movement
+from app.utils.idempotency import idempotent, replay_cache
+
+
+@pytest.fixture
+def post_order(client, customer):
+    """POST /api/orders with an Idempotency-Key; returns the response."""
+
+    def post(key, lines):
+        return client.post(
+            "/api/orders",
+            json={
+                "customer": customer,
+                "items": [{"product_id": pid, "qty": qty} for pid, qty in lines.items()],
+            },
+            headers={"Idempotency-Key": key},
+        )
+
+    return post
+
+
+def test_repeat_replays_the_first_response(post_order, make_product):
+    product_id = make_product(stock=5)
+    key = str(uuid.uuid4())
+
+    first = post_order(key, {product_id: 1})
+    second = post_order(key, {product_id: 1})
+
+    assert first.status_code == second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.get_json()["order_id"] == first.get_json()["order_id"]
+    assert Order.query.count() == 1
+
+
+def test_repeat_is_replayed_from_the_database(post_order, make_product):
+    product_id = make_product(stock=5)
+    key = str(uuid.uuid4())
+    first = post_order(key, {product_id: 1})
+    replay_cache.clear()
+
+    second = post_order(key, {product_id: 1})
+
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.get_json() == first.get_json()
+
+
+def test_same_key_with_a_different_body_is_refused(post_order, make_product):
+    product_id = make_product(stock=5)
+    key = str(uuid.uuid4())
+    post_order(key, {product_id: 1})
+
+    response = post_order(key, {product_id: 2})
+
+    assert response.status_code == 422
+    assert Order.query.count() == 1
+
+
+def test_repeat_while_the_first_is_running_gets_409(post_order, make_product):
+    product_id = make_product(stock=5)
+    key = str(uuid.uuid4())
+    post_order(key, {product_id: 1})
+    # As if the first request were still running
+    row = db.session.get(IdempotencyKey, ("orders.create", key))
+    row.status_code = None
+    db.session.commit()
+    replay_cache.clear()
+
+    response = post_order(key, {product_id: 1})
+
+    assert response.status_code == 409
+
+
+def test_validation_errors_are_replayed(post_order):
+    key = str(uuid.uuid4())
+
+    first = post_order(key, {})
+    second = post_order(key, {})
+
+    assert first.status_code == second.status_code == 400
+    assert second.headers["Idempotent-Replayed"] == "true"
+
+
+def test_insufficient_stock_is_retried_against_current_stock(post_order, make_product):
+    product_id = make_product(stock=1)
+    key = str(uuid.uuid4())
+
+    first = post_order(key, {product_id: 2})
+    assert first.status_code == 400
+    assert db.session.get(IdempotencyKey, ("orders.create", key)) is None
+
+    record_movement(product_id, 5, RESTOCK)
+    db.session.commit()
+    second = post_order(key, {product_id: 2})
+
+    assert second.status_code == 201
+    assert "Idempotent-Replayed" not in second.headers
+
+
+def test_view_exception_releases_the_key(app, client):
+    calls = []
+
+    @idempotent("tests.flaky")
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return {"attempt": len(calls)}, 201
+
+    app.add_url_rule("/flaky", endpoint="flaky", view_func=flaky, methods=["POST"])
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    with pytest.raises(RuntimeError):
+        client.post("/flaky", json={}, headers=headers)
+    response = client.post("/flaky", json={}, headers=headers)
+
+    assert response.status_code == 201
+    assert response.get_json() == {"attempt": 2}
+
+
+def test_requests_without_a_key_are_not_deduplicated(client, customer, make_product):
+    product_id = make_product(stock=5)
+    body = {"customer": customer, "items": [{"product_id": product_id, "qty": 1}]}
+
+    client.post("/api/orders", json=body)
+    client.post("/api/orders", json=body)
+
+    assert Order.query.count() == 2
@@ -0,0 +1,145 @@
+import io
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from app.services.image_uploads import (
+    ImageRejected,
+    failed_uploads,
+    prepare_image,
+    upload_images,
+)
+
+
+def _jpeg_bytes(size=(400, 200), exif_orientation=None):
+    image = Image.new("RGB", size, "red")
+    exif = Image.Exif()
+    exif[0x010F] = "TestCam"  # Make
+    if exif_orientation:
+        exif[0x0112] = exif_orientation
+    out = io.BytesIO()
+    image.save(out, format="JPEG", exif=exif)
+    return out.getvalue()
+
+
+def _file(data, filename):
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+
+class FakeUploader:
+    """Records every upload instead of sending it to Cloudinary.
+
+    Uploads of images narrower than ``fail_below`` pixels raise, standing in
+    for an upstream error on one file of a batch.
+    """
+
+    def __init__(self, fail_below=0):
+        self.fail_below = fail_below
+        self.calls = []
+
+    def __call__(self, file, **options):
+        data = file.read()
+        self.calls.append((data, options))
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width < self.fail_below:
+                raise RuntimeError("upstream unavailable")
+        return {"secure_url": f"https://cdn.test/{len(data)}.webp"}
+
+
+def test_prepare_image_downscales_and_strips_metadata():
+    data = prepare_image(_jpeg_bytes(exif_orientation=6), max_dimension=100)
+
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.format == "WEBP"
+        # Orientation 6 rotates the 400x200 source to portrait first.
+        assert image.size == (50, 100)
+        assert not image.getexif()
+
+
+def test_prepare_image_can_keep_source_format():
+    data = prepare_image(_jpeg_bytes(), max_dimension=1000, output_format=None)
+
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.format == "JPEG"
+        assert image.size == (400, 200)
+
+
+def test_prepare_image_rejects_non_images():
+    with pytest.raises(ImageRejected):
+        prepare_image(b"not an image", max_dimension=100)
+
+
+def test_upload_images_reports_each_file(app):
+    app.config["IMAGE_MAX_DIMENSION"] = 100
+    uploader = FakeUploader(fail_below=20)
+    files = [
+        _file(_jpeg_bytes(), "photo.jpg"),
+        _file(b"\x89PNG broken", "broken.png"),
+        _file(b"", "empty.jpg"),
+        _file(_jpeg_bytes(size=(10, 10)), "tiny.jpg"),
+    ]
+
+    results = upload_images(files, uploader=uploader, folder="products")
+
+    assert [r["filename"] for r in results] == ["photo.jpg", "broken.png", "empty.jpg", "tiny.jpg"]
+    assert results[0]["ok"]
+    assert results[0]["result"]["secure_url"].startswith("https://cdn.test/")
+    assert failed_uploads(results) == [
+        {"index": 1, "filename": "broken.png", "reason": "invalid", "error": "Not a valid image file"},
+        {"index": 2, "filename": "empty.jpg", "reason": "invalid", "error": "Empty file"},
+        {"index": 3, "filename": "tiny.jpg", "reason": "upload_error", "error": "Upload failed"},
+    ]
+    # Rejected files never reach the uploader.
+    assert len(uploader.calls) == 2
+    assert all(options == {"folder": "products"} for _, options in uploader.calls)
+
+
+def test_upload_images_sends_prepared_bytes(app):
+    app.config["IMAGE_MAX_DIMENSION"] = 100
+    uploader = FakeUploader()
+
+    upload_images([_file(_jpeg_bytes(), "photo.jpg")], uploader=uploader)
+
+    [(uploaded, _)] = uploader.calls
+    with Image.open(io.BytesIO(uploaded)) as image:
+        assert image.format == "WEBP"
+        assert image.size == (100, 50)
+        assert not image.getexif()
+
+
+def test_upload_images_rejects_oversized_files_before_uploading(app):
+    app.config["IMAGE_MAX_UPLOAD_BYTES"] = 100
+    uploader = FakeUploader()
+
+    [result] = upload_images([_file(_jpeg_bytes(), "big.jpg")], uploader=uploader)
+
+    assert result["reason"] == "invalid"
+    assert uploader.calls == []
+
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+
+
+def test_upload_images_validates_svg_and_gif_by_default(app):
+    uploader = FakeUploader()
+
+    [result] = upload_images([_file(SVG, "logo.svg")], uploader=uploader)
+
+    assert result["reason"] == "invalid"
+    assert uploader.calls == []
+
+
+def test_upload_images_passes_through_only_when_asked(app):
+    calls = []
+
+    def uploader(file, **options):
+        calls.append(file.read())
+        return {"secure_url": "https://cdn.test/logo.svg"}
+
+    [result] = upload_images(
+        [_file(SVG, "logo.svg")], uploader=uploader, passthrough={"svg", "exe"}
+    )
+
+    assert result["ok"]
+    assert calls == [SVG]
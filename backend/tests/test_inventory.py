@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import db
+from app.models import Product
+from app.models.inventory import InventoryMovement, InventorySnapshot
+from app.services.inventory import (
+    RESTOCK,
+    SALE,
+    compact_movements,
+    record_movements,
+    set_opening_stock,
+    stock_as_of,
+)
+
+T0 = datetime(2026, 10, 1, 9, 0)
+
+
+def _product_with_opening_stock(make_product, quantity, at=T0):
+    product_id = make_product(stock=0)
+    set_opening_stock(db.session.get(Product, product_id), quantity)
+    db.session.flush()
+    db.session.query(InventoryMovement).filter_by(product_id=product_id).update(
+        {"created_at": at, "folded_at": at}
+    )
+    db.session.commit()
+    return product_id
+
+
+def _move(product_id, delta, at, kind=SALE, **extra):
+    db.session.execute(insert(InventoryMovement), [{
+        "product_id": product_id, "quantity_delta": delta, "kind": kind,
+        "created_at": at, **extra,
+    }])
+    db.session.commit()
+
+
+def test_movements_count_towards_stock_before_they_are_folded(make_product, stock_levels):
+    product_id = _product_with_opening_stock(make_product, 10)
+    record_movements([
+        {"product_id": product_id, "quantity_delta": -3, "kind": SALE},
+        {"product_id": product_id, "quantity_delta": 5, "kind": RESTOCK},
+    ])
+    db.session.commit()
+
+    assert db.session.get(Product, product_id).stock_quantity == 10
+    assert stock_levels(product_id) == (12, 12)
+
+
+def test_compaction_folds_each_movement_once(make_product, stock_levels):
+    first = _product_with_opening_stock(make_product, 10)
+    second = _product_with_opening_stock(make_product, 4)
+    _move(first, -3, T0 + timedelta(minutes=1))
+    _move(second, 2, T0 + timedelta(minutes=2), kind=RESTOCK)
+
+    assert compact_movements(now=T0 + timedelta(hours=1)) == (2, 2)
+    assert compact_movements(now=T0 + timedelta(hours=2)) == (0, 0)
+
+    db.session.expire_all()
+    assert db.session.get(Product, first).stock_quantity == 7
+    assert stock_levels(first) == (7, 7)
+    assert stock_levels(second) == (6, 6)
+    snapshots = InventorySnapshot.query.filter_by(product_id=first).all()
+    assert [(s.quantity, s.taken_at) for s in snapshots] == [(7, T0 + timedelta(hours=1))]
+
+
+def test_movement_committed_after_a_compaction_run_is_not_lost(make_product, stock_levels):
+    product_id = _product_with_opening_stock(make_product, 10)
+    for minute in range(1, 4):
+        _move(product_id, -1, T0 + timedelta(minutes=minute), id=100 + minute)
+    compact_movements(now=T0 + timedelta(hours=1))
+
+    # A movement whose id and created_at predate the run but whose
+    # transaction only committed afterwards (a slow checkout)
+    _move(product_id, -2, T0 + timedelta(minutes=2, seconds=30), id=50)
+
+    assert stock_levels(product_id) == (5, 5)
+    assert compact_movements(now=T0 + timedelta(hours=2)) == (1, 1)
+    db.session.expire_all()
+    assert db.session.get(Product, product_id).stock_quantity == 5
+    assert stock_levels(product_id) == (5, 5)
+
+
+def test_stock_as_of(make_product):
+    product_id = _product_with_opening_stock(make_product, 10)
+    _move(product_id, -3, T0 + timedelta(hours=1))
+    compact_movements(now=T0 + timedelta(hours=2))
+    _move(product_id, 5, T0 + timedelta(hours=3), kind=RESTOCK)
+
+    assert stock_as_of(product_id, T0 - timedelta(minutes=1)) is None
+    assert stock_as_of(product_id, T0) == 10
+    assert stock_as_of(product_id, T0 + timedelta(minutes=90)) == 7
+    assert stock_as_of(product_id, T0 + timedelta(hours=2)) == 7
+    assert stock_as_of(product_id, T0 + timedelta(hours=4)) == 12
+
+
+def test_stock_as_of_counts_movements_folded_after_the_snapshot(make_product):
+    product_id = _product_with_opening_stock(make_product, 10)
+    _move(product_id, -1, T0 + timedelta(hours=1))
+    compact_movements(now=T0 + timedelta(hours=2))
+    # Created before the snapshot, committed (and folded) after it
+    _move(product_id, -4, T0 + timedelta(minutes=90))
+    compact_movements(now=T0 + timedelta(hours=3))
+
+    assert stock_as_of(product_id, T0 + timedelta(minutes=150)) == 5
+    assert stock_as_of(product_id, T0 + timedelta(hours=4)) == 5
@@ -0,0 +1,29 @@
+import pytest
+
+from app.utils.metrics import REQUEST_COUNT
+
+
+def _count(endpoint, status):
+    return REQUEST_COUNT.labels("app", endpoint, "GET", status)._value.get()
+
+
+def test_unhandled_exception_is_counted(app, client):
+    def explode():
+        raise RuntimeError("boom")
+
+    app.add_url_rule("/explode", endpoint="explode", view_func=explode)
+    before = _count("explode", "500")
+
+    with pytest.raises(RuntimeError):
+        client.get("/explode")
+
+    assert _count("explode", "500") == before + 1
+
+
+def test_response_status_is_counted(app, client):
+    app.add_url_rule("/teapot", endpoint="teapot", view_func=lambda: ("", 418))
+    before = _count("teapot", "418")
+
+    client.get("/teapot")
+
+    assert _count("teapot", "418") == before + 1
@@ -0,0 +1,158 @@
+import pytest
+
+from app import db
+from app.models import Order
+from app.models.mpesa_callback import MpesaCallback
+from app.models.outbox import OutboxEvent
+from app.services.mpesa_callbacks import FAILED, PROCESSED, REJECTED, replay_callbacks
+
+
+@pytest.fixture
+def stk_order(client, mpesa, make_product, place_order):
+    """An order with an accepted STK push; returns (order, checkout id)."""
+
+    def make():
+        order = place_order({make_product(stock=5, price=1000): 1})
+        response = client.post(
+            "/api/payments/mpesa/stk",
+            json={"order_id": order["order_id"], "phone": "0712345678"},
+            headers={"X-Order-Token": order["order_access_token"]},
+        )
+        assert response.status_code == 200
+        return order, response.get_json()["checkout_request_id"]
+
+    return make
+
+
+def _post(client, payload):
+    response = client.post("/api/payments/mpesa/callback", json=payload)
+    assert response.status_code == 200
+    assert response.get_json()["ResultCode"] == 0
+    return response
+
+
+def _payment(order):
+    db.session.expire_all()
+    return db.session.get(Order, order["order_id"]).payment
+
+
+def _entries():
+    db.session.expire_all()
+    return [(e.outcome, e.status) for e in MpesaCallback.query.order_by(MpesaCallback.id)]
+
+
+def test_identical_callback_is_stored_and_applied_once(client, mpesa, stk_order):
+    order, checkout_id = stk_order()
+    payload = mpesa.callback(checkout_id, amount=order["total"])
+
+    _post(client, payload)
+    _post(client, payload)
+
+    assert _payment(order).status == "PAID"
+    assert _entries() == [("paid", PROCESSED)]
+    assert OutboxEvent.query.filter_by(event_type="payment.confirmed").count() == 1
+
+
+def test_forged_failure_does_not_hide_the_real_payment(client, mpesa, stk_order):
+    order, checkout_id = stk_order()
+
+    _post(client, mpesa.callback(checkout_id, result_code=1032))
+    _post(client, mpesa.callback(checkout_id, amount=order["total"]))
+
+    assert _payment(order).status == "PAID"
+    assert db.session.get(Order, order["order_id"]).status == "CONFIRMED"
+    assert _entries() == [("failed", PROCESSED), ("paid", PROCESSED)]
+
+
+def test_callback_that_beat_the_push_response_is_replayed(client, mpesa, stk_order):
+    order, checkout_id = stk_order()
+    payment = _payment(order)
+    payment.mpesa_checkout_id = None
+    db.session.commit()
+
+    _post(client, mpesa.callback(checkout_id, amount=order["total"]))
+    assert _entries() == [("unknown_payment", FAILED)]
+
+    payment = _payment(order)
+    payment.mpesa_checkout_id = checkout_id
+    db.session.commit()
+
+    assert replay_callbacks() == {"replayed": 1, PROCESSED: 1, REJECTED: 0, FAILED: 0}
+    assert _payment(order).status == "PAID"
+
+
+def test_unconfirmed_payment_is_retried(client, mpesa, stk_order):
+    order, checkout_id = stk_order()
+    mpesa.confirm_status = False
+
+    _post(client, mpesa.callback(checkout_id, amount=order["total"]))
+    assert _entries() == [("verification_failed", FAILED)]
+    assert _payment(order).status != "PAID"
+
+    mpesa.confirm_status = True
+    replay_callbacks()
+
+    assert _entries() == [("paid", PROCESSED)]
+    assert _payment(order).status == "PAID"
+
+
+def test_rejected_callbacks_are_only_replayed_on_request(client, mpesa, stk_order):
+    order, checkout_id = stk_order()
+
+    _post(client, mpesa.callback(checkout_id, amount=1))
+    assert _entries() == [("amount_mismatch", REJECTED)]
+
+    assert replay_callbacks()["replayed"] == 0
+    assert replay_callbacks(include_rejected=True) == {
+        "replayed": 1, PROCESSED: 0, REJECTED: 1, FAILED: 0,
+    }
+    assert _payment(order).status != "PAID"
+
+
+def test_processing_error_is_acknowledged_and_kept_for_replay(
+        client, mpesa, stk_order, monkeypatch):
+    order, checkout_id = stk_order()
+
+    def explode(payload):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr("app.services.mpesa_callbacks._apply_callback", explode)
+    _post(client, mpesa.callback(checkout_id, amount=order["total"]))
+    assert _entries() == [("error", FAILED)]
+
+    monkeypatch.undo()
+    monkeypatch.setattr("app.services.mpesa_callbacks.query_stk_status",
+                        mpesa.query_stk_status)
+    replay_callbacks()
+
+    assert _payment(order).status == "PAID"
+
+
+def test_replay_gives_up_after_max_attempts(app, client, mpesa, stk_order):
+    app.config["MPESA_CALLBACK_MAX_ATTEMPTS"] = 2
+    order, checkout_id = stk_order()
+    mpesa.confirm_status = False
+    _post(client, mpesa.callback(checkout_id, amount=order["total"]))
+
+    assert replay_callbacks()["replayed"] == 1
+    assert replay_callbacks()["replayed"] == 0
+    assert MpesaCallback.query.one().attempts == 2
+
+
+def test_admin_can_list_and_replay_callbacks(client, mpesa, stk_order, admin_headers):
+    order, checkout_id = stk_order()
+    mpesa.confirm_status = False
+    _post(client, mpesa.callback(checkout_id, amount=order["total"]))
+    entry_id = MpesaCallback.query.one().id
+
+    listed = client.get("/api/admin/payments/mpesa-callbacks?status=failed",
+                        headers=admin_headers)
+    assert [e["id"] for e in listed.get_json()] == [entry_id]
+
+    mpesa.confirm_status = True
+    replayed = client.post("/api/admin/payments/mpesa-callbacks/replay",
+                           json={"ids": [entry_id]}, headers=admin_headers)
+
+    assert replayed.status_code == 200
+    assert replayed.get_json()["processed"] == 1
+    assert _payment(order).status == "PAID"
@@ -0,0 +1,150 @@
+import pytest
+
+from app import db
+from app.models import Order
+from app.services.order_status import (
+    CANCELLED,
+    CONFIRMED,
+    DELIVERED,
+    PAYMENT_FAILED,
+    PENDING,
+    PROCESSING,
+    SHIPPED,
+    TRANSITIONS,
+    allowed_from,
+    can_transition,
+)
+
+
+def _set_status(order, status):
+    db.session.get(Order, order["order_id"]).status = status
+    db.session.commit()
+
+
+def _status(order):
+    db.session.expire_all()
+    return db.session.get(Order, order["order_id"]).status
+
+
+def test_terminal_statuses_allow_nothing():
+    assert TRANSITIONS[DELIVERED] == set()
+    assert TRANSITIONS[CANCELLED] == set()
+    assert not can_transition(SHIPPED, CANCELLED)
+    assert not can_transition(DELIVERED, PENDING)
+
+
+def test_allowed_from_inverts_transitions():
+    assert allowed_from(SHIPPED) == sorted([CONFIRMED, PROCESSING])
+    assert allowed_from(PENDING) == sorted([PAYMENT_FAILED, PROCESSING])
+
+
+@pytest.mark.parametrize("old, new, expected", [
+    (PENDING, PROCESSING, 200),
+    (PROCESSING, SHIPPED, 200),
+    (SHIPPED, DELIVERED, 200),
+    (DELIVERED, SHIPPED, 409),
+    (CANCELLED, PROCESSING, 409),
+    (SHIPPED, SHIPPED, 200),
+])
+def test_single_status_update_follows_transitions(
+        client, admin_headers, make_product, place_order, old, new, expected):
+    order = place_order({make_product(): 1})
+    _set_status(order, old)
+
+    response = client.put(f"/api/orders/{order['order_id']}/status",
+                          json={"status": new}, headers=admin_headers)
+
+    assert response.status_code == expected
+    assert _status(order) == (new if expected == 200 else old)
+
+
+def test_unknown_status_is_rejected(client, admin_headers, make_product, place_order):
+    order = place_order({make_product(): 1})
+
+    response = client.put(f"/api/orders/{order['order_id']}/status",
+                          json={"status": CONFIRMED}, headers=admin_headers)
+
+    assert response.status_code == 400
+
+
+def test_bulk_update_reports_each_order(client, admin_headers, make_product, place_order,
+                                        stock_levels):
+    product_id = make_product(stock=10)
+    pending, processing, delivered = (place_order({product_id: 1}) for _ in range(3))
+    _set_status(processing, PROCESSING)
+    _set_status(delivered, DELIVERED)
+
+    response = client.put("/api/orders/status", headers=admin_headers, json={
+        "order_ids": [pending["order_id"], processing["order_id"],
+                      delivered["order_id"], 999],
+        "status": PROCESSING,
+    })
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert (data["updated"], data["failed"]) == (1, 2)
+    results = {r["order_id"]: r for r in data["results"]}
+    assert results[pending["order_id"]] == {
+        "order_id": pending["order_id"], "old_status": PENDING,
+        "ok": True, "new_status": PROCESSING,
+    }
+    assert results[processing["order_id"]]["unchanged"] is True
+    assert results[delivered["order_id"]]["error"] == (
+        f"Cannot change status from '{DELIVERED}' to '{PROCESSING}'"
+    )
+    assert results[999]["error"] == "Order not found"
+    assert _status(pending) == PROCESSING
+    assert _status(delivered) == DELIVERED
+    # Only the order moved to fulfilment had its hold turned into a sale
+    assert stock_levels(product_id) == (9, 7)
+
+
+def test_bulk_cancel_releases_held_stock(client, admin_headers, make_product, place_order,
+                                         stock_levels):
+    product_id = make_product(stock=10)
+    orders = [place_order({product_id: 2}) for _ in range(3)]
+
+    response = client.put("/api/orders/status", headers=admin_headers, json={
+        "order_ids": [o["order_id"] for o in orders], "status": CANCELLED,
+    })
+
+    assert response.get_json()["updated"] == 3
+    assert stock_levels(product_id) == (10, 10)
+
+
+@pytest.mark.parametrize("body", [
+    {"order_ids": [], "status": SHIPPED},
+    {"order_ids": [1, "2"], "status": SHIPPED},
+    {"order_ids": [True], "status": SHIPPED},
+    {"order_ids": [1], "status": "lost"},
+])
+def test_bulk_update_validates_its_input(client, admin_headers, body):
+    assert client.put("/api/orders/status", json=body, headers=admin_headers).status_code == 400
+
+
+def test_admin_payment_update_moves_a_failed_order_on(client, admin_headers, make_product,
+                                                      place_order, stock_levels):
+    product_id = make_product(stock=5)
+    order = place_order({product_id: 2})
+    _set_status(order, PAYMENT_FAILED)
+    payment_id = db.session.get(Order, order["order_id"]).payment.id
+
+    response = client.put(f"/api/admin/payments/{payment_id}/status",
+                          json={"status": "PAID"}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert _status(order) == PROCESSING
+    assert stock_levels(product_id) == (3, 3)
+
+
+def test_admin_payment_update_refuses_cancelled_orders(client, admin_headers, make_product,
+                                                       place_order):
+    order = place_order({make_product(): 1})
+    _set_status(order, CANCELLED)
+    payment_id = db.session.get(Order, order["order_id"]).payment.id
+
+    response = client.put(f"/api/admin/payments/{payment_id}/status",
+                          json={"status": "PAID"}, headers=admin_headers)
+
+    assert response.status_code == 409
+    assert db.session.get(Order, order["order_id"]).payment.status == "PENDING"
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import db
+from app.models.outbox import OutboxDelivery, OutboxEvent
+from app.services.outbox import (
+    DONE,
+    FAILED,
+    PENDING,
+    claim_batch,
+    deliver_event,
+    enqueue_event,
+    relay_batch,
+    retry_failed_events,
+)
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Replace the notification handlers with recording fakes.
+
+    ``failing`` names the handlers that raise; ``before`` maps a handler
+    name to a hook run at the start of that handler.
+    """
+
+    class Handlers:
+        def __init__(self):
+            self.calls = []
+            self.failing = set()
+            self.before = {}
+
+        def make(self, name):
+            def handler(event):
+                if name in self.before:
+                    self.before[name](event)
+                self.calls.append((name, event.id))
+                if name in self.failing:
+                    raise RuntimeError(f"{name} is down")
+            return handler
+
+        def __call__(self, event_type):
+            return [(name, self.make(name)) for name in ("email", "webhook")]
+
+    fake = Handlers()
+    monkeypatch.setattr("app.services.outbox.handlers_for", fake)
+    return fake
+
+
+def _event(event_id):
+    db.session.expire_all()
+    return db.session.get(OutboxEvent, event_id)
+
+
+def _enqueue(dedup_key=None):
+    event = enqueue_event("order.created", 1, {"total": 100}, dedup_key=dedup_key)
+    db.session.commit()
+    return event.id
+
+
+def test_dedup_key_enqueues_once(app):
+    assert _enqueue("order.created:1")
+    assert enqueue_event("order.created", 1, dedup_key="order.created:1") is None
+    assert OutboxEvent.query.count() == 1
+
+
+def test_relay_runs_every_handler_once(app, handlers):
+    event_id = _enqueue()
+
+    assert relay_batch() == 1
+    assert relay_batch() == 0
+
+    assert handlers.calls == [("email", event_id), ("webhook", event_id)]
+    event = _event(event_id)
+    assert (event.status, event.attempts, event.last_error) == (DONE, 1, None)
+
+
+def test_retry_only_reruns_failed_handlers(app, handlers):
+    event_id = _enqueue()
+    handlers.failing = {"webhook"}
+    relay_batch()
+
+    event = _event(event_id)
+    assert event.status == PENDING
+    assert event.available_at > datetime.utcnow()
+    assert event.last_error == "webhook: webhook is down"
+
+    handlers.failing = set()
+    db.session.execute(update(OutboxEvent).values(available_at=datetime.utcnow()))
+    db.session.commit()
+    relay_batch()
+
+    assert handlers.calls == [("email", event_id), ("webhook", event_id), ("webhook", event_id)]
+    assert _event(event_id).status == DONE
+
+
+def test_event_fails_after_max_attempts_and_can_be_requeued(app, handlers):
+    app.config["OUTBOX_MAX_ATTEMPTS"] = 1
+    event_id = _enqueue()
+    handlers.failing = {"email"}
+    relay_batch()
+    assert _event(event_id).status == FAILED
+
+    assert retry_failed_events() == 1
+    handlers.failing = set()
+    relay_batch()
+
+    event = _event(event_id)
+    assert event.status == DONE
+    assert OutboxDelivery.query.filter_by(event_id=event_id).count() == 2
+
+
+def test_leased_events_are_not_claimed_again(app, handlers):
+    _enqueue()
+
+    events, _ = claim_batch(10)
+    assert len(events) == 1
+    assert claim_batch(10)[0] == []
+    # Once the lease runs out another worker may take the event
+    later = datetime.utcnow() + timedelta(hours=1)
+    assert len(claim_batch(10, now=later)[0]) == 1
+
+
+def test_worker_that_lost_its_lease_does_not_deliver(app, handlers):
+    event_id = _enqueue()
+    [event], lease_end = claim_batch(10)
+    # The lease ran out and another worker re-claimed the event
+    claim_batch(10, now=lease_end + timedelta(seconds=1))
+
+    assert deliver_event(event, lease_end) is False
+    assert handlers.calls == []
+    assert _event(event_id).status == PENDING
+
+
+def test_lease_lost_mid_event_stops_before_the_next_handler(app, handlers):
+    event_id = _enqueue()
+    [event], lease_end = claim_batch(10)
+
+    def reclaimed(_event):
+        claim_batch(10, now=datetime.utcnow() + timedelta(hours=1))
+
+    handlers.before["email"] = reclaimed
+
+    assert deliver_event(event, lease_end) is False
+    # email ran under a valid lease and is recorded; webhook is left to the
+    # worker that holds the lease now
+    assert handlers.calls == [("email", event_id)]
+    assert [d.handler for d in OutboxDelivery.query.filter_by(event_id=event_id)] == ["email"]
+    assert _event(event_id).status == PENDING
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.models import Category, Product
+from app.utils.query_stats import QueryBudgetExceeded, query_budget
+
+
+def _add_route(app, rule, budget, queries, fail=False):
+    @query_budget(budget)
+    def view():
+        for _ in range(queries):
+            db.session.execute(text("SELECT 1"))
+        if fail:
+            raise RuntimeError("boom")
+        return {"ok": True}
+
+    app.add_url_rule(rule, endpoint=rule.strip("/"), view_func=view)
+
+
+def test_request_within_budget_passes(app, client):
+    _add_route(app, "/within", budget=2, queries=2)
+
+    assert client.get("/within").status_code == 200
+
+
+def test_request_over_budget_fails_in_testing(app, client):
+    _add_route(app, "/over", budget=1, queries=3)
+
+    with pytest.raises(QueryBudgetExceeded, match="issued 3 queries"):
+        client.get("/over")
+
+
+def test_over_budget_does_not_mask_view_error(app, client):
+    _add_route(app, "/over-and-failing", budget=1, queries=3, fail=True)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        client.get("/over-and-failing")
+
+
+def test_over_budget_is_only_logged_outside_testing(app, client, caplog):
+    _add_route(app, "/over-logged", budget=1, queries=2)
+    app.testing = False
+
+    assert client.get("/over-logged").status_code == 200
+    assert "issued 2 queries (budget 1)" in caplog.text
+
+
+def test_get_product_stays_within_budget(app, client):
+    category = Category(name="Mugs", slug="mugs")
+    db.session.add(category)
+    db.session.flush()
+    for i in range(3):
+        db.session.add(Product(
+            name=f"Mug {i}", price=100, category_id=category.id,
+            stock_quantity=5, description="A mug",
+        ))
+    db.session.commit()
+    product_id = db.session.execute(text("SELECT MIN(id) FROM products")).scalar()
+
+    response = client.get(f"/api/products/{product_id}")
+
+    assert response.status_code == 200
@@ -0,0 +1,118 @@
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import Order, Product
+
+
+@pytest.fixture
+def quote(client):
+    def get(lines):
+        return client.post("/api/orders/quote", json={
+            "items": [{"product_id": pid, "qty": qty} for pid, qty in lines.items()],
+        })
+
+    return get
+
+
+@pytest.fixture
+def order_with(client, customer):
+    def post(lines, quote_token=None):
+        body = {
+            "customer": customer,
+            "items": [{"product_id": pid, "qty": qty} for pid, qty in lines.items()],
+        }
+        if quote_token is not None:
+            body["quote_token"] = quote_token
+        return client.post("/api/orders", json=body)
+
+    return post
+
+
+def test_quote_prices_the_cart(quote, make_product):
+    mug = make_product(stock=5, price=1200)
+    pen = make_product(stock=1, price=150)
+
+    data = quote({mug: 2, pen: 1}).get_json()
+
+    assert data["orderable"] is True
+    assert data["quote_token"]
+    assert [line["line_total"] for line in data["items"]] == [2400, 150]
+    assert (data["subtotal"], data["delivery_fee"], data["total"]) == (2550, 500, 3050)
+
+
+def test_order_keeps_the_quoted_price(quote, order_with, make_product):
+    product_id = make_product(stock=5, price=1200)
+    token = quote({product_id: 2}).get_json()["quote_token"]
+    db.session.get(Product, product_id).price = 1500
+    db.session.commit()
+
+    response = order_with({product_id: 2}, token)
+
+    assert response.status_code == 201
+    assert response.get_json()["total"] == 2900
+
+
+def test_quote_for_another_cart_is_refused(quote, order_with, make_product):
+    product_id = make_product(stock=5)
+    token = quote({product_id: 1}).get_json()["quote_token"]
+
+    response = order_with({product_id: 2}, token)
+
+    assert response.status_code == 409
+    assert response.get_json() == {"error": "Quote does not match the cart", "requote": True}
+    assert Order.query.count() == 0
+
+
+def test_tampered_quote_is_refused(quote, order_with, make_product):
+    product_id = make_product(stock=5)
+    token = quote({product_id: 1}).get_json()["quote_token"]
+
+    response = order_with({product_id: 1}, token[:-2] + "xx")
+
+    assert response.status_code == 409
+    assert response.get_json()["error"] == "Invalid quote token"
+
+
+def test_expired_quote_is_refused(app, quote, order_with, make_product):
+    product_id = make_product(stock=5)
+    token = quote({product_id: 1}).get_json()["quote_token"]
+    app.config["ORDER_QUOTE_TTL_SECONDS"] = -1
+
+    response = order_with({product_id: 1}, token)
+
+    assert response.status_code == 409
+    assert response.get_json()["error"] == "Quote has expired"
+
+
+def test_cart_short_of_stock_gets_no_token(quote, make_product):
+    product_id = make_product(stock=1)
+
+    data = quote({product_id: 2}).get_json()
+
+    assert data["orderable"] is False
+    assert data["quote_token"] is None
+    assert data["items"][0]["available"] == 1
+
+
+def test_quoted_and_unquoted_totals_round_alike(quote, order_with, make_product):
+    product_id = make_product(stock=10, price=Decimal("99.99"))
+    product = db.session.get(Product, product_id)
+    product.discount_percent = 15
+    db.session.commit()
+
+    quoted = quote({product_id: 3}).get_json()
+    with_token = order_with({product_id: 3}, quoted["quote_token"]).get_json()
+    without_token = order_with({product_id: 3}).get_json()
+
+    assert quoted["items"][0]["unit_price"] == 84.99
+    assert with_token["total"] == without_token["total"] == quoted["total"]
+
+
+@pytest.mark.parametrize("items", [[1], "abc", [{"product_id": 1, "qty": 0}], []])
+def test_malformed_carts_get_400(client, customer, items):
+    quoted = client.post("/api/orders/quote", json={"items": items})
+    ordered = client.post("/api/orders", json={"customer": customer, "items": items})
+
+    assert quoted.status_code == ordered.status_code == 400
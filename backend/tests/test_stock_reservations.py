@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Order
+from app.models.stock_reservation import StockReservation
+from app.services.stock_reservations import (
+    ACTIVE,
+    COMMITTED,
+    RELEASED,
+    sweep_reservations,
+)
+
+
+def _start_stk(client, order):
+    return client.post(
+        "/api/payments/mpesa/stk",
+        json={"order_id": order["order_id"], "phone": "0712345678"},
+        headers={"X-Order-Token": order["order_access_token"]},
+    )
+
+
+def _send_callback(client, mpesa, order, **kwargs):
+    checkout_id = db.session.get(Order, order["order_id"]).payment.mpesa_checkout_id
+    return client.post(
+        "/api/payments/mpesa/callback",
+        json=mpesa.callback(checkout_id, amount=order["total"], **kwargs),
+    )
+
+
+def _fail_payment_and_sweep(client, mpesa, order):
+    assert _start_stk(client, order).status_code == 200
+    _send_callback(client, mpesa, order, result_code=1032)
+    assert sweep_reservations()["payment_failed"] == 1
+
+
+def _statuses(order_id):
+    db.session.expire_all()
+    return sorted(
+        r.status for r in StockReservation.query.filter_by(order_id=order_id)
+    )
+
+
+def test_order_holds_stock_until_paid(client, mpesa, make_product, place_order, stock_levels):
+    product_id = make_product(stock=5)
+    order = place_order({product_id: 2})
+
+    assert stock_levels(product_id) == (5, 3)
+
+    assert _start_stk(client, order).status_code == 200
+    _send_callback(client, mpesa, order)
+
+    assert stock_levels(product_id) == (3, 3)
+    assert _statuses(order["order_id"]) == [COMMITTED]
+
+
+def test_sweep_releases_failed_payments_and_expired_holds(
+        client, mpesa, make_product, place_order, stock_levels):
+    product_id = make_product(stock=5)
+    failed = place_order({product_id: 2})
+    expired = place_order({product_id: 1})
+    assert _start_stk(client, failed).status_code == 200
+    _send_callback(client, mpesa, failed, result_code=1032)
+
+    released = sweep_reservations(now=datetime.utcnow() + timedelta(hours=1))
+
+    assert released == {"payment_failed": 1, "expired": 1}
+    assert _statuses(failed["order_id"]) == [RELEASED]
+    assert _statuses(expired["order_id"]) == [RELEASED]
+    assert stock_levels(product_id) == (5, 5)
+
+
+def test_stk_retry_after_sweep_records_the_sale(
+        client, mpesa, make_product, place_order, stock_levels):
+    product_id = make_product(stock=5)
+    order = place_order({product_id: 2})
+    _fail_payment_and_sweep(client, mpesa, order)
+    assert stock_levels(product_id) == (5, 5)
+
+    assert _start_stk(client, order).status_code == 200
+    # Held again, and the payment is pending so the sweeper keeps the hold
+    assert stock_levels(product_id) == (5, 3)
+    assert sweep_reservations()["payment_failed"] == 0
+
+    _send_callback(client, mpesa, order)
+
+    assert db.session.get(Order, order["order_id"]).status == "CONFIRMED"
+    assert stock_levels(product_id) == (3, 3)
+
+
+def test_cod_after_sweep_records_the_sale(
+        client, mpesa, make_product, place_order, stock_levels):
+    product_id = make_product(stock=5)
+    order = place_order({product_id: 2})
+    _fail_payment_and_sweep(client, mpesa, order)
+
+    response = client.post(
+        f"/api/payments/orders/{order['order_id']}/mark-cod-payment",
+        headers={"X-Order-Token": order["order_access_token"]},
+    )
+
+    assert response.status_code == 200
+    assert stock_levels(product_id) == (3, 3)
+
+
+def test_retry_is_refused_when_the_stock_was_sold_meanwhile(
+        client, mpesa, make_product, place_order, stock_levels):
+    product_id = make_product(stock=5)
+    order = place_order({product_id: 2})
+    _fail_payment_and_sweep(client, mpesa, order)
+    place_order({product_id: 4})
+    pushes = len(mpesa.pushes)
+
+    response = _start_stk(client, order)
+
+    assert response.status_code == 409
+    assert response.get_json()["unavailable"] == [{"product_id": product_id, "available": 1}]
+    assert len(mpesa.pushes) == pushes
+    assert _statuses(order["order_id"]) == [RELEASED]
+    assert stock_levels(product_id) == (5, 1)
+
+
+def test_late_payment_after_expiry_still_records_the_sale(
+        client, mpesa, make_product, place_order, stock_levels, caplog):
+    product_id = make_product(stock=5)
+    order = place_order({product_id: 2})
+    assert _start_stk(client, order).status_code == 200
+    sweep_reservations(now=datetime.utcnow() + timedelta(hours=1))
+    place_order({product_id: 4})
+
+    _send_callback(client, mpesa, order)
+
+    assert db.session.get(Order, order["order_id"]).payment.status == "PAID"
+    assert stock_levels(product_id) == (3, -1)
+    assert f"Product {product_id} oversold by 1" in caplog.text
+
+
+def test_cancelling_a_paid_order_returns_its_stock(
+        client, mpesa, make_product, place_order, stock_levels, admin_headers):
+    product_id = make_product(stock=5)
+    order = place_order({product_id: 2})
+    assert _start_stk(client, order).status_code == 200
+    _send_callback(client, mpesa, order)
+
+    response = client.put(
+        f"/api/orders/{order['order_id']}/status",
+        json={"status": "cancelled"},
+        headers=admin_headers,
+    )
+
+    assert response.status_code == 200
+    assert stock_levels(product_id) == (5, 5)
+    assert _statuses(order["order_id"]) == [RELEASED]
+
+
+def test_cancelled_order_cannot_be_paid_again(client, mpesa, make_product, place_order,
+                                              stock_levels, admin_headers):
+    product_id = make_product(stock=5)
+    order = place_order({product_id: 2})
+    client.put(f"/api/orders/{order['order_id']}/status",
+               json={"status": "cancelled"}, headers=admin_headers)
+
+    assert _start_stk(client, order).status_code == 409
+    assert stock_levels(product_id) == (5, 5)
+
+
+def test_reverting_a_payment_holds_the_stock_again(
+        client, make_product, place_order, stock_levels, admin_headers):
+    product_id = make_product(stock=5)
+    order = place_order({product_id: 2})
+    payment_id = db.session.get(Order, order["order_id"]).payment.id
+
+    client.put(f"/api/admin/payments/{payment_id}/status",
+               json={"status": "PAID"}, headers=admin_headers)
+    assert stock_levels(product_id) == (3, 3)
+
+    client.put(f"/api/admin/payments/{payment_id}/status",
+               json={"status": "PENDING"}, headers=admin_headers)
+
+    assert db.session.get(Order, order["order_id"]).status == "pending"
+    assert _statuses(order["order_id"]) == [ACTIVE]
+    assert stock_levels(product_id) == (5, 3)
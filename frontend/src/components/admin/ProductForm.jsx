@@ -114,11 +114,16 @@ export default function ProductForm({
       setLoading(true);
 
       /* 1️⃣ CREATE OR UPDATE PRODUCT */
+      const { stock_quantity, ...fields } = form;
+      const stock = initialData
+        // Relative, so sales made since the form opened are not undone
+        ? { stock_adjustment: Number(stock_quantity || 0) - Number(initialData.stock_quantity || 0) }
+        : { stock_quantity: Number(stock_quantity || 0) };
       const product = await onSubmit({
-        ...form,
+        ...fields,
         price: Number(form.price),
-        stock_quantity: Number(form.stock_quantity || 0),
         discount_percent: Number(form.discount_percent || 0),
+        ...stock,
       });
 
       /* 2️⃣ UPLOAD NEW IMAGES */
@@ -137,7 +142,17 @@ export default function ProductForm({
           }
         );
 
-        const uploadedImages = await imgRes.json();
+        const uploadResult = await imgRes.json();
+        // 201 returns the new images; 207 returns { uploaded, failed }
+        const uploadedImages = Array.isArray(uploadResult)
+          ? uploadResult
+          : uploadResult.uploaded || [];
+        if (uploadResult.failed?.length) {
+          alert(
+            "Some images were not uploaded:\n" +
+              uploadResult.failed.map(f => `${f.filename}: ${f.error}`).join("\n")
+          );
+        }
 
         // ✅ update UI immediately
         setExistingImages(prev => [...prev, ...uploadedImages]);
@@ -66,7 +66,7 @@ export default function ProductCard({ product }) {
                 </div>
               )}
               <img
-                src={product.image}
+                src={product.thumbnail_url || product.image}
                 alt={product.name}
                 className={`w-full h-full object-cover transition-all duration-500 ${
                   isHovered ? "scale-110" : "scale-100"
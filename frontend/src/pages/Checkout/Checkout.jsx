@@ -1,6 +1,6 @@
-import { useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useCart } from "../../context/CartContext";
-import { createOrder } from "../../services/api";
+import { createOrder, newIdempotencyKey, quoteCart } from "../../services/api";
 import { useNavigate } from "react-router-dom";
 import {
   User,
@@ -24,12 +24,40 @@ export default function Checkout() {
   const navigate = useNavigate();
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
+  // Reused while the order payload is unchanged, so a retry after a
+  // network error cannot create a second order
+  const orderAttemptRef = useRef({ payload: null, key: null });
 
   const hasBrandingItems = cart.some((i) => i.is_branding);
 
-  const subtotal = cart.reduce((sum, item) => sum + item.price * item.qty, 0);
-  const deliveryFee = subtotal >= 5000 ? 0 : 500;
-  const total = subtotal + deliveryFee;
+  // Server quote for the current cart; local figures are shown until it arrives
+  const [quote, setQuote] = useState(null);
+  const [quoteVersion, setQuoteVersion] = useState(0);
+  const cartLines = cart.map((item) => ({ product_id: item.product_id, qty: item.qty }));
+  const cartKey = JSON.stringify(cartLines);
+
+  useEffect(() => {
+    if (cartLines.length === 0) {
+      setQuote(null);
+      return;
+    }
+    let cancelled = false;
+    quoteCart(cartLines)
+      .then((data) => {
+        if (!cancelled) setQuote(data);
+      })
+      .catch(() => {
+        if (!cancelled) setQuote(null);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [cartKey, quoteVersion]);
+
+  const localSubtotal = cart.reduce((sum, item) => sum + item.price * item.qty, 0);
+  const subtotal = quote ? quote.subtotal : localSubtotal;
+  const deliveryFee = quote ? quote.delivery_fee : localSubtotal >= 5000 ? 0 : 500;
+  const total = quote ? quote.total : subtotal + deliveryFee;
 
   // API Base URL - update this for production
   const API_BASE_URL =
@@ -93,13 +121,22 @@ const [branding, setBranding] = useState({
         notes: branding.notes,
         deadline: branding.deadline,
       } : null,
+      quote_token: quote?.quote_token || undefined,
     };
 
-    const res = await createOrder(orderPayload);
+    const payloadJson = JSON.stringify(orderPayload);
+    if (orderAttemptRef.current.payload !== payloadJson) {
+      orderAttemptRef.current = { payload: payloadJson, key: newIdempotencyKey() };
+    }
+
+    const res = await createOrder(orderPayload, {
+      idempotencyKey: orderAttemptRef.current.key,
+    });
     const newOrderId = res.order_id || res.id;
     const orderToken = res.order_access_token;
     if (newOrderId && orderToken) {
       sessionStorage.setItem(`order_token_${newOrderId}`, orderToken);
+      sessionStorage.setItem(`order_phone_${newOrderId}`, billing.phone);
     }
     
     const itemsSummary = cart
@@ -143,6 +180,8 @@ const [branding, setBranding] = useState({
   } catch (err) {
     console.error("Order creation error:", err);
     setError("Failed to create order. Please try again.");
+    // Prices or stock may have changed since the quote; fetch a fresh one
+    setQuoteVersion((v) => v + 1);
   } finally {
     setLoading(false);
   }
@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import { Link, useSearchParams, useNavigate } from 'react-router-dom';
+import { initiateMpesaPayment, newIdempotencyKey } from '../../services/api';
 import {
   CheckCircle,
   XCircle,
@@ -20,11 +21,19 @@ export default function OrderSuccess() {
   const orderToken = searchParams.get('order_token') || sessionStorage.getItem(`order_token_${orderId}`);
 
   const pollingRef = useRef(null);
+  // Idempotency-Key of the STK push in progress; kept until the server answers
+  const stkAttemptRef = useRef(null);
 
   const [orderDetails, setOrderDetails] = useState(null);
   const [paymentStatus, setPaymentStatus] = useState('pending');
   const [loading, setLoading] = useState(true);
   const [countdown, setCountdown] = useState(60);
+  const [watchVersion, setWatchVersion] = useState(0);
+  const [retryPhone, setRetryPhone] = useState(
+    () => sessionStorage.getItem(`order_phone_${orderId}`) || ''
+  );
+  const [retrying, setRetrying] = useState(false);
+  const [retryError, setRetryError] = useState('');
 
   const API_BASE_URL =
     import.meta.env.VITE_API_URL ||
@@ -37,10 +46,30 @@ export default function OrderSuccess() {
     }
   }, [orderId, navigate]);
 
-  // ✅ Poll backend (single source of truth)
+  // ✅ Payment status: push over SSE, fall back to polling
   useEffect(() => {
     if (!orderId) return;
 
+    let source = null;
+    let closed = false;
+
+    // The server decides what is final (PAID/FAILED/CANCELLED or COD,
+    // see is_final_status) and says so in `final`; the stream closes then.
+    const isFinal = (data) => Boolean(data && data.final);
+
+    const stopPolling = () => {
+      if (pollingRef.current) {
+        clearInterval(pollingRef.current);
+        pollingRef.current = null;
+      }
+    };
+
+    const applyStatus = (data) => {
+      setOrderDetails(data);
+      setPaymentStatus(data.payment_status || 'pending');
+      setLoading(false);
+    };
+
     const fetchStatus = async () => {
       try {
         const res = await fetch(
@@ -53,35 +82,86 @@ export default function OrderSuccess() {
         );
         const data = await res.json();
 
+        applyStatus(data);
 
-        setOrderDetails(data);
-        setPaymentStatus(data.payment_status || 'pending');
-        setLoading(false);
-
-        // ✅ STOP polling once PAID or FAILED
-        if (data.payment_status === 'PAID' || data.payment_status === 'FAILED') {
-          clearInterval(pollingRef.current);
-          pollingRef.current = null;
-        }
+        // ✅ STOP polling once the status is final
+        if (isFinal(data)) stopPolling();
+        return data;
       } catch (err) {
         console.error('Polling error:', err);
         setLoading(false);
+        return null;
       }
     };
 
-    fetchStatus();
-
-    // Only poll if payment method is M-Pesa (not COD)
-    if (paymentMethodParam !== 'cod') {
+    const startPolling = () => {
+      if (closed || pollingRef.current) return;
       pollingRef.current = setInterval(fetchStatus, 3000);
-    }
+    };
 
-    return () => {
-      if (pollingRef.current) {
-        clearInterval(pollingRef.current);
+    const openStream = () => {
+      if (typeof EventSource === 'undefined') {
+        startPolling();
+        return;
       }
+      const params = new URLSearchParams({ order_token: orderToken || '' });
+      source = new EventSource(
+        `${API_BASE_URL}/api/payments/order/${orderId}/payment-status/stream?${params}`
+      );
+      source.addEventListener('payment', (e) => {
+        const data = JSON.parse(e.data);
+        applyStatus(data);
+        if (isFinal(data)) {
+          source.close();
+        }
+      });
+      // The server ends the stream after a timeout; EventSource reconnects
+      // by itself. Only a hard failure (e.g. 403) leaves it CLOSED.
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          startPolling();
+        }
+      };
     };
-  }, [orderId, paymentMethodParam]);
+
+    fetchStatus().then((data) => {
+      // Only wait for updates if payment method is M-Pesa (not COD)
+      if (closed || paymentMethodParam === 'cod') return;
+      if (data && isFinal(data)) return;
+      openStream();
+    });
+
+    return () => {
+      closed = true;
+      if (source) source.close();
+      stopPolling();
+    };
+  }, [orderId, paymentMethodParam, watchVersion]);
+
+  // 🔁 Send a new STK prompt for a failed payment
+  const retryMpesaPayment = async () => {
+    if (retrying) return;
+    if (!stkAttemptRef.current) stkAttemptRef.current = newIdempotencyKey();
+    setRetrying(true);
+    setRetryError('');
+    try {
+      await initiateMpesaPayment(orderId, retryPhone, {
+        idempotencyKey: stkAttemptRef.current,
+        orderToken,
+      });
+      stkAttemptRef.current = null;
+      setCountdown(60);
+      setPaymentStatus('PENDING');
+      setWatchVersion((v) => v + 1);
+    } catch (err) {
+      // The server answered, so the next click is a new attempt; on a
+      // network error keep the key so a retry cannot prompt twice.
+      if (err.status) stkAttemptRef.current = null;
+      setRetryError(err.message || 'Could not send the M-Pesa prompt');
+    } finally {
+      setRetrying(false);
+    }
+  };
 
   // ⏳ Countdown only while pending
   useEffect(() => {
@@ -222,6 +302,27 @@ export default function OrderSuccess() {
       <h1 className="text-3xl font-bold">Payment Failed</h1>
       <p>No money was deducted. Please try again.</p>
 
+      {orderToken && (
+        <div className="max-w-sm mx-auto space-y-3">
+          <input
+            type="tel"
+            value={retryPhone}
+            onChange={(e) => setRetryPhone(e.target.value)}
+            placeholder="M-Pesa phone number"
+            className="w-full border rounded-lg px-4 py-3"
+          />
+          <button
+            type="button"
+            onClick={retryMpesaPayment}
+            disabled={retrying || !retryPhone}
+            className="w-full px-6 py-3 bg-green-600 hover:bg-green-700 disabled:opacity-60 text-white rounded-lg font-semibold"
+          >
+            {retrying ? 'Sending prompt…' : 'Retry M-Pesa Payment'}
+          </button>
+          {retryError && <p className="text-sm text-red-600">{retryError}</p>}
+        </div>
+      )}
+
       <div className="flex justify-center gap-4">
         <Link to={`/checkout?order_id=${orderId}`} className="btn-primary px-6 py-3 bg-blue-600 hover:bg-blue-700 text-white rounded-lg font-semibold">
           Try Again
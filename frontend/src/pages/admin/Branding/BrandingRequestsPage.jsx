@@ -3,34 +3,37 @@ import { Search, Eye, Calendar, Palette, FileText, Phone, Mail } from 'lucide-re
 import { API_URL } from '../../../utils/apiHelper';
 
 export default function BrandingRequestsPage() {
-  const [orders, setOrders] = useState([]);
   const [filteredOrders, setFilteredOrders] = useState([]);
   const [searchTerm, setSearchTerm] = useState('');
+  const [statusFilter, setStatusFilter] = useState('');
+  const [page, setPage] = useState(1);
+  const [totalPages, setTotalPages] = useState(1);
+  const [totalRequests, setTotalRequests] = useState(0);
   const [loading, setLoading] = useState(true);
   const [selectedRequest, setSelectedRequest] = useState(null);
   const [showModal, setShowModal] = useState(false);
 
   useEffect(() => {
-    fetchBrandingRequests();
-  }, []);
-
-  useEffect(() => {
-    filterRequests();
-  }, [orders, searchTerm]);
+    // Debounce typing; filtering and paging happen on the server
+    const timer = setTimeout(fetchBrandingRequests, searchTerm ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [page, searchTerm, statusFilter]);
 
   const fetchBrandingRequests = async () => {
     try {
       const token = localStorage.getItem("admin_token") || localStorage.getItem("adminToken");
-      const response = await fetch(`${API_URL}/api/orders`, {
+      const params = new URLSearchParams({ page, per_page: 20 });
+      if (searchTerm) params.set('q', searchTerm);
+      if (statusFilter) params.set('status', statusFilter);
+      const response = await fetch(`${API_URL}/api/admin/branding-requests?${params}`, {
         headers: {
           Authorization: `Bearer ${token || ""}`
         }
       });
       const data = await response.json();
-      const safeOrders = Array.isArray(data) ? data : [];
-      const brandingOrders = safeOrders.filter(order => order.branding !== null);
-      setOrders(brandingOrders);
-      setFilteredOrders(brandingOrders);
+      setFilteredOrders(Array.isArray(data.items) ? data.items : []);
+      setTotalPages(data.total_pages || 1);
+      setTotalRequests(data.total || 0);
     } catch (error) {
       console.error('Error fetching branding requests:', error);
     } finally {
@@ -38,20 +41,6 @@ export default function BrandingRequestsPage() {
     }
   };
 
-  const filterRequests = () => {
-    let filtered = orders;
-
-    if (searchTerm) {
-      filtered = filtered.filter(order =>
-        order.customer.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        order.customer.phone.includes(searchTerm) ||
-        order.id.toString().includes(searchTerm)
-      );
-    }
-
-    setFilteredOrders(filtered);
-  };
-
   const viewDetails = (order) => {
     setSelectedRequest(order);
     setShowModal(true);
@@ -92,23 +81,35 @@ export default function BrandingRequestsPage() {
         <div className="flex items-center gap-3">
           <div className="px-4 py-2 bg-purple-50 rounded-lg">
             <span className="text-sm text-purple-600 font-medium">
-              {filteredOrders.length} Requests
+              {totalRequests} Requests
             </span>
           </div>
         </div>
       </div>
 
-      <div className="bg-white rounded-2xl shadow-sm border border-gray-100 p-6">
-        <div className="relative">
+      <div className="bg-white rounded-2xl shadow-sm border border-gray-100 p-6 flex flex-col md:flex-row gap-4">
+        <div className="relative flex-1">
           <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 text-gray-400" size={20} />
           <input
             type="text"
             placeholder="Search by customer name, phone, or order ID..."
             value={searchTerm}
-            onChange={(e) => setSearchTerm(e.target.value)}
+            onChange={(e) => { setSearchTerm(e.target.value); setPage(1); }}
             className="w-full pl-10 pr-4 py-3 border border-gray-200 rounded-xl focus:ring-2 focus:ring-purple-500 focus:border-transparent outline-none transition-all"
           />
         </div>
+        <select
+          value={statusFilter}
+          onChange={(e) => { setStatusFilter(e.target.value); setPage(1); }}
+          className="px-4 py-3 border border-gray-200 rounded-xl focus:ring-2 focus:ring-purple-500 outline-none"
+        >
+          <option value="">All statuses</option>
+          <option value="pending">Pending</option>
+          <option value="processing">Processing</option>
+          <option value="shipped">Shipped</option>
+          <option value="delivered">Delivered</option>
+          <option value="cancelled">Cancelled</option>
+        </select>
       </div>
 
       <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
@@ -226,12 +227,32 @@ export default function BrandingRequestsPage() {
         ))}
       </div>
 
+      {totalPages > 1 && (
+        <div className="flex items-center justify-center gap-4">
+          <button
+            onClick={() => setPage(p => Math.max(1, p - 1))}
+            disabled={page === 1}
+            className="px-4 py-2 bg-white border border-gray-200 rounded-lg disabled:opacity-50"
+          >
+            Previous
+          </button>
+          <span className="text-sm text-gray-600">Page {page} of {totalPages}</span>
+          <button
+            onClick={() => setPage(p => Math.min(totalPages, p + 1))}
+            disabled={page === totalPages}
+            className="px-4 py-2 bg-white border border-gray-200 rounded-lg disabled:opacity-50"
+          >
+            Next
+          </button>
+        </div>
+      )}
+
       {filteredOrders.length === 0 && (
         <div className="bg-white rounded-2xl shadow-sm border border-gray-100 p-12 text-center">
           <Palette size={48} className="text-gray-300 mx-auto mb-4" />
           <h3 className="text-lg font-semibold text-gray-900 mb-2">No branding requests found</h3>
           <p className="text-gray-500">
-            {searchTerm ? 'Try adjusting your search criteria' : 'Branding requests will appear here when customers place orders'}
+            {searchTerm || statusFilter ? 'Try adjusting your search criteria' : 'Branding requests will appear here when customers place orders'}
           </p>
         </div>
       )}
@@ -365,7 +386,7 @@ export default function BrandingRequestsPage() {
               <div className="flex items-center justify-between pt-4 border-t border-gray-200">
                 <div>
                   <span className="text-sm text-gray-600">Payment Method: </span>
-                  <span className="text-sm font-medium text-gray-900 capitalize">{selectedRequest.payment_method}</span>
+                  <span className="text-sm font-medium text-gray-900 capitalize">{selectedRequest.payment?.method}</span>
                 </div>
                 <span className={`px-4 py-2 rounded-full text-sm font-semibold border ${getStatusColor(selectedRequest.status)}`}>
                   {selectedRequest.status}
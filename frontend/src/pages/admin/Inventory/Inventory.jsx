@@ -139,7 +139,8 @@ export default function Inventory() {
         price: Number(product.price),
         category_id: categoryId,
         is_branding: product.is_branding,
-        stock_quantity: stockQuantity,
+        // Relative, so sales made since the page loaded are not undone
+        stock_adjustment: stockQuantity - Number(product.stock_quantity || 0),
         discount_percent: discountPercent,
         flash_sale_percent: flashSalePercent,
         flash_sale_start,
@@ -10,6 +10,9 @@ export default function OrdersPage() {
   const [statusFilter, setStatusFilter] = useState('all');
   const [selectedOrder, setSelectedOrder] = useState(null);
   const [showModal, setShowModal] = useState(false);
+  const [selectedIds, setSelectedIds] = useState([]);
+  const [bulkStatus, setBulkStatus] = useState('shipped');
+  const [bulkResult, setBulkResult] = useState(null);
 
   useEffect(() => {
     fetchOrders();
@@ -78,6 +81,48 @@ export default function OrdersPage() {
     }
   };
 
+  const toggleSelected = (orderId) => {
+    setSelectedIds((ids) =>
+      ids.includes(orderId) ? ids.filter((id) => id !== orderId) : [...ids, orderId]
+    );
+  };
+
+  const allVisibleSelected =
+    filteredOrders.length > 0 && filteredOrders.every((o) => selectedIds.includes(o.id));
+
+  const toggleAllVisible = () => {
+    setSelectedIds(allVisibleSelected ? [] : filteredOrders.map((o) => o.id));
+  };
+
+  const bulkUpdateStatus = async () => {
+    if (selectedIds.length === 0) return;
+    try {
+      const token = localStorage.getItem("admin_token") || localStorage.getItem("adminToken");
+      const res = await fetch(`${API_URL}/api/orders/status`, {
+        method: 'PUT',
+        headers: {
+          'Content-Type': 'application/json',
+          Authorization: `Bearer ${token || ""}`
+        },
+        body: JSON.stringify({ order_ids: selectedIds, status: bulkStatus })
+      });
+      const data = await res.json();
+      if (!res.ok) {
+        setBulkResult({ error: data.error || 'Bulk update failed' });
+        return;
+      }
+      setBulkResult({
+        updated: data.updated,
+        failed: data.results.filter((r) => !r.ok),
+      });
+      setSelectedIds([]);
+      fetchOrders();
+    } catch (error) {
+      console.error('Error updating orders:', error);
+      setBulkResult({ error: 'Bulk update failed' });
+    }
+  };
+
   const viewOrderDetails = (order) => {
     setSelectedOrder(order);
     setShowModal(true);
@@ -144,11 +189,69 @@ export default function OrdersPage() {
         </div>
       </div>
 
+      {(selectedIds.length > 0 || bulkResult) && (
+        <div className="bg-white rounded-2xl shadow-sm border border-gray-100 p-4 space-y-2">
+          {selectedIds.length > 0 && (
+            <div className="flex flex-wrap items-center gap-3">
+              <span className="text-sm text-gray-700">
+                <span className="font-semibold">{selectedIds.length}</span> selected
+              </span>
+              <select
+                value={bulkStatus}
+                onChange={(e) => setBulkStatus(e.target.value)}
+                className="px-3 py-2 border border-gray-200 rounded-xl text-sm"
+              >
+                <option value="processing">Processing</option>
+                <option value="shipped">Shipped</option>
+                <option value="delivered">Delivered</option>
+                <option value="cancelled">Cancelled</option>
+              </select>
+              <button
+                onClick={bulkUpdateStatus}
+                className="px-4 py-2 bg-blue-600 text-white rounded-xl text-sm font-medium hover:bg-blue-700 transition-colors"
+              >
+                Update status
+              </button>
+              <button
+                onClick={() => setSelectedIds([])}
+                className="px-4 py-2 text-sm text-gray-600 hover:text-gray-900"
+              >
+                Clear
+              </button>
+            </div>
+          )}
+          {bulkResult && (
+            <div className="text-sm">
+              {bulkResult.error ? (
+                <span className="text-red-600">{bulkResult.error}</span>
+              ) : (
+                <>
+                  <span className="text-green-700">{bulkResult.updated} order(s) updated.</span>
+                  {bulkResult.failed.map((r) => (
+                    <div key={r.order_id} className="text-red-600">
+                      #{r.order_id}: {r.error}
+                    </div>
+                  ))}
+                </>
+              )}
+            </div>
+          )}
+        </div>
+      )}
+
       <div className="bg-white rounded-2xl shadow-sm border border-gray-100 overflow-hidden">
         <div className="overflow-x-auto">
           <table className="w-full">
             <thead className="bg-gray-50">
               <tr>
+                <th className="pl-6 py-4 text-left">
+                  <input
+                    type="checkbox"
+                    checked={allVisibleSelected}
+                    onChange={toggleAllVisible}
+                    aria-label="Select all orders"
+                  />
+                </th>
                 <th className="px-6 py-4 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Order</th>
                 <th className="px-6 py-4 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Customer</th>
                 <th className="px-6 py-4 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">Items</th>
@@ -161,6 +264,14 @@ export default function OrdersPage() {
             <tbody className="divide-y divide-gray-100">
               {filteredOrders.map((order) => (
                 <tr key={order.id} className="hover:bg-gray-50 transition-colors">
+                  <td className="pl-6 py-4">
+                    <input
+                      type="checkbox"
+                      checked={selectedIds.includes(order.id)}
+                      onChange={() => toggleSelected(order.id)}
+                      aria-label={`Select order ${order.id}`}
+                    />
+                  </td>
                   <td className="px-6 py-4 whitespace-nowrap">
                     <span className="text-sm font-semibold text-gray-900">#{order.id}</span>
                   </td>
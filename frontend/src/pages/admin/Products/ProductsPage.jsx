@@ -179,12 +179,19 @@ export default function ProductsPage() {
       
       const method = editingProduct ? 'PUT' : 'POST';
 
+      const { stock_quantity, ...fields } = formData;
       const payload = {
-        ...formData,
+        ...fields,
         price: Number(formData.price),
-        stock_quantity: Number(formData.stock_quantity || 0),
         discount_percent: Number(formData.discount_percent || 0)
       };
+      if (editingProduct) {
+        // Relative, so sales made since the form opened are not undone
+        payload.stock_adjustment =
+          Number(stock_quantity || 0) - Number(editingProduct.stock_quantity || 0);
+      } else {
+        payload.stock_quantity = Number(stock_quantity || 0);
+      }
 
       const response = await fetch(url, {
         method,
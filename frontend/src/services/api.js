@@ -49,11 +49,21 @@ export const API_ENDPOINTS = {
   MPESA_STK: `${API_BASE}/payments/mpesa/stk`,
 };
 
+// Pass the same idempotencyKey when retrying the same order so the
+// backend returns the original order instead of creating a duplicate.
+export function newIdempotencyKey() {
+  if (window.crypto?.randomUUID) return window.crypto.randomUUID();
+  return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
 // Orders
-export async function createOrder(orderData) {
+export async function createOrder(orderData, { idempotencyKey } = {}) {
+  const headers = { "Content-Type": "application/json" };
+  if (idempotencyKey) headers["Idempotency-Key"] = idempotencyKey;
+
   const res = await fetch(`${API_BASE}/orders`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers,
     body: JSON.stringify(orderData),
   });
 
@@ -61,6 +71,19 @@ export async function createOrder(orderData) {
   return res.json();
 }
 
+// Server-side prices, stock and delivery fee for a cart. quote_token (when
+// present) can be sent with createOrder to keep these prices.
+export async function quoteCart(items) {
+  const res = await fetch(`${API_BASE}/orders/quote`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ items }),
+  });
+
+  if (!res.ok) throw new Error("Failed to price cart");
+  return res.json();
+}
+
 export async function fetchOrders() {
   const res = await fetch(`${API_BASE}/orders`);
   if (!res.ok) throw new Error("Failed to fetch orders");
@@ -95,10 +118,22 @@ export async function submitProductRating(productId, rating) {
 }
 
 // Payments - M-Pesa
-export const initiateMpesaPayment = async (orderId, phone) => {
+// Reuse idempotencyKey when retrying the same payment attempt (double
+// click, network error) so the customer never gets a second STK prompt.
+export const initiateMpesaPayment = async (
+  orderId,
+  phone,
+  { idempotencyKey = newIdempotencyKey(), orderToken } = {}
+) => {
+  const headers = {
+    'Content-Type': 'application/json',
+    'Idempotency-Key': idempotencyKey,
+  };
+  if (orderToken) headers['X-Order-Token'] = orderToken;
+
   const response = await fetch(`${API_BASE}/payments/mpesa/stk`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers,
     body: JSON.stringify({
       order_id: orderId,
       phone: phone,
@@ -106,7 +141,10 @@ export const initiateMpesaPayment = async (orderId, phone) => {
   });
 
   if (!response.ok) {
-    throw new Error('Payment initiation failed');
+    const body = await response.json().catch(() => ({}));
+    const error = new Error(body.error || 'Payment initiation failed');
+    error.status = response.status;
+    throw error;
   }
 
   return response.json();